@@ -0,0 +1,48 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.api.auth import require_admin
+from app.config import settings
+from app.models.analytics import SalesAnalytics
+from app.services.analytics import get_sales_rollup
+from app.services.profiler import ProfilerBusyError, get_profiler
+from datetime import datetime
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+profiler = get_profiler()
+sales_rollup = get_sales_rollup()
+
+
+@router.get("/analytics", response_model=SalesAnalytics)
+async def get_analytics(
+    days: int = Query(7, ge=1, le=settings.ANALYTICS_RETENTION_DAYS),
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    top: int = Query(10, ge=1, le=50),
+):
+    """
+    Revenue, order counts, average basket and best sellers for the last
+    `days` days (today included), from precomputed hourly rollups
+    """
+    return sales_rollup.report(days, granularity, top)
+
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def take_profile(
+    seconds: float = Query(10.0, gt=0, le=settings.PROFILER_MAX_SECONDS),
+    interval_ms: float = Query(5.0, ge=1.0, le=100.0),
+):
+    """
+    Sample this worker's stacks for `seconds` and return collapsed stacks
+    
+    Feed the file to flamegraph.pl or load it in speedscope.app.
+    """
+    try:
+        stacks = await profiler.profile(seconds, interval_ms / 1000)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    
+    filename = f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.collapsed"
+    return PlainTextResponse(
+        stacks,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -2,36 +2,83 @@ from fastapi import APIRouter, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.models.user import UserCreate, UserLogin, User, Token
 from app.config import settings
-from passlib.context import CryptContext
-from jose import JWTError, jwt
+from app.services.repository import get_repository
+from app.services.startup import get_startup_report
 from datetime import datetime, timedelta
+from typing import Optional
 import uuid
 
 router = APIRouter()
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# In-memory user storage (in production, use Supabase)
-USERS = {}
+repository = get_repository()
+
+# passlib and jose (with its cryptography backend) add ~100ms to a cold
+# worker's import; they are loaded on first use or by the warm-up instead
+_pwd_context = None
+
+
+def get_pwd_context():
+    global _pwd_context
+    if _pwd_context is None:
+        from passlib.context import CryptContext
+        _pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+    return _pwd_context
+
+
+def warm_auth():
+    """Load the bcrypt backend and JWT signing before the first login"""
+    get_pwd_context().handler().get_backend()
+    from jose import jwt  # noqa: F401
+
+
+get_startup_report().add_warmer("auth", warm_auth)
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    return get_pwd_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 
 def create_access_token(data: dict, expires_delta: timedelta = None) -> str:
+    from jose import jwt
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=15))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def is_admin(user: Optional[dict]) -> bool:
+    """
+    Admins are verified accounts listed in ADMIN_EMAILS. Registration never
+    verifies an account, so `is_verified` is set out of band (in the
+    database) once the owner of the address is confirmed.
+    """
+    return bool(
+        user and user.get("is_verified") and normalize_email(user["email"]) in settings.admin_emails
+    )
+
+
+async def is_admin_token(token: str) -> bool:
+    """Whether a bearer token belongs to an admin, for middleware outside Depends"""
+    from jose import JWTError, jwt
+    try:
+        user_id = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]).get("sub")
+    except JWTError:
+        return False
+    return user_id is not None and is_admin(await repository.get_user(user_id))
+
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     """Verify JWT token and return current user"""
+    from jose import JWTError, jwt
     token = credentials.credentials
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
@@ -41,10 +88,18 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
     
-    if user_id not in USERS:
+    user = await repository.get_user(user_id)
+    if user is None:
         raise HTTPException(status_code=401, detail="User not found")
     
-    return USERS[user_id]
+    return user
+
+
+async def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    """Allow only verified accounts listed in ADMIN_EMAILS"""
+    if not is_admin(current_user):
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
 
 
 @router.post("/register", response_model=User)
@@ -52,17 +107,21 @@ async def register(user_data: UserCreate):
     """
     Register a new user
     """
+    email = normalize_email(user_data.email)
+    # Admin accounts are provisioned out of band, never self-registered
+    if email in settings.admin_emails:
+        raise HTTPException(status_code=403, detail="This email cannot be registered here")
+    
     # Check if user already exists
-    for user in USERS.values():
-        if user["email"] == user_data.email:
-            raise HTTPException(status_code=400, detail="Email already registered")
+    if await repository.get_user_by_email(email):
+        raise HTTPException(status_code=400, detail="Email already registered")
     
     user_id = str(uuid.uuid4())
     hashed_password = hash_password(user_data.password)
     
     user = {
         "id": user_id,
-        "email": user_data.email,
+        "email": email,
         "full_name": user_data.full_name,
         "phone": user_data.phone,
         "hashed_password": hashed_password,
@@ -71,7 +130,7 @@ async def register(user_data: UserCreate):
         "created_at": datetime.now().isoformat(),
     }
     
-    USERS[user_id] = user
+    await repository.save_user(user)
     
     # Return user without password
     return {k: v for k, v in user.items() if k != "hashed_password"}
@@ -82,11 +141,11 @@ async def login(credentials: UserLogin):
     """
     Login and get access token
     """
-    user = None
-    for u in USERS.values():
-        if u["email"] == credentials.email:
-            user = u
-            break
+    email = normalize_email(credentials.email)
+    user = await repository.get_user_by_email(email)
+    if user is None and email != credentials.email:
+        # Accounts registered before emails were normalised
+        user = await repository.get_user_by_email(credentials.email)
     
     if not user or not verify_password(credentials.password, user["hashed_password"]):
         raise HTTPException(status_code=401, detail="Invalid email or password")
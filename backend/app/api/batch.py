@@ -0,0 +1,94 @@
+from fastapi import APIRouter, HTTPException
+from typing import Any, Dict, List, Optional
+from app.api.tracking import find_rider, tracking_info
+from app.config import settings
+from app.models.batch import BatchLookup, BatchRequest, BatchResourceEnum, BatchResponse, BatchResult
+from app.services.batch_loader import Loader
+from app.services.metrics import metrics
+from app.services.repository import get_repository
+import asyncio
+import logging
+
+router = APIRouter()
+
+repository = get_repository()
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("batch_lookups_total", "counter", "Lookups served through POST /api/batch")
+
+NOT_FOUND = {
+    BatchResourceEnum.ORDER: "Order not found",
+    BatchResourceEnum.TRACKING: "Order not found",
+    BatchResourceEnum.RIDER: "Rider not found",
+    BatchResourceEnum.MENU_ITEM: "Menu item not found",
+}
+
+
+def select_fields(data: Any, fields: List[str]) -> Any:
+    """Keep only the (dotted) `fields` of `data`; lists are filtered item by item"""
+    tree: Dict[str, dict] = {}
+    for field in fields:
+        node = tree
+        for part in field.split("."):
+            node = node.setdefault(part, {})
+    return _pick(data, tree)
+
+
+def _pick(value: Any, tree: Dict[str, dict]) -> Any:
+    if not tree:
+        return value
+    if isinstance(value, list):
+        return [_pick(item, tree) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {key: _pick(value[key], subtree) for key, subtree in tree.items() if key in value}
+
+
+async def resolve(lookup: BatchLookup, orders: Loader) -> Optional[Any]:
+    """The resource a lookup names, as its own endpoint would return it, or None"""
+    if lookup.resource == BatchResourceEnum.ORDER:
+        return await orders.load(lookup.key)
+    if lookup.resource == BatchResourceEnum.TRACKING:
+        order = await orders.load(lookup.key)
+        return tracking_info(order) if order else None
+    if lookup.resource == BatchResourceEnum.RIDER:
+        return find_rider(lookup.key)
+    return repository.get_menu_item(lookup.key)
+
+
+async def run_lookup(lookup: BatchLookup, orders: Loader) -> BatchResult:
+    metrics.inc("batch_lookups_total", (("resource", lookup.resource.value),))
+    try:
+        data = await resolve(lookup, orders)
+    except Exception:
+        logger.exception("Batch lookup of %s %s failed", lookup.resource.value, lookup.key)
+        return BatchResult(status=500, error="Lookup failed")
+    if data is None:
+        return BatchResult(status=404, error=NOT_FOUND[lookup.resource])
+    return BatchResult(status=200, data=select_fields(data, lookup.fields) if lookup.fields else data)
+
+
+# "" so POST /api/batch (as documented) is served directly, not redirected
+@router.post("", response_model=BatchResponse)
+async def batch(request: BatchRequest):
+    """
+    Fetch several orders, tracking views, riders and menu items at once
+    
+    Lookups run concurrently and each gets the status its own endpoint
+    would have answered, so one missing resource does not fail the rest.
+    Orders are read once per batch however many lookups name them, and
+    in a single round trip where the backend supports it. Pass `fields`
+    to get back only what the screen renders.
+    """
+    if len(request.lookups) > settings.BATCH_MAX_LOOKUPS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {settings.BATCH_MAX_LOOKUPS} lookups per batch"
+        )
+    ids = [lookup.id for lookup in request.lookups]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(status_code=400, detail="Lookup ids must be unique")
+    
+    orders = Loader(repository.get_orders)
+    results = await asyncio.gather(*(run_lookup(lookup, orders) for lookup in request.lookups))
+    return BatchResponse(results=dict(zip(ids, results)))
@@ -0,0 +1,81 @@
+import asyncio
+from fastapi import APIRouter, Query, WebSocket, WebSocketDisconnect
+from typing import Optional
+from app.services.kitchen_queue import get_kitchen_queue
+from app.services.metrics import track_websocket
+from app.services.repository import get_repository
+
+router = APIRouter()
+
+kitchen_queue = get_kitchen_queue()
+kitchen_queue.menu_lookup = get_repository().get_menu_item
+
+
+@router.get("/queue")
+async def get_kitchen_queue_snapshot(
+    station: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+):
+    """
+    Get kitchen tickets in the order they should be started
+    """
+    return {
+        "version": kitchen_queue.version,
+        "station": station,
+        "tickets": kitchen_queue.snapshot(station, limit),
+    }
+
+
+@router.get("/queue/next")
+async def get_next_ticket(station: Optional[str] = None):
+    """
+    Get the most urgent ticket, optionally for one station
+    """
+    return {"ticket": kitchen_queue.peek(station)}
+
+
+@router.websocket("/ws")
+async def kitchen_websocket(websocket: WebSocket, station: Optional[str] = None):
+    """
+    WebSocket feed for kitchen screens: a snapshot on connect, then diffs
+    """
+    await websocket.accept()
+    subscriber = kitchen_queue.subscribe(station)
+
+    async def send_snapshot():
+        await websocket.send_json({
+            "type": "snapshot",
+            "version": kitchen_queue.version,
+            "tickets": kitchen_queue.snapshot(station),
+        })
+
+    async def receive():
+        # Screens only listen, but reading is what notices a closed socket.
+        # Raw frames, so a stray binary (or text) frame is ignored rather
+        # than ending the handler
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+    with track_websocket("kitchen"):
+        receiver = asyncio.create_task(receive())
+        try:
+            await send_snapshot()
+            while True:
+                next_message = asyncio.ensure_future(subscriber.queue.get())
+                await asyncio.wait((next_message, receiver), return_when=asyncio.FIRST_COMPLETED)
+                if receiver.done():
+                    next_message.cancel()
+                    receiver.result()  # Re-raises anything but a clean disconnect
+                    break
+                message = next_message.result()
+                if message["type"] == "resync":
+                    await send_snapshot()
+                else:
+                    await websocket.send_json(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+            kitchen_queue.unsubscribe(subscriber)
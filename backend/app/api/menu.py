@@ -1,62 +1,63 @@
-from fastapi import APIRouter, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from typing import List, Optional
-from app.models.menu import MenuItem, MenuItemCreate, MenuItemUpdate, MenuResponse, CategoryEnum
-from app.services.supabase_client import supabase
+from app.models.menu import (
+    MenuItem, MenuItemCreate, MenuItemUpdate, MenuResponse, MenuChangesResponse, CategoryEnum,
+    StockLevel, StockUpdate,
+)
+from app.api.auth import require_admin
+from app.config import settings
+from app.services.compression import EncodedBody, encoded_response
+from app.services.images import ImageProcessingUnavailable, get_image_pipeline
+from app.services.inventory import get_inventory
+from app.services.menu_catalog import get_menu_catalog
+from app.services.repository import get_repository, menu_branch
+from app.services.startup import get_startup_report
 from datetime import datetime
 import uuid
 
 router = APIRouter()
 
 
-# Sample menu data (in production, this would come from Supabase)
-MENU_ITEMS = [
-    {
-        "id": "breakfast-1",
-        "name": "Golden Sunrise Platter",
-        "description": "Fluffy scrambled eggs, crispy bacon, golden hash browns, and buttered toast with our signature honey drizzle",
-        "price": 4500,
-        "image_url": "https://images.unsplash.com/photo-1533089860892-a7c6f0a88666?w=800",
-        "category": "breakfast",
-        "is_available": True,
-        "dietary_tags": [],
-        "spicy_level": 0,
-        "calories": 650,
-        "ingredients": ["Eggs", "Bacon", "Potatoes", "Toast", "Honey"],
-        "created_at": datetime.now().isoformat(),
-    },
-    {
-        "id": "lunch-1",
-        "name": "Jollof Rice Royale",
-        "description": "Smoky Nigerian jollof rice with tender grilled chicken, plantain, and coleslaw",
-        "price": 5500,
-        "image_url": "https://images.unsplash.com/photo-1604329760661-e71dc83f8f26?w=800",
-        "category": "lunch",
-        "is_available": True,
-        "dietary_tags": ["halal"],
-        "spicy_level": 2,
-        "calories": 720,
-        "ingredients": ["Rice", "Tomatoes", "Chicken", "Plantain", "Spices"],
-        "created_at": datetime.now().isoformat(),
-    },
-    {
-        "id": "dinner-1",
-        "name": "Ribeye Steak Premium",
-        "description": "300g prime ribeye steak cooked to perfection with garlic butter, mashed potatoes, and seasonal vegetables",
-        "price": 15000,
-        "image_url": "https://images.unsplash.com/photo-1600891964092-4316c288032e?w=800",
-        "category": "dinner",
-        "is_available": True,
-        "dietary_tags": [],
-        "spicy_level": 0,
-        "calories": 850,
-        "ingredients": ["Ribeye", "Butter", "Potatoes", "Vegetables", "Garlic"],
-        "created_at": datetime.now().isoformat(),
-    },
-]
+repository = get_repository()
+image_pipeline = get_image_pipeline()
+inventory = get_inventory()
+
+UPLOAD_CONTENT_TYPES = ("image/jpeg", "image/png", "image/webp")
+
+# Clients may reuse a menu for a short while, then revalidate with the ETag
+MENU_CACHE_CONTROL = "public, max-age=30"
+
+
+def find_menu_item(item_id: str) -> Optional[dict]:
+    """Find a menu item by ID"""
+    return repository.get_menu_item(item_id)
+
+
+def record_menu_change(item_id: str, item: Optional[dict], previous: Optional[dict]):
+    """Move the catalog version of the branches an item left and joined"""
+    if previous is not None and (item is None or menu_branch(item) != menu_branch(previous)):
+        get_menu_catalog(menu_branch(previous)).record_delete(item_id)
+    if item is not None:
+        get_menu_catalog(menu_branch(item)).record_change(item_id)
+
+
+# Edits made on other workers, when the repository picks them up
+repository.on_menu_change = record_menu_change
+
+
+def resolve_branch(branch: Optional[str]) -> str:
+    """The branch to serve (the default if None); 404 if it is not one of BRANCHES"""
+    if branch is None:
+        return settings.default_branch
+    if branch not in settings.branches:
+        raise HTTPException(status_code=404, detail=f"Unknown branch: {branch}")
+    return branch
 
 
 @router.get("/", response_model=MenuResponse)
 async def get_menu(
+    request: Request,
+    branch: Optional[str] = None,
     category: Optional[CategoryEnum] = None,
     dietary_tags: Optional[List[str]] = Query(None),
     search: Optional[str] = None,
@@ -65,9 +66,91 @@ async def get_menu(
     per_page: int = Query(20, ge=1, le=100),
 ):
     """
-    Get all menu items with optional filtering
+    Get a branch's menu items with optional filtering
+
+    Responses are cached per branch and catalog version, precompressed
+    (gzip, and brotli when installed) and carry an ETag for conditional
+    requests. Searches and dietary tag filters (free text) are not cached
+    and are compressed at a fast level.
+    """
+    encoded = cached_menu_page(
+        resolve_branch(branch), category, dietary_tags, search, is_available, page, per_page,
+    )
+    return encoded_response(request, encoded, MENU_CACHE_CONTROL)
+
+
+@router.get("/changes", response_model=MenuChangesResponse)
+async def get_menu_changes(
+    request: Request,
+    since: int = Query(0, ge=0),
+    branch: Optional[str] = None,
+):
+    """
+    Get a branch's menu items changed or deleted since a catalog version
+
+    Pass the `version` from the last menu or changes response for the same
+    branch. If that version is too old to diff against, or was issued by
+    another worker, the whole menu comes back with `full: true`.
     """
-    items = MENU_ITEMS.copy()
+    branch = resolve_branch(branch)
+    catalog = get_menu_catalog(branch)
+
+    def build() -> bytes:
+        items, deleted, full = catalog.changes_since(since, repository.list_menu_items(branch))
+        return MenuChangesResponse(
+            version=catalog.version, full=full, items=items, deleted=deleted,
+        ).model_dump_json().encode()
+
+    # Every version this catalog cannot diff from gets the same full menu,
+    # so only versions it issued (a bounded set) make distinct cache keys
+    if catalog.knows(since):
+        encoded = catalog.cached_response(f"changes:{since}", build, fast=True)
+    else:
+        encoded = catalog.cached_response("changes:full", build)
+    return encoded_response(request, encoded, "no-cache")
+
+
+def cached_menu_page(
+    branch: str,
+    category: Optional[CategoryEnum] = None,
+    dietary_tags: Optional[List[str]] = None,
+    search: Optional[str] = None,
+    is_available: Optional[bool] = None,
+    page: int = 1,
+    per_page: int = 20,
+):
+    def build() -> bytes:
+        return build_menu_page(branch, category, dietary_tags, search, is_available, page, per_page)
+
+    if search or dietary_tags:
+        # Free text would let clients fill the cache with one-off entries
+        return EncodedBody(build(), fast=True)
+    key = repr(("list", category, is_available, page, per_page))
+    return get_menu_catalog(branch).cached_response(key, build)
+
+
+def warm_menu():
+    """Build and compress the first page of every branch's menu and of its categories"""
+    for branch in settings.branches:
+        cached_menu_page(branch)
+        for category in CategoryEnum:
+            cached_menu_page(branch, category)
+
+
+get_startup_report().add_warmer("menu", warm_menu)
+
+
+def build_menu_page(
+    branch: str,
+    category: Optional[CategoryEnum],
+    dietary_tags: Optional[List[str]],
+    search: Optional[str],
+    is_available: Optional[bool],
+    page: int,
+    per_page: int,
+) -> bytes:
+    """Filter and paginate a branch's menu into a serialized MenuResponse"""
+    items = repository.list_menu_items(branch)
     
     # Apply filters
     if category:
@@ -101,7 +184,8 @@ async def get_menu(
         total=total,
         page=page,
         per_page=per_page,
-    )
+        version=get_menu_catalog(branch).version,
+    ).model_dump_json().encode()
 
 
 @router.get("/{item_id}", response_model=MenuItem)
@@ -109,9 +193,9 @@ async def get_menu_item(item_id: str):
     """
     Get a specific menu item by ID
     """
-    for item in MENU_ITEMS:
-        if item["id"] == item_id:
-            return item
+    item = find_menu_item(item_id)
+    if item:
+        return item
     
     raise HTTPException(status_code=404, detail="Menu item not found")
 
@@ -123,11 +207,13 @@ async def create_menu_item(item: MenuItemCreate):
     """
     new_item = {
         "id": str(uuid.uuid4()),
-        **item.model_dump(),
+        **item.model_dump(mode="json"),
+        "branch": resolve_branch(item.branch),
         "created_at": datetime.now().isoformat(),
     }
-    MENU_ITEMS.append(new_item)
-    return new_item
+    saved = await repository.save_menu_item(new_item)
+    get_menu_catalog(saved["branch"]).record_change(saved["id"])
+    return saved
 
 
 @router.patch("/{item_id}", response_model=MenuItem)
@@ -135,24 +221,107 @@ async def update_menu_item(item_id: str, item_update: MenuItemUpdate):
     """
     Update a menu item (admin only)
     """
-    for i, item in enumerate(MENU_ITEMS):
-        if item["id"] == item_id:
-            update_data = item_update.model_dump(exclude_unset=True)
-            MENU_ITEMS[i] = {**item, **update_data, "updated_at": datetime.now().isoformat()}
-            return MENU_ITEMS[i]
+    item = repository.get_menu_item(item_id)
+    if item:
+        update_data = item_update.model_dump(mode="json", exclude_unset=True)
+        if "branch" in update_data:
+            update_data["branch"] = resolve_branch(update_data["branch"])
+        saved = await repository.save_menu_item(
+            {**item, **update_data, "updated_at": datetime.now().isoformat()}
+        )
+        record_menu_change(item_id, saved, item)
+        return saved
     
     raise HTTPException(status_code=404, detail="Menu item not found")
 
 
+@router.put("/{item_id}/image", response_model=MenuItem, dependencies=[Depends(require_admin)])
+async def upload_menu_item_image(item_id: str, request: Request):
+    """
+    Upload a menu item photo as the raw request body (admin only)
+    
+    The photo is resized to thumb/card/detail WebP derivatives, which are
+    returned in `image_urls`; `image_url` becomes the detail size.
+    """
+    item = repository.get_menu_item(item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type not in UPLOAD_CONTENT_TYPES:
+        raise HTTPException(status_code=415, detail=f"Upload one of: {', '.join(UPLOAD_CONTENT_TYPES)}")
+    
+    data = bytearray()
+    async for chunk in request.stream():
+        data.extend(chunk)
+        if len(data) > settings.IMAGE_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Image is too large")
+    
+    try:
+        image_urls = await image_pipeline.process_menu_image(item, bytes(data))
+    except ImageProcessingUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Re-read: the item may have been edited while the image was processed
+    item = repository.get_menu_item(item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    saved = await repository.save_menu_item({
+        **item,
+        "image_url": image_urls["detail"],
+        "image_urls": image_urls,
+        "updated_at": datetime.now().isoformat(),
+    })
+    get_menu_catalog(menu_branch(saved)).record_change(item_id)
+    return saved
+
+
+@router.get("/{item_id}/stock", response_model=StockLevel, dependencies=[Depends(require_admin)])
+async def get_menu_item_stock(item_id: str):
+    """
+    Get units left of a menu item (admin only)
+    """
+    item = repository.get_menu_item(item_id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    return StockLevel(
+        menu_item_id=item_id,
+        stock=await inventory.get_stock(item_id),
+        is_available=item["is_available"],
+    )
+
+
+@router.put("/{item_id}/stock", response_model=StockLevel, dependencies=[Depends(require_admin)])
+async def set_menu_item_stock(item_id: str, update: StockUpdate):
+    """
+    Set units left of a menu item (admin only)
+    
+    The item is marked unavailable at 0 and available again when restocked.
+    Send `null` to stop tracking stock for the item.
+    """
+    if not repository.get_menu_item(item_id):
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    await inventory.set_stock(item_id, update.stock)
+    return StockLevel(
+        menu_item_id=item_id,
+        stock=update.stock,
+        is_available=repository.get_menu_item(item_id)["is_available"],
+    )
+
+
 @router.delete("/{item_id}")
 async def delete_menu_item(item_id: str):
     """
     Delete a menu item (admin only)
     """
-    for i, item in enumerate(MENU_ITEMS):
-        if item["id"] == item_id:
-            MENU_ITEMS.pop(i)
-            return {"message": "Menu item deleted successfully"}
+    item = repository.get_menu_item(item_id)
+    if item and await repository.delete_menu_item(item_id):
+        get_menu_catalog(menu_branch(item)).record_delete(item_id)
+        return {"message": "Menu item deleted successfully"}
     
     raise HTTPException(status_code=404, detail="Menu item not found")
 
@@ -1,26 +1,221 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Header, Response
+from fastapi.responses import StreamingResponse
+from typing import Any, Awaitable, Callable, List, Optional
 from app.models.order import (
-    Order, OrderCreate, OrderUpdate, OrderResponse, 
-    OrdersListResponse, OrderStatusEnum, PaymentStatusEnum
+    Order, OrderCreate, OrderItem, OrderUpdate, OrderResponse, 
+    OrdersListResponse, OrderStatusEnum, PaymentStatusEnum, can_transition
 )
 from app.config import settings
+from app.services.kitchen_queue import KITCHEN_STATUSES, get_kitchen_queue
+from app.services.order_scheduler import get_order_scheduler
+from app.services.analytics import get_sales_rollup, warn_if_multi_worker
+from app.services.idempotency import IdempotencyKeyInFlight, IdempotencyKeyReused, get_idempotency_store
+from app.services.inventory import InsufficientStock, get_inventory, order_lines
+from app.services.order_events import TERMINAL_STATUSES, get_order_events
+from app.services.order_ids import get_order_id_generator
+from app.services.order_event_log import get_event_log
+from app.services.receipts import get_receipt_worker
+from app.services.rider_positions import get_rider_positions
+from app.services.repository import VersionConflictError, get_repository, menu_branch, order_version
 from datetime import datetime, timedelta
+import asyncio
+import json
+import time
 import uuid
-import random
-import string
 
 router = APIRouter()
 
-# In-memory orders storage (in production, use Supabase)
-ORDERS = {}
+repository = get_repository()
+kitchen_queue = get_kitchen_queue()
+order_scheduler = get_order_scheduler()
+order_events = get_order_events()
+event_log = get_event_log()
+order_ids = get_order_id_generator()
+idempotency_store = get_idempotency_store()
+receipt_worker = get_receipt_worker()
+sales_rollup = get_sales_rollup()
+inventory = get_inventory()
+
+# Seconds between SSE keep-alive comments
+EVENT_STREAM_KEEPALIVE = 15.0
+
+# Orders per repository page when startup scans walk the whole table
+STARTUP_PAGE_SIZE = 500
+
+# Re-reads of a contended order before an unconditional update gives up
+ORDER_UPDATE_ATTEMPTS = 5
 
 
 def generate_order_id() -> str:
-    """Generate a human-readable order ID"""
-    timestamp = datetime.now().strftime("%Y%m%d")
-    random_part = ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-    return f"CC-{timestamp}-{random_part}"
+    """Generate a human-readable, time-sortable order ID"""
+    return order_ids.next_id()
+
+
+def sync_kitchen(db_id: str, order: dict, previous_status: Optional[str] = None):
+    """Send an order to the kitchen, holding scheduled ones until they must be started"""
+    if order["status"] in KITCHEN_STATUSES and order.get("scheduled_time"):
+        release_at = kitchen_queue.start_by(order).timestamp()
+        if release_at > time.time():
+            kitchen_queue.remove(db_id)
+            order_scheduler.schedule(db_id, release_at)
+            return
+    
+    order_scheduler.cancel(db_id)
+    kitchen_queue.sync(db_id, order)
+
+
+async def release_scheduled_order(db_id: str):
+    """Called by the scheduler when a held order's start time arrives"""
+    order = await repository.get_order(db_id)
+    if order:
+        kitchen_queue.sync(db_id, order)
+
+
+order_scheduler.on_release = release_scheduled_order
+order_events.add_listener(event_log.record)
+order_events.add_listener(sync_kitchen)
+order_events.add_listener(receipt_worker.enqueue)
+order_events.add_listener(sales_rollup.record)
+order_events.add_listener(inventory.on_order_event)
+order_events.add_listener(get_rider_positions().on_order_event)
+
+
+async def recover_orders():
+    """Replay the order event log, restoring orders into non-durable stores"""
+    recovered = event_log.recover()
+    if not repository.durable:
+        for order in recovered.values():
+            await repository.save_order(order.to_dict())
+
+
+async def iter_orders(status: Optional[str] = None):
+    """Every order (optionally with one status), newest first, a page at a time"""
+    before = None
+    while True:
+        orders, _ = await repository.list_orders(status=status, limit=STARTUP_PAGE_SIZE, before=before)
+        for order in orders:
+            yield order
+        if len(orders) < STARTUP_PAGE_SIZE:
+            return
+        before = orders[-1]["order_id"]
+
+
+async def rebuild_sales_rollup():
+    """Count existing orders into the analytics rollup; later changes arrive as events"""
+    warn_if_multi_worker()
+    sales_rollup.reset()
+    async for order in iter_orders():
+        sales_rollup.record(order["id"], order)
+
+
+async def reload_scheduled_orders():
+    """Re-register held orders with the scheduler after a restart"""
+    for status in KITCHEN_STATUSES:
+        async for order in iter_orders(status):
+            sync_kitchen(order["id"], order)
+
+
+async def modify_order(
+    order_id: str,
+    changes: Callable[[dict], Optional[dict]],
+    expected_version: Optional[int] = None,
+) -> Optional[dict]:
+    """
+    Apply `changes(order)` (the fields to set) as a compare-and-set write.
+    
+    Status changes are checked against the transition table. On a version
+    conflict the order is re-read and `changes` re-applied, unless the
+    caller pinned expected_version (If-Match), which gets a 412 instead.
+    Returns None if the order does not exist.
+    """
+    for _ in range(ORDER_UPDATE_ATTEMPTS):
+        order = await repository.get_order(order_id)
+        if not order:
+            return None
+        version = order_version(order)
+        if expected_version is not None and version != expected_version:
+            raise HTTPException(status_code=412, detail="Order has been modified")
+        
+        update = changes(order)
+        if not update:
+            return order
+        status = update.get("status", order["status"])
+        if not can_transition(order["status"], status):
+            raise HTTPException(
+                status_code=409,
+                detail=f"Cannot change order status from {order['status']} to {status}"
+            )
+        
+        try:
+            updated = await repository.save_order(
+                {**order, **update, "version": version + 1, "updated_at": datetime.now().isoformat()},
+                expected_version=version,
+            )
+        except VersionConflictError:
+            if expected_version is not None:
+                raise HTTPException(status_code=412, detail="Order has been modified")
+            continue
+        order_events.publish(updated["id"], updated, order["status"])
+        return updated
+    
+    raise HTTPException(status_code=409, detail="Order is being updated concurrently, please retry")
+
+
+def _etag(order: dict) -> str:
+    return f'"{order_version(order)}"'
+
+
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    if if_match is None or if_match.strip() == "*":
+        return None
+    try:
+        return int(if_match.strip().removeprefix("W/").strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="Invalid If-Match header")
+
+
+async def run_idempotent(
+    scope: str,
+    key: Optional[str],
+    payload: Any,
+    call: Callable[[], Awaitable[Any]],
+    response: Response,
+):
+    """Run call() once per Idempotency-Key; retries get the stored result"""
+    if not key:
+        return await call()
+    try:
+        result, replayed = await idempotency_store.run(f"{scope}:{key}", payload, call)
+    except IdempotencyKeyReused:
+        raise HTTPException(
+            status_code=422,
+            detail="Idempotency-Key has already been used for a different request"
+        )
+    except IdempotencyKeyInFlight:
+        raise HTTPException(
+            status_code=409,
+            detail="A request with this Idempotency-Key is still being processed, retry shortly"
+        )
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+
+def price_order_items(items: List[OrderItem], branch: str) -> List[OrderItem]:
+    """Take item names and prices from the branch's menu rather than the client"""
+    priced = []
+    for item in items:
+        menu_item = repository.get_menu_item(item.menu_item_id)
+        if not menu_item:
+            raise HTTPException(status_code=400, detail=f"Menu item {item.menu_item_id} not found")
+        if menu_branch(menu_item) != branch:
+            raise HTTPException(
+                status_code=400, detail=f"{menu_item['name']} is not on the {branch} menu"
+            )
+        if not menu_item["is_available"]:
+            raise HTTPException(status_code=409, detail=f"{menu_item['name']} is not available")
+        priced.append(item.model_copy(update={"name": menu_item["name"], "price": menu_item["price"]}))
+    return priced
 
 
 def calculate_delivery_fee(subtotal: int) -> int:
@@ -31,12 +226,34 @@ def calculate_delivery_fee(subtotal: int) -> int:
 
 
 @router.post("/", response_model=OrderResponse)
-async def create_order(order_data: OrderCreate):
+async def create_order(
+    order_data: OrderCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     """
     Create a new order
+    
+    Retries sent with the same Idempotency-Key return the original order
+    instead of creating another one.
     """
+    return await run_idempotent(
+        "orders",
+        idempotency_key,
+        order_data.model_dump(mode="json"),
+        lambda: _create_order(order_data),
+        response,
+    )
+
+
+async def _create_order(order_data: OrderCreate) -> OrderResponse:
+    branch = order_data.branch or settings.default_branch
+    if branch not in settings.branches:
+        raise HTTPException(status_code=400, detail=f"Unknown branch: {branch}")
+    items = price_order_items(order_data.items, branch)
+    
     # Calculate totals
-    subtotal = sum(item.price * item.quantity for item in order_data.items)
+    subtotal = sum(item.price * item.quantity for item in items)
     delivery_fee = calculate_delivery_fee(subtotal)
     discount = 0  # TODO: Apply promo code
     total = subtotal + delivery_fee - discount
@@ -53,7 +270,7 @@ async def create_order(order_data: OrderCreate):
         id=db_id,
         order_id=order_id,
         user_id=None,  # TODO: Get from auth
-        items=order_data.items,
+        items=items,
         subtotal=subtotal,
         delivery_fee=delivery_fee,
         discount=discount,
@@ -65,9 +282,23 @@ async def create_order(order_data: OrderCreate):
         scheduled_time=order_data.scheduled_time,
         estimated_delivery=estimated_delivery,
         created_at=datetime.now(),
+        branch=branch,
     )
     
-    ORDERS[db_id] = order.model_dump()
+    # All lines or none; stock is given back if the order cannot be saved
+    lines = order_lines(item.model_dump() for item in items)
+    try:
+        await inventory.reserve(lines)
+    except InsufficientStock as e:
+        # An item deleted since pricing is named by its id
+        names = [(repository.get_menu_item(item_id) or {}).get("name", item_id) for item_id in e.item_ids]
+        raise HTTPException(status_code=409, detail=f"Not enough left of: {', '.join(names)}")
+    try:
+        saved = await repository.save_order(order.model_dump(mode="json"))
+    except Exception:
+        await inventory.release(lines)
+        raise
+    order_events.publish(db_id, saved)
     
     return OrderResponse(
         order=order,
@@ -80,73 +311,92 @@ async def get_orders(
     status: Optional[OrderStatusEnum] = None,
     page: int = Query(1, ge=1),
     per_page: int = Query(10, ge=1, le=50),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
 ):
     """
     Get all orders with optional filtering
-    """
-    orders = list(ORDERS.values())
-    
-    if status:
-        orders = [o for o in orders if o["status"] == status.value]
     
-    # Sort by created_at descending
-    orders.sort(key=lambda x: x["created_at"], reverse=True)
-    
-    total = len(orders)
-    start = (page - 1) * per_page
-    end = start + per_page
-    orders = orders[start:end]
+    Pass `cursor` instead of `page` to page through orders without offsets;
+    order IDs sort by creation time, so the cursor is just an order ID.
+    Orders from before time-sortable IDs (CC-YYYYMMDD-XXXXXX) come after
+    all newer ones, by day.
+    """
+    # Newest first
+    orders, total = await repository.list_orders(
+        status=status.value if status else None,
+        offset=0 if cursor else (page - 1) * per_page,
+        limit=per_page,
+        before=cursor,
+    )
     
     return OrdersListResponse(
         orders=orders,
         total=total,
         page=page,
         per_page=per_page,
+        next_cursor=orders[-1]["order_id"] if len(orders) == per_page else None,
     )
 
 
 @router.get("/{order_id}", response_model=Order)
-async def get_order(order_id: str):
+async def get_order(order_id: str, response: Response):
     """
     Get a specific order by ID or order_id
     """
-    # Try to find by db ID first
-    if order_id in ORDERS:
-        return ORDERS[order_id]
-    
-    # Try to find by human-readable order_id
-    for order in ORDERS.values():
-        if order["order_id"] == order_id:
-            return order
+    order = await repository.get_order(order_id)
+    if order:
+        response.headers["ETag"] = _etag(order)
+        return order
     
     raise HTTPException(status_code=404, detail="Order not found")
 
 
 @router.patch("/{order_id}", response_model=Order)
-async def update_order(order_id: str, order_update: OrderUpdate):
+async def update_order(
+    order_id: str,
+    order_update: OrderUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None, alias="If-Match"),
+):
     """
     Update order status (for kitchen/delivery staff)
+    
+    Send the ETag from a previous read as If-Match to have the update
+    rejected with 412 if someone else changed the order in between.
     """
-    order = None
-    db_id = None
+    update_data = order_update.model_dump(mode="json", exclude_unset=True)
+    updated = await modify_order(order_id, lambda order: update_data, _parse_if_match(if_match))
     
-    if order_id in ORDERS:
-        order = ORDERS[order_id]
-        db_id = order_id
-    else:
-        for oid, o in ORDERS.items():
-            if o["order_id"] == order_id:
-                order = o
-                db_id = oid
-                break
+    if not updated:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    response.headers["ETag"] = _etag(updated)
+    return updated
+
+
+@router.get("/{order_id}/receipt")
+async def get_order_receipt(order_id: str):
+    """
+    Download the PDF receipt of a delivered order
     
+    Receipts are generated in the background shortly after delivery;
+    until then this returns 404 and can be retried.
+    """
+    order = await repository.get_order(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    if order["status"] != OrderStatusEnum.DELIVERED.value:
+        raise HTTPException(status_code=409, detail="Receipts are issued once the order is delivered")
     
-    update_data = order_update.model_dump(exclude_unset=True)
-    ORDERS[db_id] = {**order, **update_data, "updated_at": datetime.now().isoformat()}
+    pdf = await receipt_worker.fetch(order)
+    if pdf is None:
+        raise HTTPException(status_code=404, detail="Receipt is not ready yet")
     
-    return ORDERS[db_id]
+    return Response(
+        content=pdf,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="receipt-{order["order_id"]}.pdf"'},
+    )
 
 
 @router.post("/{order_id}/cancel")
@@ -154,31 +404,79 @@ async def cancel_order(order_id: str):
     """
     Cancel an order
     """
-    order = None
-    db_id = None
+    def cancel(order: dict) -> Optional[dict]:
+        if order["status"] == OrderStatusEnum.CANCELLED.value:
+            return None
+        # Check if order can be cancelled
+        if not can_transition(order["status"], OrderStatusEnum.CANCELLED.value):
+            raise HTTPException(
+                status_code=400, 
+                detail="Cannot cancel order that is already on the way or delivered"
+            )
+        return {"status": OrderStatusEnum.CANCELLED.value}
     
-    if order_id in ORDERS:
-        order = ORDERS[order_id]
-        db_id = order_id
-    else:
-        for oid, o in ORDERS.items():
-            if o["order_id"] == order_id:
-                order = o
-                db_id = oid
-                break
+    if not await modify_order(order_id, cancel):
+        raise HTTPException(status_code=404, detail="Order not found")
     
+    return {"message": "Order cancelled successfully"}
+
+
+
+def _format_sse(event: dict) -> str:
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+
+@router.get("/{order_id}/events")
+async def order_events_stream(
+    order_id: str,
+    last_event_id: Optional[str] = Header(None, alias="Last-Event-ID"),
+):
+    """
+    Stream order status changes as Server-Sent Events
+    
+    Reconnecting clients send Last-Event-ID and receive only the events they
+    missed; if those have aged out, a snapshot of the current state is sent.
+    """
+    order = await repository.get_order(order_id)
     if not order:
         raise HTTPException(status_code=404, detail="Order not found")
+    db_id = order["id"]
     
-    # Check if order can be cancelled
-    if order["status"] in [OrderStatusEnum.ON_THE_WAY.value, OrderStatusEnum.DELIVERED.value]:
-        raise HTTPException(
-            status_code=400, 
-            detail="Cannot cancel order that is already on the way or delivered"
-        )
+    try:
+        resume_from = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        resume_from = 0
     
-    ORDERS[db_id]["status"] = OrderStatusEnum.CANCELLED.value
-    ORDERS[db_id]["updated_at"] = datetime.now().isoformat()
+    async def stream():
+        queue = order_events.subscribe(db_id)
+        try:
+            missed = order_events.replay(db_id, resume_from)
+            if missed is None or (not missed and not resume_from):
+                # New stream or gap in history: send current state
+                current = await repository.get_order(db_id)
+                yield _format_sse({
+                    "id": order_events.last_event_id(db_id),
+                    "event": "snapshot",
+                    "data": order_events.event_data(current),
+                })
+            else:
+                for event in missed:
+                    yield _format_sse(event)
+            
+            status = (await repository.get_order(db_id))["status"]
+            while status not in TERMINAL_STATUSES:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _format_sse(event)
+                status = event["data"]["status"]
+        finally:
+            order_events.unsubscribe(db_id, queue)
     
-    return {"message": "Order cancelled successfully"}
-
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,8 +1,18 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Header, Request, Response
 from pydantic import BaseModel
 from typing import Optional
 from app.config import settings
+from app.models.order import PaymentStatusEnum
+from app.api.orders import modify_order, run_idempotent
+from app.services.metrics import time_upstream
+from app.services.repository import get_repository
+from app.services.payment_reconciler import (
+    PaymentVerificationError, get_payment_reconciler
+)
+import hashlib
+import hmac
 import httpx
+import json
 import uuid
 
 router = APIRouter()
@@ -29,16 +39,70 @@ class VerifyPaymentResponse(BaseModel):
     paid_at: Optional[str] = None
 
 
+# Paystack transaction status -> order payment status
+PAYMENT_STATUS_MAP = {
+    "success": PaymentStatusEnum.COMPLETED,
+    "failed": PaymentStatusEnum.FAILED,
+    "reversed": PaymentStatusEnum.REFUNDED,
+}
+
+
+repository = get_repository()
+
+
+async def apply_payment_result(order_id: Optional[str], result: dict):
+    """Update an order's payment status once its transaction is final"""
+    if order_id:
+        order = await repository.get_order(order_id)
+    else:
+        # Fall back to the reference recorded on the order at initialization
+        order = await repository.get_order_by_payment_reference(result["reference"])
+    if not order:
+        return
+
+    await modify_order(order["id"], lambda current: {
+        "payment_status": PAYMENT_STATUS_MAP[result["status"]].value,
+        "payment_reference": result["reference"],
+    })
+
+
+reconciler = get_payment_reconciler()
+reconciler.on_final = apply_payment_result
+
+
+async def _track_reference(order_id: str, reference: str):
+    await modify_order(order_id, lambda order: {"payment_reference": reference})
+    reconciler.track(reference, order_id)
+
+
 @router.post("/initialize", response_model=InitializePaymentResponse)
-async def initialize_payment(request: InitializePaymentRequest):
+async def initialize_payment(
+    request: InitializePaymentRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+):
     """
     Initialize a Paystack payment
+    
+    Retries sent with the same Idempotency-Key return the original payment
+    reference instead of starting another transaction.
     """
+    return await run_idempotent(
+        "payments",
+        idempotency_key,
+        request.model_dump(),
+        lambda: _initialize_payment(request),
+        response,
+    )
+
+
+async def _initialize_payment(request: InitializePaymentRequest) -> InitializePaymentResponse:
     reference = f"chipchop_{uuid.uuid4().hex[:12]}"
     
     # In production, make actual Paystack API call
     # For now, return mock response
     if not settings.PAYSTACK_SECRET_KEY:
+        await _track_reference(request.order_id, reference)
         return InitializePaymentResponse(
             authorization_url=f"https://checkout.paystack.com/mock/{reference}",
             access_code=f"access_{reference}",
@@ -46,22 +110,23 @@ async def initialize_payment(request: InitializePaymentRequest):
         )
     
     async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "https://api.paystack.co/transaction/initialize",
-            headers={
-                "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "email": request.email,
-                "amount": request.amount,
-                "reference": reference,
-                "callback_url": request.callback_url,
-                "metadata": {
-                    "order_id": request.order_id,
+        async with time_upstream("paystack", "initialize"):
+            response = await client.post(
+                "https://api.paystack.co/transaction/initialize",
+                headers={
+                    "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
+                    "Content-Type": "application/json",
                 },
-            },
-        )
+                json={
+                    "email": request.email,
+                    "amount": request.amount,
+                    "reference": reference,
+                    "callback_url": request.callback_url,
+                    "metadata": {
+                        "order_id": request.order_id,
+                    },
+                },
+            )
         
         if response.status_code != 200:
             raise HTTPException(
@@ -77,6 +142,8 @@ async def initialize_payment(request: InitializePaymentRequest):
                 detail=data.get("message", "Payment initialization failed")
             )
         
+        await _track_reference(request.order_id, data["data"]["reference"])
+        
         return InitializePaymentResponse(
             authorization_url=data["data"]["authorization_url"],
             access_code=data["data"]["access_code"],
@@ -88,63 +155,60 @@ async def initialize_payment(request: InitializePaymentRequest):
 async def verify_payment(reference: str):
     """
     Verify a Paystack payment
+    
+    Final states are served from the reconciler's cache and pending ones are
+    re-checked upstream at most once per verification interval.
     """
-    # In production, make actual Paystack API call
-    if not settings.PAYSTACK_SECRET_KEY:
-        return VerifyPaymentResponse(
-            status="success",
-            message="Payment verified (mock)",
-            reference=reference,
-            amount=10000,
-            paid_at="2024-01-01T12:00:00Z",
-        )
+    try:
+        result = await reconciler.verify(reference)
+    except PaymentVerificationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"https://api.paystack.co/transaction/verify/{reference}",
-            headers={
-                "Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}",
-            },
-        )
-        
-        if response.status_code != 200:
-            raise HTTPException(
-                status_code=400,
-                detail="Failed to verify payment"
-            )
-        
-        data = response.json()
-        
-        if not data.get("status"):
-            raise HTTPException(
-                status_code=400,
-                detail=data.get("message", "Payment verification failed")
-            )
-        
-        payment_data = data["data"]
-        
-        return VerifyPaymentResponse(
-            status=payment_data["status"],
-            message=data["message"],
-            reference=payment_data["reference"],
-            amount=payment_data["amount"],
-            paid_at=payment_data.get("paid_at"),
-        )
+    return VerifyPaymentResponse(**result)
+
+
+def valid_signature(body: bytes, signature: Optional[str]) -> bool:
+    """Paystack signs the raw body with HMAC-SHA512 keyed by the secret key"""
+    if not settings.PAYSTACK_SECRET_KEY or not signature:
+        return False
+    expected = hmac.new(settings.PAYSTACK_SECRET_KEY.encode(), body, hashlib.sha512).hexdigest()
+    return hmac.compare_digest(expected, signature)
 
 
 @router.post("/webhook")
-async def payment_webhook(payload: dict):
+async def payment_webhook(
+    request: Request,
+    signature: Optional[str] = Header(None, alias="x-paystack-signature"),
+):
     """
     Handle Paystack webhooks
+    
+    Requests whose x-paystack-signature does not match the body are
+    rejected; without a secret key (mock mode) no webhook can be verified,
+    so all are.
     """
+    body = await request.body()
+    if not valid_signature(body, signature):
+        raise HTTPException(status_code=401, detail="Invalid webhook signature")
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid webhook payload")
+    
     event = payload.get("event")
     data = payload.get("data", {})
     
     if event == "charge.success":
         # Update order payment status
         reference = data.get("reference")
-        # TODO: Find order by payment reference and update status
-        print(f"Payment successful: {reference}")
+        metadata = data.get("metadata") or {}
+        if reference:
+            # Confirm with Paystack rather than trusting the payload
+            reconciler.track(reference, metadata.get("order_id"))
+            try:
+                await reconciler.verify(reference)
+            except PaymentVerificationError:
+                pass  # Left pending for the next reconciliation sweep
     
     return {"status": "ok"}
 
@@ -1,7 +1,11 @@
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, Dict
 from datetime import datetime
+from app.services.metrics import track_websocket
+from app.services.order_event_log import get_event_log
+from app.services.repository import get_repository
+from app.services.rider_positions import get_rider_positions
 import asyncio
 import json
 
@@ -10,6 +14,10 @@ router = APIRouter()
 # Active WebSocket connections for real-time tracking
 active_connections: Dict[str, WebSocket] = {}
 
+repository = get_repository()
+event_log = get_event_log()
+rider_positions = get_rider_positions()
+
 
 class RiderLocation(BaseModel):
     order_id: str
@@ -17,7 +25,7 @@ class RiderLocation(BaseModel):
     longitude: float
     heading: Optional[float] = None
     speed: Optional[float] = None
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = Field(default_factory=datetime.now)
 
 
 class TrackingUpdate(BaseModel):
@@ -41,32 +49,41 @@ MOCK_RIDERS = {
 }
 
 
-@router.get("/{order_id}")
-async def get_tracking_info(order_id: str):
-    """
-    Get current tracking information for an order
-    """
-    # Mock tracking data
+def find_rider(rider_id: str) -> Optional[dict]:
+    """Find a rider by ID"""
+    return MOCK_RIDERS.get(rider_id)
+
+
+def tracking_info(order: dict) -> dict:
+    """The tracking view of an order"""
+    address = order["delivery_address"]
+    position = rider_positions.get(order["id"]) or rider_positions.get(order["order_id"])
     return {
-        "order_id": order_id,
-        "status": "on_the_way",
-        "rider": MOCK_RIDERS.get("rider-1"),
-        "rider_location": {
+        "order_id": order["order_id"],
+        "status": order["status"],
+        "rider": find_rider(order.get("rider_id") or "rider-1"),
+        "rider_location": position or order.get("rider_location") or {
             "latitude": 6.4541,
             "longitude": 3.3947,
         },
         "estimated_arrival": "15 minutes",
-        "delivery_address": "123 Victoria Island, Lagos",
-        "status_history": [
-            {"status": "confirmed", "timestamp": "2024-01-01T10:00:00Z"},
-            {"status": "preparing", "timestamp": "2024-01-01T10:05:00Z"},
-            {"status": "ready", "timestamp": "2024-01-01T10:25:00Z"},
-            {"status": "picked_up", "timestamp": "2024-01-01T10:30:00Z"},
-            {"status": "on_the_way", "timestamp": "2024-01-01T10:32:00Z"},
-        ],
+        "delivery_address": f"{address['address']}, {address['city']}",
+        "status_history": event_log.history(order["id"]),
     }
 
 
+@router.get("/{order_id}")
+async def get_tracking_info(order_id: str):
+    """
+    Get current tracking information for an order
+    """
+    order = await repository.get_order(order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    return tracking_info(order)
+
+
 @router.websocket("/ws/{order_id}")
 async def tracking_websocket(websocket: WebSocket, order_id: str):
     """
@@ -75,39 +92,40 @@ async def tracking_websocket(websocket: WebSocket, order_id: str):
     await websocket.accept()
     active_connections[order_id] = websocket
     
-    try:
-        # Send initial tracking data
-        await websocket.send_json({
-            "type": "initial",
-            "order_id": order_id,
-            "status": "on_the_way",
-            "rider": MOCK_RIDERS.get("rider-1"),
-            "estimated_arrival": "15 minutes",
-        })
+    with track_websocket("tracking"):
+        try:
+            # Send initial tracking data
+            await websocket.send_json({
+                "type": "initial",
+                "order_id": order_id,
+                "status": "on_the_way",
+                "rider": MOCK_RIDERS.get("rider-1"),
+                "estimated_arrival": "15 minutes",
+            })
         
-        # Simulate real-time updates (in production, these would come from rider app)
-        while True:
-            # Wait for incoming messages or send periodic updates
-            try:
-                data = await asyncio.wait_for(websocket.receive_text(), timeout=5.0)
-                # Handle any incoming messages from client
-                message = json.loads(data)
-                if message.get("type") == "ping":
-                    await websocket.send_json({"type": "pong"})
-            except asyncio.TimeoutError:
-                # Send location update
-                await websocket.send_json({
-                    "type": "location_update",
-                    "order_id": order_id,
-                    "rider_location": {
-                        "latitude": 6.4541 + (0.001 * (datetime.now().second % 10)),
-                        "longitude": 3.3947 + (0.001 * (datetime.now().second % 10)),
-                    },
-                    "estimated_arrival": f"{15 - (datetime.now().minute % 15)} minutes",
-                })
-    except WebSocketDisconnect:
-        if order_id in active_connections:
-            del active_connections[order_id]
+            # Simulate real-time updates (in production, these would come from rider app)
+            while True:
+                # Wait for incoming messages or send periodic updates
+                try:
+                    data = await asyncio.wait_for(websocket.receive_text(), timeout=5.0)
+                    # Handle any incoming messages from client
+                    message = json.loads(data)
+                    if message.get("type") == "ping":
+                        await websocket.send_json({"type": "pong"})
+                except asyncio.TimeoutError:
+                    # Send location update
+                    await websocket.send_json({
+                        "type": "location_update",
+                        "order_id": order_id,
+                        "rider_location": {
+                            "latitude": 6.4541 + (0.001 * (datetime.now().second % 10)),
+                            "longitude": 3.3947 + (0.001 * (datetime.now().second % 10)),
+                        },
+                        "estimated_arrival": f"{15 - (datetime.now().minute % 15)} minutes",
+                    })
+        except WebSocketDisconnect:
+            if order_id in active_connections:
+                del active_connections[order_id]
 
 
 @router.post("/rider/location")
@@ -115,6 +133,15 @@ async def update_rider_location(location: RiderLocation):
     """
     Update rider location (called from rider app)
     """
+    rider_positions.update(
+        location.order_id,
+        location.latitude,
+        location.longitude,
+        location.heading,
+        location.speed,
+        location.timestamp.timestamp(),
+    )
+    
     # Broadcast to connected client
     if location.order_id in active_connections:
         websocket = active_connections[location.order_id]
@@ -141,7 +168,7 @@ async def get_rider_info(rider_id: str):
     """
     Get rider information
     """
-    rider = MOCK_RIDERS.get(rider_id)
+    rider = find_rider(rider_id)
     if not rider:
         raise HTTPException(status_code=404, detail="Rider not found")
     return rider
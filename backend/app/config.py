@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 import os
 
 
@@ -13,16 +13,84 @@ class Settings(BaseSettings):
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "your-anon-key")
     SUPABASE_SERVICE_KEY: str = os.getenv("SUPABASE_SERVICE_KEY", "your-service-key")
     
+    # Storage backend: "memory", "supabase" or "sqlite"
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "memory")
+    ORDER_JOURNAL_PATH: str = os.getenv("ORDER_JOURNAL_PATH", "data/order_journal.jsonl")
+    ORDER_FLUSH_INTERVAL: float = 1.0  # seconds between write-behind flushes
+    ORDER_FLUSH_BATCH_SIZE: int = 200  # orders per multi-row upsert
+    ORDER_CACHE_TTL: float = 2.0  # seconds a cached order is served before re-reading Postgres
+    MENU_REFRESH_INTERVAL: float = 30.0  # seconds between re-reads of the menu from Postgres
+    
+    # Local SQLite store (single-node kiosks)
+    SQLITE_PATH: str = os.getenv("SQLITE_PATH", "data/chipchop.db")
+    SQLITE_POOL_SIZE: int = 4
+    SQLITE_SYNC_ENABLED: bool = True  # replicate local writes to Supabase
+    SQLITE_SYNC_INTERVAL: float = 5.0  # seconds between replication attempts
+    
+    # Order IDs: a node number unique per worker process (0-1022). Unset means 0,
+    # which is refused with several workers unless nodes are leased from Redis
+    NODE_ID: Optional[int] = int(os.environ["NODE_ID"]) if os.getenv("NODE_ID") else None
+    NODE_ID_BACKEND: str = os.getenv("NODE_ID_BACKEND", "static")  # "static" or "redis" (uses REDIS_URL)
+    
+    # Idempotency-Key replay store
+    IDEMPOTENCY_BACKEND: str = os.getenv("IDEMPOTENCY_BACKEND", "memory")  # "memory" (per worker) or "redis" (uses REDIS_URL)
+    IDEMPOTENCY_TTL_HOURS: float = 24  # how long a key's response is replayed
+    IDEMPOTENCY_MAX_KEYS: int = 100000  # memory backend: oldest keys are evicted beyond this
+    
+    # Order event log
+    EVENT_LOG_DIR: str = os.getenv("EVENT_LOG_DIR", "data/events")
+    EVENT_LOG_SNAPSHOT_EVERY: int = 10000  # records between snapshots
+    EVENT_LOG_RETENTION_HOURS: float = 24  # keep finished orders in snapshots this long
+    
+    # Menu images: "local" (MEDIA_DIR served at MEDIA_URL) or "supabase" (Storage buckets)
+    IMAGE_STORAGE_BACKEND: str = os.getenv("IMAGE_STORAGE_BACKEND", "local")
+    MEDIA_DIR: str = os.getenv("MEDIA_DIR", "data/media")
+    MEDIA_URL: str = os.getenv("MEDIA_URL", "/media")
+    IMAGE_WORKERS: int = 2  # processes resizing uploads
+    IMAGE_MAX_UPLOAD_BYTES: int = 5 * 1024 * 1024  # menu-images bucket limit
+    
+    # Receipt PDFs for delivered orders: "local" (RECEIPTS_DIR, never served) or "supabase"
+    RECEIPT_STORAGE_BACKEND: str = os.getenv("RECEIPT_STORAGE_BACKEND", "local")
+    RECEIPTS_DIR: str = os.getenv("RECEIPTS_DIR", "data/private")
+    RECEIPT_WORKERS: int = 1  # processes rendering PDFs
+    RECEIPT_BATCH_SIZE: int = 20  # receipts rendered per process pool call
+    RECEIPT_BATCH_WAIT: float = 2.0  # seconds to gather a batch
+    RECEIPT_RETRY_DELAY: float = 5.0  # seconds before retrying a failed receipt, doubling per attempt
+    
     # JWT Settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-super-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    # Branches: comma-separated ids, each with its own menu; the first is the default
+    BRANCHES: str = os.getenv("BRANCHES", "main")
+    
+    # Batch lookups (POST /api/batch)
+    BATCH_MAX_LOOKUPS: int = 25  # lookups per batch request
+    
+    # Admin access (profiling, analytics, stock, images, tracing): comma-separated
+    # emails of accounts marked is_verified in the database; they cannot self-register
+    ADMIN_EMAILS: str = os.getenv("ADMIN_EMAILS", "")
+    
+    # Sales analytics rollups
+    ANALYTICS_RETENTION_DAYS: int = 90  # hourly counters kept in memory, per worker
+    ANALYTICS_UTC_OFFSET_HOURS: int = 1  # business day boundaries (WAT)
+    
+    # Diagnostics
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"  # honour X-Trace from admins
+    PROFILER_MAX_SECONDS: int = 60  # longest profile an admin can request
+    
     # Payment Settings
     PAYSTACK_SECRET_KEY: str = os.getenv("PAYSTACK_SECRET_KEY", "")
     PAYSTACK_PUBLIC_KEY: str = os.getenv("PAYSTACK_PUBLIC_KEY", "")
     FLUTTERWAVE_SECRET_KEY: str = os.getenv("FLUTTERWAVE_SECRET_KEY", "")
     
+    # Payment reconciliation (background Paystack verification)
+    PAYSTACK_VERIFY_INTERVAL: float = 10.0  # seconds between checks of a pending reference
+    PAYSTACK_VERIFY_CONCURRENCY: int = 5  # max simultaneous Paystack calls
+    PAYSTACK_VERIFY_BATCH_SIZE: int = 50  # references verified per sweep
+    PAYSTACK_FINAL_CACHE_SIZE: int = 100000  # final results kept for repeated polls
+    
     # CORS
     CORS_ORIGINS: List[str] = [
         "http://localhost:3000",
@@ -33,10 +101,48 @@ class Settings(BaseSettings):
     # Redis (for Celery)
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     
+    # Rate limiting (token buckets per client)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "memory")  # "memory" or "redis"
+    RATE_LIMIT_LOGIN_PER_MINUTE: int = 5  # per IP
+    RATE_LIMIT_SIGNUP_PER_MINUTE: int = 3  # per IP
+    RATE_LIMIT_DEFAULT_PER_MINUTE: int = 300  # per user (or IP) across /api
+    RATE_LIMIT_DEFAULT_BURST: int = 60
+    TRUST_PROXY_HEADERS: bool = False  # take the client IP from X-Forwarded-For
+    
+    # Inventory: "memory" (one worker) or "redis" (shared stock across workers)
+    INVENTORY_BACKEND: str = os.getenv("INVENTORY_BACKEND", "memory")
+    INVENTORY_FLUSH_INTERVAL: float = 5.0  # seconds between stock write-backs
+    
+    # Admission control (load shedding)
+    ADMISSION_ENABLED: bool = True
+    ADMISSION_MAX_IN_FLIGHT: int = 200  # concurrent requests per worker
+    ADMISSION_MAX_STREAMS: int = 2000  # open order event streams per worker, counted separately
+    ADMISSION_LAG_LOW: float = 0.1  # shed menu browsing above this event loop lag (s)
+    ADMISSION_LAG_NORMAL: float = 0.5  # shed everything but checkout/tracking above this
+    
+    # Readiness (/health/ready): dependency probes run in the background
+    HEALTH_PROBE_INTERVAL: float = 10.0  # seconds between probe rounds
+    HEALTH_PROBE_TIMEOUT: float = 3.0
+    HEALTH_MAX_LOOP_LAG: float = 0.5  # not ready above this sustained event loop lag (s)
+    HEALTH_MAX_SATURATION: float = 0.8  # not ready above this share of ADMISSION_MAX_IN_FLIGHT
+    
     # Delivery Settings
     DELIVERY_FEE: int = 1500  # NGN
     FREE_DELIVERY_THRESHOLD: int = 10000  # NGN
     
+    @property
+    def admin_emails(self) -> List[str]:
+        return [email.strip().lower() for email in self.ADMIN_EMAILS.split(",") if email.strip()]
+    
+    @property
+    def branches(self) -> List[str]:
+        return [branch.strip() for branch in self.BRANCHES.split(",") if branch.strip()] or ["main"]
+    
+    @property
+    def default_branch(self) -> str:
+        return self.branches[0]
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
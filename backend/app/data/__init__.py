@@ -0,0 +1 @@
+# Seed data
@@ -0,0 +1,47 @@
+from datetime import datetime
+
+# Sample menu data used by the in-memory store (in production, this comes from Supabase)
+SAMPLE_MENU_ITEMS = [
+    {
+        "id": "breakfast-1",
+        "name": "Golden Sunrise Platter",
+        "description": "Fluffy scrambled eggs, crispy bacon, golden hash browns, and buttered toast with our signature honey drizzle",
+        "price": 4500,
+        "image_url": "https://images.unsplash.com/photo-1533089860892-a7c6f0a88666?w=800",
+        "category": "breakfast",
+        "is_available": True,
+        "dietary_tags": [],
+        "spicy_level": 0,
+        "calories": 650,
+        "ingredients": ["Eggs", "Bacon", "Potatoes", "Toast", "Honey"],
+        "created_at": datetime.now().isoformat(),
+    },
+    {
+        "id": "lunch-1",
+        "name": "Jollof Rice Royale",
+        "description": "Smoky Nigerian jollof rice with tender grilled chicken, plantain, and coleslaw",
+        "price": 5500,
+        "image_url": "https://images.unsplash.com/photo-1604329760661-e71dc83f8f26?w=800",
+        "category": "lunch",
+        "is_available": True,
+        "dietary_tags": ["halal"],
+        "spicy_level": 2,
+        "calories": 720,
+        "ingredients": ["Rice", "Tomatoes", "Chicken", "Plantain", "Spices"],
+        "created_at": datetime.now().isoformat(),
+    },
+    {
+        "id": "dinner-1",
+        "name": "Ribeye Steak Premium",
+        "description": "300g prime ribeye steak cooked to perfection with garlic butter, mashed potatoes, and seasonal vegetables",
+        "price": 15000,
+        "image_url": "https://images.unsplash.com/photo-1600891964092-4316c288032e?w=800",
+        "category": "dinner",
+        "is_available": True,
+        "dietary_tags": [],
+        "spicy_level": 0,
+        "calories": 850,
+        "ingredients": ["Ribeye", "Butter", "Potatoes", "Vegetables", "Garlic"],
+        "created_at": datetime.now().isoformat(),
+    },
+]
@@ -1,18 +1,87 @@
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
+import os
 
-from app.api import menu, orders, auth, payments, tracking
-from app.config import settings
+# Imported before anything heavy: it starts the startup clock
+from app.services.startup import get_startup_report
+
+startup_report = get_startup_report()
+
+with startup_report.measure("import fastapi"):
+    from fastapi import FastAPI
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, PlainTextResponse
+
+with startup_report.measure("import app.config"):
+    from app.config import settings
+
+menu, orders, auth, payments, tracking, kitchen, admin, batch = (
+    startup_report.import_module(f"app.api.{name}")
+    for name in ("menu", "orders", "auth", "payments", "tracking", "kitchen", "admin", "batch")
+)
+
+with startup_report.measure("import app.services"):
+    from app.services.admission import AdmissionControlMiddleware
+    from app.services.health import get_health_monitor
+    from app.services.images import ImmutableStaticFiles, get_image_pipeline
+    from app.services.inventory import get_inventory
+    from app.services.metrics import MetricsMiddleware, get_loop_monitor, get_metrics
+    from app.services.rate_limit import RateLimitMiddleware
+    from app.services.tracing import TracingMiddleware, instrument_fastapi
+    from app.services.payment_reconciler import get_payment_reconciler
+    from app.services.receipts import get_receipt_worker
+    from app.services.order_ids import get_node_lease
+    from app.services.order_scheduler import get_order_scheduler
+    from app.services.repository import get_repository
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Starting Chip Chop API...")
+    loop_monitor = get_loop_monitor()
+    loop_monitor.start()
+    node_lease = get_node_lease()
+    if node_lease is not None:
+        with startup_report.measure("node_lease.start"):
+            await node_lease.start()
+    repository = get_repository()
+    with startup_report.measure("repository.start"):
+        await repository.start()
+    inventory = get_inventory()
+    with startup_report.measure("inventory.start"):
+        await inventory.start()
+    with startup_report.measure("recover_orders"):
+        await orders.recover_orders()
+    with startup_report.measure("rebuild_sales_rollup"):
+        await orders.rebuild_sales_rollup()
+    reconciler = get_payment_reconciler()
+    reconciler.start()
+    scheduler = get_order_scheduler()
+    with startup_report.measure("reload_scheduled_orders"):
+        await orders.reload_scheduled_orders()
+    scheduler.start()
+    receipt_worker = get_receipt_worker()
+    receipt_worker.start()
+    health_monitor = get_health_monitor()
+    health_monitor.start()
+    # /health reports "starting" until the caches are warm
+    warm_up = asyncio.create_task(startup_report.warm_up())
     yield
     # Shutdown
     print("👋 Shutting down Chip Chop API...")
+    await health_monitor.stop()  # readiness now reports draining
+    warm_up.cancel()
+    scheduler.stop()
+    await receipt_worker.stop()
+    await inventory.stop()
+    await reconciler.stop()
+    await repository.stop()
+    if node_lease is not None:
+        await node_lease.stop()
+    get_image_pipeline().shutdown()
+    await orders.event_log.close()
+    await loop_monitor.stop()
 
 
 app = FastAPI(
@@ -22,6 +91,12 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# Load protection; added before CORS so rejections still carry CORS headers
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+if settings.ADMISSION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+
 # CORS Configuration
 app.add_middleware(
     CORSMiddleware,
@@ -31,12 +106,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency histograms for /metrics
+app.add_middleware(MetricsMiddleware)
+
+# Opt-in per-request spans for admins (X-Trace header -> Server-Timing)
+if settings.TRACING_ENABLED:
+    instrument_fastapi()
+    app.add_middleware(TracingMiddleware, authorize=auth.is_admin_token)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(menu.router, prefix="/api/menu", tags=["Menu"])
 app.include_router(orders.router, prefix="/api/orders", tags=["Orders"])
 app.include_router(payments.router, prefix="/api/payments", tags=["Payments"])
 app.include_router(tracking.router, prefix="/api/tracking", tags=["Tracking"])
+app.include_router(kitchen.router, prefix="/api/kitchen", tags=["Kitchen"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"])
+app.include_router(batch.router, prefix="/api/batch", tags=["Batch"])
+
+# Local stand-in for Supabase Storage public buckets
+if settings.IMAGE_STORAGE_BACKEND == "local":
+    os.makedirs(settings.MEDIA_DIR, exist_ok=True)
+    app.mount(settings.MEDIA_URL, ImmutableStaticFiles(directory=settings.MEDIA_DIR), name="media")
 
 
 @app.get("/")
@@ -50,5 +141,32 @@ async def root():
 
 @app.get("/health")
 async def health_check():
+    if not startup_report.ready:
+        return JSONResponse({"status": "starting", "service": "chipchop-api"}, status_code=503)
     return {"status": "healthy", "service": "chipchop-api"}
 
+
+@app.get("/health/live")
+async def liveness_check():
+    """The worker's event loop is answering; restart it if this fails"""
+    return get_health_monitor().liveness()
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Whether this worker should get traffic: warmed up, critical
+    dependencies reachable (from cached background probes) and not
+    saturated. 503 tells the load balancer to route around it.
+    """
+    report = get_health_monitor().readiness()
+    return JSONResponse(report, status_code=200 if report["status"] == "ready" else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def prometheus_metrics():
+    """Prometheus text-format metrics"""
+    return PlainTextResponse(
+        get_metrics().render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8",
+    )
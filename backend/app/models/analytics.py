@@ -0,0 +1,33 @@
+from pydantic import BaseModel
+from typing import List
+from datetime import datetime
+
+
+class SalesBucket(BaseModel):
+    start: datetime
+    orders: int
+    paid: int
+    revenue: int
+    items: int
+    cancelled: int
+    average_basket: int
+
+
+class TopMenuItem(BaseModel):
+    menu_item_id: str
+    name: str
+    units: int
+
+
+class SalesAnalytics(BaseModel):
+    start: datetime
+    end: datetime
+    granularity: str
+    orders: int
+    paid: int  # orders whose payment completed, cancelled ones excluded
+    revenue: int  # NGN, paid orders only
+    items: int
+    cancelled: int
+    average_basket: int
+    series: List[SalesBucket]
+    top_items: List[TopMenuItem]
@@ -0,0 +1,33 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List, Optional
+from enum import Enum
+
+
+class BatchResourceEnum(str, Enum):
+    ORDER = "order"  # key: db ID or order_id, as GET /api/orders/{order_id}
+    TRACKING = "tracking"  # key: db ID or order_id, as GET /api/tracking/{order_id}
+    RIDER = "rider"  # key: rider ID, as GET /api/tracking/rider/{rider_id}
+    MENU_ITEM = "menu_item"  # key: menu item ID, as GET /api/menu/{item_id}
+
+
+class BatchLookup(BaseModel):
+    id: str = Field(..., min_length=1, max_length=64)  # names the result in the response
+    resource: BatchResourceEnum
+    key: str
+    # Fields to return, dotted for nested ones (e.g. "delivery_address.city",
+    # "items.name"); every field if omitted
+    fields: Optional[List[str]] = None
+
+
+class BatchRequest(BaseModel):
+    lookups: List[BatchLookup] = Field(..., min_length=1)
+
+
+class BatchResult(BaseModel):
+    status: int  # what the single-resource endpoint would have answered
+    data: Optional[Any] = None
+    error: Optional[str] = None
+
+
+class BatchResponse(BaseModel):
+    results: Dict[str, BatchResult]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Dict, List, Optional
 from enum import Enum
 from datetime import datetime
 
@@ -23,6 +23,8 @@ class MenuItemBase(BaseModel):
     calories: int = Field(0, ge=0)
     ingredients: List[str] = []
     image_url: Optional[str] = None
+    preparation_time: int = Field(15, ge=0)  # minutes
+    branch: Optional[str] = None  # None: the default branch
 
 
 class MenuItemCreate(MenuItemBase):
@@ -40,10 +42,13 @@ class MenuItemUpdate(BaseModel):
     calories: Optional[int] = Field(None, ge=0)
     ingredients: Optional[List[str]] = None
     image_url: Optional[str] = None
+    preparation_time: Optional[int] = Field(None, ge=0)
+    branch: Optional[str] = None  # moves the item to another branch's menu
 
 
 class MenuItem(MenuItemBase):
     id: str
+    image_urls: Optional[Dict[str, str]] = None  # WebP derivatives: thumb, card, detail
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -56,4 +61,22 @@ class MenuResponse(BaseModel):
     total: int
     page: int
     per_page: int
+    version: Optional[int] = None  # catalog version, for /api/menu/changes
 
+
+class MenuChangesResponse(BaseModel):
+    version: int
+    full: bool  # items is the whole menu; replace the local copy
+    items: List[MenuItem]
+    deleted: List[str] = []
+
+
+
+class StockUpdate(BaseModel):
+    stock: Optional[int] = Field(None, ge=0)  # None stops tracking the item
+
+
+class StockLevel(BaseModel):
+    menu_item_id: str
+    stock: Optional[int] = None  # None: not tracked, never sells out
+    is_available: bool
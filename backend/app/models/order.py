@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional, Set
 from enum import Enum
 from datetime import datetime
 
@@ -15,6 +15,26 @@ class OrderStatusEnum(str, Enum):
     CANCELLED = "cancelled"
 
 
+# Status changes an order may make; every order write is checked against this
+ORDER_TRANSITIONS: Dict[OrderStatusEnum, Set[OrderStatusEnum]] = {
+    OrderStatusEnum.PENDING: {OrderStatusEnum.CONFIRMED, OrderStatusEnum.CANCELLED},
+    OrderStatusEnum.CONFIRMED: {OrderStatusEnum.PREPARING, OrderStatusEnum.CANCELLED},
+    OrderStatusEnum.PREPARING: {OrderStatusEnum.READY, OrderStatusEnum.CANCELLED},
+    OrderStatusEnum.READY: {OrderStatusEnum.PICKED_UP, OrderStatusEnum.CANCELLED},
+    OrderStatusEnum.PICKED_UP: {OrderStatusEnum.ON_THE_WAY, OrderStatusEnum.CANCELLED},
+    OrderStatusEnum.ON_THE_WAY: {OrderStatusEnum.DELIVERED},
+    OrderStatusEnum.DELIVERED: set(),
+    OrderStatusEnum.CANCELLED: set(),
+}
+
+
+def can_transition(current: str, new: str) -> bool:
+    """Whether an order in status `current` may move to `new`"""
+    if current == new:
+        return True
+    return OrderStatusEnum(new) in ORDER_TRANSITIONS[OrderStatusEnum(current)]
+
+
 class PaymentMethodEnum(str, Enum):
     CARD = "card"
     WALLET = "wallet"
@@ -55,6 +75,7 @@ class OrderCreate(BaseModel):
     payment_method: PaymentMethodEnum
     discount_code: Optional[str] = None
     special_instructions: Optional[str] = None
+    branch: Optional[str] = None  # None: the default branch
 
 
 class OrderUpdate(BaseModel):
@@ -75,6 +96,7 @@ class Order(BaseModel):
     status: OrderStatusEnum
     payment_status: PaymentStatusEnum
     payment_method: PaymentMethodEnum
+    payment_reference: Optional[str] = None
     delivery_address: DeliveryAddress
     scheduled_time: Optional[datetime] = None
     rider_id: Optional[str] = None
@@ -82,6 +104,8 @@ class Order(BaseModel):
     estimated_delivery: Optional[datetime] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
+    version: int = 0  # Incremented on every write, exposed as the ETag
+    branch: Optional[str] = None  # Branch whose menu the order was priced from
 
     class Config:
         from_attributes = True
@@ -97,4 +121,5 @@ class OrdersListResponse(BaseModel):
     total: int
     page: int
     per_page: int
+    next_cursor: Optional[str] = None  # pass as `cursor` to get the next (older) page
 
@@ -0,0 +1,114 @@
+from typing import Tuple
+
+from app.config import settings
+from app.services.metrics import LoopLagMonitor, get_loop_monitor, metrics
+from app.services.rate_limit import send_json_error
+
+metrics.describe("requests_shed_total", "counter", "Requests rejected by admission control")
+metrics.describe("requests_in_flight", "gauge", "HTTP requests currently being handled")
+metrics.describe("streams_open", "gauge", "Server-sent event streams currently open")
+
+LOW, NORMAL, HIGH = "low", "normal", "high"
+
+# Checkout, payment and tracking keep working longest; browsing goes first
+PRIORITY_PREFIXES: Tuple[Tuple[str, str], ...] = (
+    ("/api/orders", HIGH),
+    ("/api/payments", HIGH),
+    ("/api/tracking", HIGH),
+    ("/api/kitchen", HIGH),
+    ("/api/menu", LOW),
+)
+
+# Share of the in-flight limit each priority may use
+CAPACITY_SHARE = {LOW: 0.5, NORMAL: 0.8, HIGH: 1.0}
+
+
+def is_stream(scope) -> bool:
+    """Long-lived server-sent event streams (GET /api/orders/{id}/events)"""
+    return scope["method"] == "GET" and scope["path"].endswith("/events")
+
+
+def request_priority(path: str) -> str:
+    for prefix, priority in PRIORITY_PREFIXES:
+        if path.startswith(prefix):
+            return priority
+    return NORMAL
+
+
+class AdmissionControlMiddleware:
+    """
+    Sheds load before the worker falls over, cheapest traffic first.
+
+    A request is rejected with 503 + Retry-After when the number of
+    requests in flight exceeds its priority's share of `max_in_flight`,
+    or when sustained event loop lag (see LoopLagMonitor) is above that
+    priority's threshold: browsing is shed at `lag_low`, other non-critical
+    routes at `lag_normal`, and checkout/tracking only on concurrency.
+
+    Event streams stay open for as long as a customer watches an order,
+    so they are not requests in flight: they have a limit of their own
+    (`max_streams`) and never take capacity from short requests.
+    """
+
+    def __init__(
+        self,
+        app,
+        max_in_flight: int = None,
+        lag_low: float = None,
+        lag_normal: float = None,
+        monitor: LoopLagMonitor = None,
+        max_streams: int = None,
+    ):
+        self.app = app
+        self.max_in_flight = max_in_flight or settings.ADMISSION_MAX_IN_FLIGHT
+        self.max_streams = max_streams or settings.ADMISSION_MAX_STREAMS
+        self.lag_limits = {
+            LOW: lag_low or settings.ADMISSION_LAG_LOW,
+            NORMAL: lag_normal or settings.ADMISSION_LAG_NORMAL,
+            HIGH: float("inf"),
+        }
+        self.monitor = monitor or get_loop_monitor()
+        self.in_flight = 0
+        self.streams = 0
+
+    def admit(self, priority: str) -> bool:
+        if self.in_flight >= self.max_in_flight * CAPACITY_SHARE[priority]:
+            return False
+        return self.monitor.sustained_lag <= self.lag_limits[priority]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        if is_stream(scope):
+            await self._stream(scope, receive, send)
+            return
+
+        priority = request_priority(scope["path"])
+        if not self.admit(priority):
+            metrics.inc("requests_shed_total", (("priority", priority),))
+            await send_json_error(send, 503, "Server is busy, please retry shortly", 1)
+            return
+
+        self.in_flight += 1
+        metrics.set_gauge("requests_in_flight", self.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            metrics.set_gauge("requests_in_flight", self.in_flight)
+
+    async def _stream(self, scope, receive, send):
+        if self.streams >= self.max_streams:
+            metrics.inc("requests_shed_total", (("priority", "stream"),))
+            await send_json_error(send, 503, "Server is busy, please retry shortly", 5)
+            return
+
+        self.streams += 1
+        metrics.set_gauge("streams_open", self.streams)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.streams -= 1
+            metrics.set_gauge("streams_open", self.streams)
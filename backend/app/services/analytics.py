@@ -0,0 +1,235 @@
+import logging
+import os
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+try:
+    import numpy as np
+except ImportError:  # optional dependency; range sums fall back to Python loops
+    np = None
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CANCELLED = "cancelled"
+PAID = "completed"
+COLUMNS = ("orders", "paid", "revenue", "items", "cancelled")
+
+
+def _column(size: int, fill: int = 0):
+    if np is not None:
+        return np.full(size, fill, dtype=np.int64)
+    return array("q", [fill]) * size
+
+
+class SalesRollup:
+    """
+    Hourly sales counters kept up to date as orders change, so dashboard
+    queries never scan orders.
+
+    Each counter is a column: a fixed array with one slot per hour of the
+    retention window, used as a ring (`hour % size`). `_slot_hour` records
+    which hour a slot currently holds, so a slot is zeroed lazily when the
+    ring wraps onto it. Orders are counted in the hour they were placed;
+    a cancellation takes the order back out of order and item counts and
+    adds it to `cancelled`. Revenue (and `paid`) only count orders whose
+    payment completed and that are not cancelled; `_paid` remembers which
+    orders of each hour are in it, so a payment settling, failing or being
+    refunded later moves the order in or out exactly once. Queries cost
+    O(window x menu size) whatever the order history, using NumPy when it
+    is installed.
+
+    The counters live in this process and only see the order events this
+    worker publishes, so they are only complete with a single worker;
+    with several (WEB_CONCURRENCY > 1) each reports its own share after
+    boot. Startup logs a warning in that case.
+    """
+
+    def __init__(self, retention_hours: int = 24 * 90, utc_offset_hours: int = 1):
+        self.size = retention_hours
+        self.tz = timezone(timedelta(hours=utc_offset_hours))
+        self.offset = utc_offset_hours
+        self.reset()
+
+    def reset(self):
+        self._slot_hour = _column(self.size, -1)
+        self._columns = {name: _column(self.size) for name in COLUMNS}
+        self._item_units: Dict[str, Sequence[int]] = {}
+        self._item_names: Dict[str, str] = {}
+        # hour -> db ids of the orders counted in that hour's revenue
+        self._paid: Dict[int, Set[str]] = {}
+        self._latest_hour = -1
+
+    # Time
+    def hour_of(self, value) -> int:
+        """Local hour index (hours since the epoch, shifted to the business time zone)"""
+        if isinstance(value, str):
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        return int(value.timestamp() // 3600) + self.offset
+
+    def current_hour(self) -> int:
+        return self.hour_of(datetime.now(timezone.utc))
+
+    def hour_start(self, hour: int) -> datetime:
+        return datetime.fromtimestamp((hour - self.offset) * 3600, self.tz)
+
+    # Updates
+    def _slot(self, hour: int, create: bool) -> Optional[int]:
+        """The slot holding `hour`, claiming (and zeroing) it if `create`"""
+        if hour <= self._latest_hour - self.size:
+            return None  # older than the retention window
+        slot = hour % self.size
+        if self._slot_hour[slot] != hour:
+            if not create:
+                return None
+            self._paid.pop(self._slot_hour[slot], None)
+            self._slot_hour[slot] = hour
+            for column in self._columns.values():
+                column[slot] = 0
+            for column in self._item_units.values():
+                column[slot] = 0
+        self._latest_hour = max(self._latest_hour, hour)
+        return slot
+
+    def _apply(self, order: dict, sign: int):
+        slot = self._slot(self.hour_of(order["created_at"]), create=sign > 0)
+        if slot is None:
+            return
+        self._columns["orders"][slot] += sign
+        for item in order["items"]:
+            self._columns["items"][slot] += sign * item["quantity"]
+            units = self._item_units.get(item["menu_item_id"])
+            if units is None:
+                units = self._item_units[item["menu_item_id"]] = _column(self.size)
+            units[slot] += sign * item["quantity"]
+            self._item_names[item["menu_item_id"]] = item["name"]
+
+    def _count_cancelled(self, order: dict):
+        slot = self._slot(self.hour_of(order["created_at"]), create=True)
+        if slot is not None:
+            self._columns["cancelled"][slot] += 1
+
+    def _record_revenue(self, db_id: str, order: dict):
+        """Move the order into or out of revenue if its payment or status changed that"""
+        hour = self.hour_of(order["created_at"])
+        counted = db_id in self._paid.get(hour, ())
+        earned = order.get("payment_status") == PAID and order["status"] != CANCELLED
+        if earned == counted:
+            return
+        slot = self._slot(hour, create=earned)
+        if slot is None:
+            return
+        sign = 1 if earned else -1
+        self._columns["paid"][slot] += sign
+        self._columns["revenue"][slot] += sign * order["total"]
+        if earned:
+            self._paid.setdefault(hour, set()).add(db_id)
+        else:
+            self._paid[hour].discard(db_id)
+
+    def record(self, db_id: str, order: dict, previous_status: Optional[str] = None):
+        """Order listener: count new orders, take cancelled ones back out and track payment"""
+        status = order["status"]
+        if previous_status is None:
+            if status == CANCELLED:
+                self._count_cancelled(order)
+            else:
+                self._apply(order, 1)
+        elif status == CANCELLED and previous_status != CANCELLED:
+            self._apply(order, -1)
+            self._count_cancelled(order)
+        self._record_revenue(db_id, order)
+
+    def rebuild(self, orders: Iterable[dict]):
+        """Recount from scratch, e.g. from the repository at startup"""
+        self.reset()
+        for order in orders:
+            self.record(order["id"], order)
+
+    # Queries
+    def _window(self, column, start: int, end: int):
+        """Per-hour values of a column for hours [start, end); stale slots read as 0"""
+        if np is not None:
+            hours = np.arange(start, end)
+            slots = hours % self.size
+            return np.where(self._slot_hour[slots] == hours, column[slots], 0)
+        return [
+            column[hour % self.size] if self._slot_hour[hour % self.size] == hour else 0
+            for hour in range(start, end)
+        ]
+
+    @staticmethod
+    def _total(values) -> int:
+        return int(values.sum()) if np is not None else sum(values)
+
+    @staticmethod
+    def _buckets(values, width: int) -> List[int]:
+        if np is not None:
+            return values.reshape(-1, width).sum(axis=1).tolist()
+        return [sum(values[i:i + width]) for i in range(0, len(values), width)]
+
+    def report(self, days: int, granularity: str = "day", top: int = 10) -> dict:
+        """Totals, a per-hour or per-day series and best sellers for the last `days` days"""
+        # Whole local days, today included
+        end = (self.current_hour() // 24 + 1) * 24
+        start = end - days * 24
+        width = 24 if granularity == "day" else 1
+
+        series = {name: self._buckets(self._window(column, start, end), width) for name, column in self._columns.items()}
+        buckets = []
+        for index in range(len(series["orders"])):
+            paid, revenue = series["paid"][index], series["revenue"][index]
+            buckets.append({
+                "start": self.hour_start(start + index * width),
+                "orders": series["orders"][index],
+                "paid": paid,
+                "revenue": revenue,
+                "items": series["items"][index],
+                "cancelled": series["cancelled"][index],
+                "average_basket": round(revenue / paid) if paid else 0,
+            })
+
+        paid, revenue = sum(series["paid"]), sum(series["revenue"])
+        best_sellers = []
+        for item_id, column in self._item_units.items():
+            units = self._total(self._window(column, start, end))
+            if units > 0:
+                best_sellers.append({"menu_item_id": item_id, "name": self._item_names[item_id], "units": units})
+        best_sellers.sort(key=lambda item: item["units"], reverse=True)
+
+        return {
+            "start": self.hour_start(start),
+            "end": self.hour_start(end),
+            "granularity": granularity,
+            "orders": sum(series["orders"]),
+            "paid": paid,
+            "revenue": revenue,
+            "items": sum(series["items"]),
+            "cancelled": sum(series["cancelled"]),
+            "average_basket": round(revenue / paid) if paid else 0,
+            "series": buckets,
+            "top_items": best_sellers[:top],
+        }
+
+
+def warn_if_multi_worker():
+    """The rollup is per process; say so when workers split the order events"""
+    workers = int(os.getenv("WEB_CONCURRENCY") or 1)
+    if workers > 1:
+        logger.warning(
+            "Sales analytics are kept per worker: with WEB_CONCURRENCY=%d each worker "
+            "counts history at boot plus only its own orders afterwards", workers,
+        )
+
+
+sales_rollup = SalesRollup(
+    retention_hours=settings.ANALYTICS_RETENTION_DAYS * 24,
+    utc_offset_hours=settings.ANALYTICS_UTC_OFFSET_HOURS,
+)
+
+
+def get_sales_rollup() -> SalesRollup:
+    """Get sales rollup instance"""
+    return sales_rollup
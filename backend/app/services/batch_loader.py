@@ -0,0 +1,48 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchFn = Callable[[List[K]], Awaitable[Dict[K, V]]]
+
+
+class Loader(Generic[K, V]):
+    """
+    Per-request batching cache in the style of DataLoader.
+
+    Keys asked for with `load` in the same event loop tick are fetched
+    together by one call to `batch_fn`, and every key is fetched at most
+    once for the loader's lifetime, so lookups that share an order (the
+    order itself, its tracking view) cost one read. Create a loader per
+    request: results are not invalidated by later writes.
+    """
+
+    def __init__(self, batch_fn: BatchFn):
+        self.batch_fn = batch_fn
+        self._cache: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+        self._dispatch: Optional[asyncio.Task] = None
+
+    def load(self, key: K) -> "asyncio.Future[Optional[V]]":
+        future = self._cache.get(key)
+        if future is None:
+            future = self._cache[key] = asyncio.get_running_loop().create_future()
+            self._queue.append(key)
+            if self._dispatch is None:
+                self._dispatch = asyncio.create_task(self._run())
+        return future
+
+    async def _run(self):
+        # Yield once so keys requested in the same tick join this batch
+        await asyncio.sleep(0)
+        keys, self._queue = self._queue, []
+        self._dispatch = None
+        try:
+            found = await self.batch_fn(keys)
+        except Exception as exc:
+            for key in keys:
+                self._cache.pop(key).set_exception(exc)
+            return
+        for key in keys:
+            self._cache[key].set_result(found.get(key))
@@ -0,0 +1,93 @@
+import gzip
+import hashlib
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:  # optional dependency; gzip only without it
+    brotli = None
+
+# Bodies smaller than this are not worth a compressed variant
+MIN_COMPRESS_SIZE = 512
+
+# Server preference when the client accepts several codings equally
+PREFERRED_ENCODINGS = ("br", "gzip")
+
+
+class EncodedBody:
+    """
+    A response body with its compressed variants, encoded once up front so
+    a cached body can be served to every client at maximum compression
+    without compressing it again per request.
+
+    Bodies that are served once or a few times (search results, deltas)
+    pass `fast=True`: maximum compression costs ~10x the CPU of the
+    fastest level for a few percent smaller output, which only pays off
+    when the result is reused many times.
+    """
+
+    def __init__(self, body: bytes, media_type: str = "application/json", fast: bool = False):
+        self.media_type = media_type
+        self.variants: Dict[str, bytes] = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants["gzip"] = gzip.compress(body, compresslevel=1 if fast else 9, mtime=0)
+            if brotli is not None:
+                self.variants["br"] = brotli.compress(body, quality=1 if fast else 11)
+        self.etag = '"' + hashlib.blake2b(body, digest_size=10).hexdigest() + '"'
+
+
+def negotiate_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> str:
+    """Pick the best coding from an Accept-Encoding header, honouring q=0"""
+    if not accept_encoding:
+        return "identity"
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip().lower()] = weight
+
+    available = set(available)
+    best, best_weight = "identity", 0.0
+    for coding in PREFERRED_ENCODINGS:
+        if coding not in available:
+            continue
+        weight = weights.get(coding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = coding, weight
+    return best
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: proxies may have weakened the tag after re-encoding
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def encoded_response(
+    request: Request,
+    encoded: EncodedBody,
+    cache_control: Optional[str] = None,
+) -> Response:
+    """Serve the variant the client accepts, or 304 if its copy is current"""
+    headers = {"ETag": encoded.etag, "Vary": "Accept-Encoding"}
+    if cache_control:
+        headers["Cache-Control"] = cache_control
+    if etag_matches(request.headers.get("if-none-match"), encoded.etag):
+        return Response(status_code=304, headers=headers)
+
+    coding = negotiate_encoding(request.headers.get("accept-encoding"), encoded.variants)
+    if coding != "identity":
+        headers["Content-Encoding"] = coding
+    return Response(content=encoded.variants[coding], media_type=encoded.media_type, headers=headers)
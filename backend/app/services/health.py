@@ -0,0 +1,191 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.metrics import get_loop_monitor, metrics, time_upstream
+from app.services.repository import get_repository
+from app.services.startup import get_startup_report
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency
+    redis = None
+
+metrics.describe("health_check_up", "gauge", "1 if the dependency answered its last probe")
+metrics.describe("health_check_latency_seconds", "gauge", "Duration of the last dependency probe")
+
+PAYSTACK_PROBE_URL = "https://api.paystack.co/transaction?perPage=1"
+
+Probe = Callable[[], Awaitable[None]]
+
+
+@dataclass
+class ProbeResult:
+    ok: bool
+    latency: float
+    checked_at: datetime
+    error: Optional[str] = None
+
+
+class HealthMonitor:
+    """
+    Dependency probes run on a schedule, so readiness checks cost nothing.
+
+    Each registered probe is run every `interval` seconds (all probes
+    concurrently, each bounded by `timeout`) and its latest result is
+    kept. `readiness()` only reads those results plus in-process figures:
+    sustained event loop lag, short requests in flight against the
+    admission limit (open event streams are reported but never saturate
+    a worker) and the repository's pool stats. A worker is ready once it has
+    warmed up, every critical probe has recently succeeded and it is not
+    saturated, so a load balancer stops sending it traffic before
+    admission control has to shed checkout requests. Non-critical probes
+    (Paystack) are reported without taking the worker out of rotation,
+    since every worker would fail them alike.
+    """
+
+    def __init__(self, interval: float = 10.0, timeout: float = 3.0):
+        self.interval = interval
+        self.timeout = timeout
+        self.started = time.monotonic()
+        self.draining = False
+        self._probes: Dict[str, Probe] = {}
+        self._critical: Dict[str, bool] = {}
+        self.results: Dict[str, ProbeResult] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def add_probe(self, name: str, probe: Probe, critical: bool = True):
+        self._probes[name] = probe
+        self._critical[name] = critical
+
+    async def _check(self, name: str, probe: Probe):
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(probe(), self.timeout)
+            error = None
+        except asyncio.TimeoutError:
+            error = f"timed out after {self.timeout}s"
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+        latency = time.perf_counter() - start
+        self.results[name] = ProbeResult(error is None, latency, datetime.now(timezone.utc), error)
+        metrics.set_gauge("health_check_up", 0.0 if error else 1.0, (("check", name),))
+        metrics.set_gauge("health_check_latency_seconds", latency, (("check", name),))
+
+    async def probe_all(self):
+        await asyncio.gather(*(self._check(name, probe) for name, probe in self._probes.items()))
+
+    async def _run(self):
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.interval)
+
+    def _fresh(self, result: ProbeResult) -> bool:
+        age = (datetime.now(timezone.utc) - result.checked_at).total_seconds()
+        return age <= 3 * self.interval + self.timeout
+
+    def readiness(self) -> dict:
+        reasons: List[str] = []
+        checks = {}
+        for name in self._probes:
+            result = self.results.get(name)
+            critical = self._critical[name]
+            if result is None:
+                checks[name] = {"ok": None, "critical": critical}
+                if critical:
+                    reasons.append(f"{name} not probed yet")
+                continue
+            checks[name] = {
+                "ok": result.ok,
+                "critical": critical,
+                "latency_ms": round(result.latency * 1000, 1),
+                "checked_at": result.checked_at.isoformat(),
+                "error": result.error,
+            }
+            if critical and not result.ok:
+                reasons.append(f"{name}: {result.error}")
+            elif critical and not self._fresh(result):
+                reasons.append(f"{name} result is stale")
+
+        lag = get_loop_monitor().sustained_lag
+        if lag > settings.HEALTH_MAX_LOOP_LAG:
+            reasons.append(f"event loop lag {lag:.3f}s")
+        # Short requests only: open event streams are idle watchers, counted apart
+        in_flight = int(metrics.gauge("requests_in_flight"))
+        saturation = in_flight / settings.ADMISSION_MAX_IN_FLIGHT
+        if saturation >= settings.HEALTH_MAX_SATURATION:
+            reasons.append(f"{in_flight} requests in flight")
+
+        if self.draining:
+            status = "draining"
+        elif not get_startup_report().ready:
+            status = "starting"
+        else:
+            status = "not_ready" if reasons else "ready"
+        return {
+            "status": status,
+            "reasons": reasons,
+            "checks": checks,
+            "event_loop_lag": round(lag, 4),
+            "in_flight": in_flight,
+            "saturation": round(saturation, 3),
+            "streams_open": int(metrics.gauge("streams_open")),
+            "pools": get_repository().pool_stats(),
+        }
+
+    def liveness(self) -> dict:
+        return {"status": "alive", "uptime": round(time.monotonic() - self.started, 1)}
+
+    def start(self):
+        self.draining = False
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self.draining = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+async def probe_paystack():
+    async with time_upstream("paystack", "health"), httpx.AsyncClient() as client:
+        response = await client.get(
+            PAYSTACK_PROBE_URL,
+            headers={"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"},
+        )
+        response.raise_for_status()
+
+
+_redis_client = None
+
+
+async def probe_redis():
+    global _redis_client
+    if redis is None:
+        raise RuntimeError("the redis package is not installed")
+    if _redis_client is None:
+        _redis_client = redis.from_url(settings.REDIS_URL)
+    await _redis_client.ping()
+
+
+health_monitor = HealthMonitor(settings.HEALTH_PROBE_INTERVAL, settings.HEALTH_PROBE_TIMEOUT)
+health_monitor.add_probe("database", get_repository().ping)
+if "redis" in (settings.RATE_LIMIT_BACKEND, settings.INVENTORY_BACKEND):
+    health_monitor.add_probe("redis", probe_redis)
+if settings.PAYSTACK_SECRET_KEY:
+    health_monitor.add_probe("paystack", probe_paystack, critical=False)
+
+
+def get_health_monitor() -> HealthMonitor:
+    """Get health monitor instance"""
+    return health_monitor
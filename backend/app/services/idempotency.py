@@ -0,0 +1,198 @@
+import asyncio
+import hashlib
+import json
+import secrets
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency
+    redis = None
+
+
+class IdempotencyKeyReused(Exception):
+    """An Idempotency-Key was sent again with a different request body"""
+    pass
+
+
+class IdempotencyKeyInFlight(Exception):
+    """The first request with this Idempotency-Key is still running (on another worker)"""
+    pass
+
+
+def fingerprint(payload: Any) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class IdempotencyStore:
+    """
+    Remembers the result of requests sent with an Idempotency-Key.
+
+    A retry with the same key and body gets the stored result back without
+    running the handler again; a retry that arrives while the first attempt
+    is still running waits for it. Entries expire after `ttl` seconds and
+    the store holds at most `max_keys` of them, oldest evicted first. Since
+    the TTL is fixed, insertion order is expiry order, so both are O(1).
+    Failed attempts are not stored so the client can retry them.
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_keys: int = 100000):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        # key -> (expires_at, fingerprint, future holding the result)
+        self._entries: "OrderedDict[str, Tuple[float, str, asyncio.Future]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self._entries:
+            expires_at = next(iter(self._entries.values()))[0]
+            if expires_at > now and len(self._entries) < self.max_keys:
+                break
+            self._entries.popitem(last=False)
+
+    async def run(
+        self,
+        key: str,
+        payload: Any,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """Return (result, replayed), running call() only for a new key"""
+        self._evict()
+        digest = fingerprint(payload)
+        entry = self._entries.get(key)
+        if entry is not None:
+            _, stored_digest, future = entry
+            if stored_digest != digest:
+                raise IdempotencyKeyReused(key)
+            return await asyncio.shield(future), True
+
+        future = asyncio.get_running_loop().create_future()
+        self._entries[key] = (time.monotonic() + self.ttl, digest, future)
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            self._entries.pop(key, None)
+            future.cancel()
+            raise
+        except Exception as exc:
+            self._entries.pop(key, None)
+            future.set_exception(exc)
+            # Mark retrieved so an unawaited failure is not logged
+            future.exception()
+            raise
+        future.set_result(result)
+        return result, False
+
+
+# Claim a key for one attempt, or report the fingerprint, state and result stored for it
+CLAIM_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 0 then
+    redis.call("HSET", KEYS[1], "fingerprint", ARGV[1], "owner", ARGV[2])
+    redis.call("PEXPIRE", KEYS[1], ARGV[3])
+    return {}
+end
+return redis.call("HMGET", KEYS[1], "fingerprint", "result")
+"""
+
+# Store the result, or drop the claim (no result), if this attempt still owns the key
+SETTLE_SCRIPT = """
+if redis.call("HGET", KEYS[1], "owner") ~= ARGV[1] then
+    return 0
+end
+if ARGV[2] == "" then
+    redis.call("DEL", KEYS[1])
+else
+    redis.call("HSET", KEYS[1], "result", ARGV[2])
+    redis.call("PEXPIRE", KEYS[1], ARGV[3])
+end
+return 1
+"""
+
+
+class RedisIdempotencyStore:
+    """
+    Idempotency-Key results in Redis, so a retry landing on another worker
+    still gets the original result.
+
+    A first attempt claims the key atomically; the claim expires after
+    `in_flight_ttl` seconds so a worker dying mid-request does not block
+    the key for a whole `ttl`. A retry that finds the key claimed polls
+    until the result is stored, the claim is dropped (the attempt failed,
+    and the retry runs instead) or `wait` seconds pass, when it gets
+    IdempotencyKeyInFlight. Results are stored as JSON, so replays return
+    the JSON form of what call() returned.
+    """
+
+    def __init__(self, url: str, ttl: float = 86400.0, in_flight_ttl: float = 30.0, wait: float = 10.0):
+        if redis is None:
+            raise RuntimeError("IDEMPOTENCY_BACKEND=redis requires the redis package")
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.in_flight_ttl = in_flight_ttl
+        self.wait = wait
+        self._claim = self.client.register_script(CLAIM_SCRIPT)
+        self._settle = self.client.register_script(SETTLE_SCRIPT)
+
+    async def run(
+        self,
+        key: str,
+        payload: Any,
+        call: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """Return (result, replayed), running call() only for a new key"""
+        redis_key = f"idempotency:{key}"
+        digest = fingerprint(payload)
+        owner = secrets.token_hex(8)
+        deadline = time.monotonic() + self.wait
+        delay = 0.05
+        while True:
+            stored = await self._claim(
+                keys=[redis_key], args=[digest, owner, int(self.in_flight_ttl * 1000)],
+            )
+            if not stored:
+                break
+            stored_digest, result = stored
+            if stored_digest.decode() != digest:
+                raise IdempotencyKeyReused(key)
+            if result is not None:
+                return json.loads(result), True
+            if time.monotonic() >= deadline:
+                raise IdempotencyKeyInFlight(key)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+        try:
+            result = await call()
+        except BaseException:
+            await self._settle(keys=[redis_key], args=[owner, "", 0])
+            raise
+        await self._settle(
+            keys=[redis_key], args=[owner, json.dumps(jsonable_encoder(result)), int(self.ttl * 1000)],
+        )
+        return result, False
+
+
+def create_idempotency_store(backend: str):
+    ttl = settings.IDEMPOTENCY_TTL_HOURS * 3600
+    if backend == "memory":
+        return IdempotencyStore(ttl=ttl, max_keys=settings.IDEMPOTENCY_MAX_KEYS)
+    if backend == "redis":
+        return RedisIdempotencyStore(settings.REDIS_URL, ttl=ttl)
+    raise ValueError(f"Unknown idempotency backend: {backend}")
+
+
+idempotency_store = create_idempotency_store(settings.IDEMPOTENCY_BACKEND)
+
+
+def get_idempotency_store() -> IdempotencyStore:
+    """Get idempotency store instance"""
+    return idempotency_store
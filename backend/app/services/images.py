@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import importlib.util
+import io
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from fastapi.staticfiles import StaticFiles
+
+from app.config import settings
+from app.services.storage import create_object_store
+
+# Pillow is optional (uploads are refused without it) and only imported by
+# the worker processes that resize images, not by every API worker
+PILLOW_INSTALLED = importlib.util.find_spec("PIL") is not None
+
+MENU_IMAGES_BUCKET = "menu-images"
+
+# Folder for items without a category (e.g. pulled from Supabase with none set)
+UNCATEGORIZED = "uncategorized"
+
+# Longest side in pixels per derivative (supabase/storage_buckets.md: 800px max)
+IMAGE_SIZES = {"thumb": 200, "card": 400, "detail": 800}
+WEBP_QUALITY = 80
+
+# Refuse decompression bombs before they reach memory
+MAX_IMAGE_PIXELS = 40_000_000
+
+# Derivative names contain a content hash, so a URL never changes meaning
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class ImageProcessingUnavailable(Exception):
+    """Pillow is not installed"""
+    pass
+
+
+def make_derivatives(data: bytes) -> Dict[str, bytes]:
+    """
+    Resize an uploaded image to every IMAGE_SIZES width as WebP.
+
+    Runs in a worker process; raises ValueError for unreadable images.
+    """
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+    try:
+        with Image.open(io.BytesIO(data)) as source:
+            image = ImageOps.exif_transpose(source)
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    except Image.DecompressionBombError:
+        raise ValueError("Image has too many pixels")
+    except OSError:
+        raise ValueError("Not a readable JPEG, PNG or WebP image")
+
+    derivatives = {}
+    for size, longest in IMAGE_SIZES.items():
+        resized = image.copy()
+        resized.thumbnail((longest, longest), Image.LANCZOS)  # never upscales
+        buffer = io.BytesIO()
+        resized.save(buffer, "WEBP", quality=WEBP_QUALITY, method=4)
+        derivatives[size] = buffer.getvalue()
+    return derivatives
+
+
+def derivative_path(category: Optional[str], item_id: str, size: str, data: bytes) -> str:
+    """`{category}/{item-id}-{size}.{hash}.webp` inside the bucket"""
+    digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+    return f"{category or UNCATEGORIZED}/{item_id}-{size}.{digest}.webp"
+
+
+class ImmutableStaticFiles(StaticFiles):
+    """StaticFiles for content-addressed files: cache them forever"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL
+        return response
+
+
+class ImagePipeline:
+    """
+    Turns uploaded menu photos into WebP derivatives and stores them.
+
+    Decoding and resizing are CPU-bound, so they run in a process pool
+    (created on first use) instead of blocking the event loop; the
+    derivatives are then uploaded concurrently.
+    """
+
+    def __init__(self, store, workers: int = 2):
+        self.store = store
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def available(self) -> bool:
+        return PILLOW_INSTALLED
+
+    async def process_menu_image(self, item: dict, data: bytes) -> Dict[str, str]:
+        """Returns the URL of each derivative, keyed by size"""
+        if not self.available:
+            raise ImageProcessingUnavailable("Image processing requires the Pillow package")
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+
+        loop = asyncio.get_running_loop()
+        derivatives = await loop.run_in_executor(self._pool, make_derivatives, data)
+        paths = {
+            size: derivative_path(item.get("category"), item["id"], size, body)
+            for size, body in derivatives.items()
+        }
+        urls = await asyncio.gather(*(
+            self.store.put(MENU_IMAGES_BUCKET, paths[size], body, "image/webp", IMMUTABLE_CACHE_CONTROL)
+            for size, body in derivatives.items()
+        ))
+        return dict(zip(derivatives, urls))
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+image_pipeline = ImagePipeline(
+    create_object_store(settings.IMAGE_STORAGE_BACKEND, settings.MEDIA_DIR, settings.MEDIA_URL),
+    settings.IMAGE_WORKERS,
+)
+
+
+def get_image_pipeline() -> ImagePipeline:
+    """Get image pipeline instance"""
+    return image_pipeline
@@ -0,0 +1,287 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+
+from app.config import settings
+from app.services.menu_catalog import get_menu_catalog
+from app.services.repository import get_repository, menu_branch
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class InsufficientStock(Exception):
+    """One or more items of an order cannot be reserved"""
+
+    def __init__(self, item_ids: List[str]):
+        super().__init__(f"Insufficient stock for {', '.join(item_ids)}")
+        self.item_ids = item_ids
+
+
+def order_lines(items: Iterable[dict]) -> Dict[str, int]:
+    """Quantity per menu item, merging repeated lines"""
+    lines: Dict[str, int] = {}
+    for item in items:
+        lines[item["menu_item_id"]] = lines.get(item["menu_item_id"], 0) + item["quantity"]
+    return lines
+
+
+class MemoryStockStore:
+    """
+    Stock counts in process memory; items without a count are untracked.
+
+    No method awaits between checking and updating, so on a single event
+    loop every reservation is atomic without a lock.
+    """
+
+    def __init__(self):
+        self._stock: Dict[str, int] = {}
+
+    async def load(self, levels: Dict[str, int]):
+        self._stock.update(levels)
+
+    async def get(self, item_id: str) -> Optional[int]:
+        return self._stock.get(item_id)
+
+    async def set(self, item_id: str, stock: Optional[int]):
+        if stock is None:
+            self._stock.pop(item_id, None)
+        else:
+            self._stock[item_id] = stock
+
+    async def reserve(self, lines: Dict[str, int]) -> Dict[str, int]:
+        """Take every line or none; returns what is left of tracked items"""
+        short = [i for i, qty in lines.items() if i in self._stock and self._stock[i] < qty]
+        if short:
+            raise InsufficientStock(short)
+        remaining = {}
+        for item_id, qty in lines.items():
+            if item_id in self._stock:
+                self._stock[item_id] -= qty
+                remaining[item_id] = self._stock[item_id]
+        return remaining
+
+    async def release(self, lines: Dict[str, int]) -> Dict[str, int]:
+        remaining = {}
+        for item_id, qty in lines.items():
+            if item_id in self._stock:
+                self._stock[item_id] += qty
+                remaining[item_id] = self._stock[item_id]
+        return remaining
+
+
+# KEYS: stock keys, ARGV: quantities. Missing keys are untracked items.
+# Returns {0, short indexes...} or {1, remaining per key (-1 if untracked)...}
+RESERVE_SCRIPT = """
+local short = {}
+for i, key in ipairs(KEYS) do
+    local stock = redis.call("GET", key)
+    if stock and tonumber(stock) < tonumber(ARGV[i]) then
+        table.insert(short, i)
+    end
+end
+if #short > 0 then
+    return {0, unpack(short)}
+end
+local result = {1}
+for i, key in ipairs(KEYS) do
+    if redis.call("EXISTS", key) == 1 then
+        table.insert(result, redis.call("DECRBY", key, ARGV[i]))
+    else
+        table.insert(result, -1)
+    end
+end
+return result
+"""
+
+RELEASE_SCRIPT = """
+local result = {}
+for i, key in ipairs(KEYS) do
+    if redis.call("EXISTS", key) == 1 then
+        table.insert(result, redis.call("INCRBY", key, ARGV[i]))
+    else
+        table.insert(result, -1)
+    end
+end
+return result
+"""
+
+
+class RedisStockStore:
+    """Stock counts in Redis, reserved by Lua scripts so all workers share them"""
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("INVENTORY_BACKEND=redis requires the redis package")
+        self.client = redis.from_url(url)
+        self._reserve = self.client.register_script(RESERVE_SCRIPT)
+        self._release = self.client.register_script(RELEASE_SCRIPT)
+
+    @staticmethod
+    def _key(item_id: str) -> str:
+        return f"inventory:{item_id}"
+
+    async def load(self, levels: Dict[str, int]):
+        # Redis outlives workers: keep counts another worker has already moved
+        for item_id, stock in levels.items():
+            await self.client.set(self._key(item_id), stock, nx=True)
+
+    async def get(self, item_id: str) -> Optional[int]:
+        value = await self.client.get(self._key(item_id))
+        return None if value is None else int(value)
+
+    async def set(self, item_id: str, stock: Optional[int]):
+        if stock is None:
+            await self.client.delete(self._key(item_id))
+        else:
+            await self.client.set(self._key(item_id), stock)
+
+    async def reserve(self, lines: Dict[str, int]) -> Dict[str, int]:
+        item_ids = list(lines)
+        result = await self._reserve(keys=[self._key(i) for i in item_ids], args=[lines[i] for i in item_ids])
+        if not result[0]:
+            raise InsufficientStock([item_ids[index - 1] for index in result[1:]])
+        return {i: left for i, left in zip(item_ids, result[1:]) if left >= 0}
+
+    async def release(self, lines: Dict[str, int]) -> Dict[str, int]:
+        item_ids = list(lines)
+        result = await self._release(keys=[self._key(i) for i in item_ids], args=[lines[i] for i in item_ids])
+        return {i: left for i, left in zip(item_ids, result) if left >= 0}
+
+
+def create_stock_store(backend: str):
+    if backend == "memory":
+        return MemoryStockStore()
+    if backend == "redis":
+        return RedisStockStore(settings.REDIS_URL)
+    raise ValueError(f"Unknown inventory backend: {backend}")
+
+
+class Inventory:
+    """
+    Per-item stock on top of a stock store.
+
+    An order reserves all of its lines in one step and cancelled orders
+    give theirs back. When an item runs out it is marked unavailable
+    (and back again on restock), which moves its branch's catalog version
+    and so drops that branch's cached menu responses. Counts reach the repository's `stock`
+    column write-behind, every `flush_interval` seconds, so orders never
+    wait on a menu write unless availability changes.
+    """
+
+    def __init__(self, store, flush_interval: float = 5.0):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.repository = get_repository()
+        self._dirty: Dict[str, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    async def _save_item(self, item_id: str, changes: dict):
+        item = self.repository.get_menu_item(item_id)
+        if item is None:
+            return
+        await self.repository.save_menu_item({**item, **changes})
+        if "is_available" in changes:
+            get_menu_catalog(menu_branch(item)).record_change(item_id)
+
+    async def _update_availability(self, remaining: Dict[str, int]):
+        for item_id, left in remaining.items():
+            self._dirty[item_id] = left
+            item = self.repository.get_menu_item(item_id)
+            if item is None:
+                continue
+            sold_out = item["is_available"] and left <= 0
+            # Only bring back items we sold out, not ones switched off by hand
+            restocked = not item["is_available"] and left > 0 and (item.get("stock") or 0) <= 0
+            if sold_out or restocked:
+                self._dirty.pop(item_id, None)
+                await self._save_item(item_id, {
+                    "stock": left,
+                    "is_available": left > 0,
+                    "updated_at": datetime.now().isoformat(),
+                })
+
+    async def reserve(self, lines: Dict[str, int]):
+        """Reserve every line or raise InsufficientStock"""
+        try:
+            remaining = await self.store.reserve(lines)
+        except InsufficientStock as e:
+            # Another worker may have sold these out; catch up our menu
+            levels = {i: await self.store.get(i) for i in e.item_ids}
+            await self._update_availability({i: left for i, left in levels.items() if left is not None})
+            raise
+        await self._update_availability(remaining)
+
+    async def release(self, lines: Dict[str, int]):
+        await self._update_availability(await self.store.release(lines))
+
+    async def get_stock(self, item_id: str) -> Optional[int]:
+        return await self.store.get(item_id)
+
+    async def set_stock(self, item_id: str, stock: Optional[int]):
+        """Set (or, with None, stop tracking) an item's stock"""
+        await self.store.set(item_id, stock)
+        self._dirty.pop(item_id, None)
+        changes = {"stock": stock, "updated_at": datetime.now().isoformat()}
+        item = self.repository.get_menu_item(item_id)
+        if item is not None and stock is not None and item["is_available"] != (stock > 0):
+            changes["is_available"] = stock > 0
+        await self._save_item(item_id, changes)
+
+    def on_order_event(self, db_id: str, order: dict, previous_status: Optional[str] = None):
+        """Order listener: return a cancelled order's stock"""
+        if order["status"] == "cancelled" and previous_status not in (None, "cancelled"):
+            task = asyncio.create_task(self.release(order_lines(order["items"])))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def flush(self):
+        dirty, self._dirty = self._dirty, {}
+        for item_id, stock in dirty.items():
+            try:
+                await self._save_item(item_id, {"stock": stock})
+            except Exception as exc:
+                self._dirty.setdefault(item_id, stock)
+                logger.warning("Could not persist stock for %s: %s", item_id, exc)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def start(self):
+        levels = {
+            item["id"]: item["stock"]
+            for item in self.repository.list_menu_items()
+            if item.get("stock") is not None
+        }
+        await self.store.load(levels)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+
+inventory = Inventory(
+    create_stock_store(settings.INVENTORY_BACKEND),
+    flush_interval=settings.INVENTORY_FLUSH_INTERVAL,
+)
+
+
+def get_inventory() -> Inventory:
+    """Get inventory instance"""
+    return inventory
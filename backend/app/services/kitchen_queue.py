@@ -0,0 +1,226 @@
+import asyncio
+import heapq
+import itertools
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from app.models.order import OrderStatusEnum
+
+# Orders the kitchen still has to act on
+KITCHEN_STATUSES = {
+    OrderStatusEnum.CONFIRMED.value,
+    OrderStatusEnum.PREPARING.value,
+    OrderStatusEnum.READY.value,
+}
+
+# Menu category -> kitchen station
+STATION_BY_CATEGORY = {
+    "breakfast": "hot",
+    "lunch": "hot",
+    "dinner": "grill",
+    "drinks": "bar",
+    "desserts": "pastry",
+}
+DEFAULT_STATION = "hot"
+DEFAULT_PREP_MINUTES = 15
+
+
+def _as_datetime(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def _status_value(status) -> str:
+    return getattr(status, "value", status)
+
+
+class KitchenSubscriber:
+    """A connected kitchen screen, optionally filtered to one station"""
+
+    def __init__(self, station: Optional[str] = None, max_pending: int = 256):
+        self.station = station
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_pending)
+
+    def push(self, message: dict):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Too far behind for diffs to be useful; ask it to resync
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+
+
+class KitchenQueue:
+    """
+    Priority queue of kitchen tickets ordered by when cooking must start
+    (delivery target minus prep time), with per-station sub-queues and
+    incremental diffs pushed to subscribed kitchen screens.
+
+    Heaps use lazy deletion: a re-prioritized or removed ticket leaves its
+    old heap entry behind, which is skipped because its sequence number no
+    longer matches the live ticket.
+    """
+
+    def __init__(self, menu_lookup: Optional[Callable[[str], Optional[dict]]] = None):
+        self.menu_lookup = menu_lookup
+        self._tickets: Dict[str, dict] = {}
+        self._heap: List[tuple] = []
+        self._station_heaps: Dict[str, List[tuple]] = {}
+        self._counter = itertools.count()
+        self._subscribers: List[KitchenSubscriber] = []
+        self.version = 0
+
+    def _menu_item(self, menu_item_id: str) -> Optional[dict]:
+        return self.menu_lookup(menu_item_id) if self.menu_lookup else None
+
+    def prep_minutes(self, order: dict) -> int:
+        """Longest preparation time across the order's items"""
+        prep_minutes = 0
+        for item in order["items"]:
+            menu_item = self._menu_item(item["menu_item_id"])
+            item_prep = menu_item.get("preparation_time", DEFAULT_PREP_MINUTES) if menu_item else DEFAULT_PREP_MINUTES
+            prep_minutes = max(prep_minutes, item_prep)
+        return prep_minutes
+
+    @staticmethod
+    def target_time(order: dict) -> datetime:
+        """When the order is due: scheduled time, else estimated delivery"""
+        return (
+            _as_datetime(order.get("scheduled_time"))
+            or _as_datetime(order.get("estimated_delivery"))
+            or _as_datetime(order["created_at"])
+        )
+
+    def start_by(self, order: dict) -> datetime:
+        """Latest time cooking can start and still meet the target"""
+        return self.target_time(order) - timedelta(minutes=self.prep_minutes(order))
+
+    def _build_ticket(self, db_id: str, order: dict) -> dict:
+        stations: Dict[str, List[dict]] = {}
+        for item in order["items"]:
+            menu_item = self._menu_item(item["menu_item_id"])
+            station = DEFAULT_STATION
+            if menu_item:
+                station = STATION_BY_CATEGORY.get(_status_value(menu_item["category"]), DEFAULT_STATION)
+            stations.setdefault(station, []).append({
+                "menu_item_id": item["menu_item_id"],
+                "name": item["name"],
+                "quantity": item["quantity"],
+                "special_instructions": item.get("special_instructions"),
+            })
+
+        prep_minutes = self.prep_minutes(order)
+        target = self.target_time(order)
+        start_by = target - timedelta(minutes=prep_minutes)
+
+        return {
+            "id": db_id,
+            "order_id": order["order_id"],
+            "status": _status_value(order["status"]),
+            "start_by": start_by.isoformat(),
+            "target_time": target.isoformat(),
+            "prep_minutes": prep_minutes,
+            "stations": stations,
+            "_seq": next(self._counter),
+            "_priority": start_by.timestamp(),
+        }
+
+    def sync(self, db_id: str, order: dict):
+        """Add, re-prioritize or remove an order after any change to it"""
+        if _status_value(order["status"]) not in KITCHEN_STATUSES:
+            self.remove(db_id)
+            return
+
+        ticket = self._build_ticket(db_id, order)
+        self._tickets[db_id] = ticket
+        entry = (ticket["_priority"], ticket["_seq"], db_id)
+        heapq.heappush(self._heap, entry)
+        for station in ticket["stations"]:
+            heapq.heappush(self._station_heaps.setdefault(station, []), entry)
+        self._compact()
+        self._publish({"type": "upsert", "ticket": self.public_ticket(ticket)}, ticket["stations"])
+
+    def remove(self, db_id: str):
+        ticket = self._tickets.pop(db_id, None)
+        if ticket is None:
+            return
+        self._compact()
+        self._publish({"type": "remove", "id": db_id, "order_id": ticket["order_id"]}, ticket["stations"])
+
+    def _is_live(self, entry: tuple) -> bool:
+        ticket = self._tickets.get(entry[2])
+        return ticket is not None and ticket["_seq"] == entry[1]
+
+    def _compact(self):
+        """Rebuild heaps once stale entries outnumber live tickets"""
+        if len(self._heap) <= 2 * len(self._tickets) + 64:
+            return
+        self._heap = [e for e in self._heap if self._is_live(e)]
+        heapq.heapify(self._heap)
+        for station, heap in list(self._station_heaps.items()):
+            live = [e for e in heap if self._is_live(e)]
+            if live:
+                heapq.heapify(live)
+                self._station_heaps[station] = live
+            else:
+                del self._station_heaps[station]
+
+    def peek(self, station: Optional[str] = None) -> Optional[dict]:
+        """Return the most urgent ticket, optionally for one station"""
+        heap = self._heap if station is None else self._station_heaps.get(station, [])
+        while heap and not self._is_live(heap[0]):
+            heapq.heappop(heap)
+        if not heap:
+            return None
+        return self.public_ticket(self._tickets[heap[0][2]], station)
+
+    def snapshot(self, station: Optional[str] = None, limit: Optional[int] = None) -> List[dict]:
+        """Return live tickets in priority order"""
+        heap = self._heap if station is None else self._station_heaps.get(station, [])
+        live = [e for e in heap if self._is_live(e)]
+        entries = heapq.nsmallest(limit, live) if limit else sorted(live)
+        return [self.public_ticket(self._tickets[e[2]], station) for e in entries]
+
+    @staticmethod
+    def public_ticket(ticket: dict, station: Optional[str] = None) -> dict:
+        public = {k: v for k, v in ticket.items() if not k.startswith("_")}
+        if station is not None:
+            public["stations"] = {station: ticket["stations"].get(station, [])}
+        return public
+
+    def subscribe(self, station: Optional[str] = None) -> KitchenSubscriber:
+        subscriber = KitchenSubscriber(station)
+        self._subscribers.append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: KitchenSubscriber):
+        if subscriber in self._subscribers:
+            self._subscribers.remove(subscriber)
+
+    def _publish(self, message: dict, stations: Dict[str, list]):
+        self.version += 1
+        message["version"] = self.version
+        for subscriber in self._subscribers:
+            if subscriber.station is None:
+                subscriber.push(message)
+            elif subscriber.station in stations:
+                if message["type"] == "upsert":
+                    subscriber.push({
+                        **message,
+                        "ticket": {
+                            **message["ticket"],
+                            "stations": {subscriber.station: stations[subscriber.station]},
+                        },
+                    })
+                else:
+                    subscriber.push(message)
+
+
+kitchen_queue = KitchenQueue()
+
+
+def get_kitchen_queue() -> KitchenQueue:
+    """Get kitchen queue instance"""
+    return kitchen_queue
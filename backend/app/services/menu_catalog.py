@@ -0,0 +1,124 @@
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.compression import EncodedBody
+from app.services.order_ids import MAX_NODE, get_order_id_generator
+
+# Versions carry the issuing worker's node number in their low bits
+NODE_SLOTS = MAX_NODE + 2
+
+
+def now_ms() -> int:
+    return time.time_ns() // 1_000_000
+
+
+_last_version = 0
+
+
+def next_version() -> int:
+    """
+    A version no other worker (node) or catalog in this process issues:
+    epoch milliseconds * NODE_SLOTS + node, strictly increasing
+    """
+    global _last_version
+    node = get_order_id_generator().node_id
+    _last_version = max(now_ms() * NODE_SLOTS + node, _last_version + NODE_SLOTS)
+    return _last_version
+
+
+class MenuCatalog:
+    """
+    Versions the menu so clients can sync deltas, and caches encoded menu
+    responses per version.
+
+    Versions come from `next_version` (time-ordered, unique to this worker
+    and catalog) and each catalog remembers the ones it issued. Each
+    changed item remembers the version it changed at and deleted items
+    leave a tombstone, so `changes_since(v)` can return just what a client
+    holding version `v` is missing. A version this catalog did not issue
+    (another worker's or branch's, or one from before this process
+    started or older than its remembered history) gets a full snapshot,
+    since this catalog cannot know what changed since then.
+
+    Cached responses are keyed by request parameters and dropped whenever
+    the version moves, so every entry is current by construction. Callers
+    keep keys to a bounded set (no free text, only versions this catalog
+    issued) so clients cannot churn the cache.
+
+    Each branch has a catalog of its own (see `get_menu_catalog`), so a
+    change to one branch's menu leaves the others' versions and cached
+    responses alone.
+    """
+
+    def __init__(self, max_responses: int = 256, max_tombstones: int = 10000):
+        self.max_responses = max_responses
+        self.max_tombstones = max_tombstones
+        self.version = next_version()
+        self.base_version = self.version
+        self._issued: Set[int] = {self.version}
+        self._issued_order: Deque[int] = deque([self.version])
+        self._item_versions: Dict[str, int] = {}
+        self._tombstones: "OrderedDict[str, int]" = OrderedDict()
+        self._responses: "OrderedDict[str, EncodedBody]" = OrderedDict()
+
+    def _bump(self) -> int:
+        self.version = next_version()
+        self._issued.add(self.version)
+        self._issued_order.append(self.version)
+        while len(self._issued_order) > self.max_tombstones:
+            # Versions this old are no longer recognised and get a full resync
+            self._issued.discard(self._issued_order.popleft())
+        self._responses.clear()
+        return self.version
+
+    def record_change(self, item_id: str):
+        self._tombstones.pop(item_id, None)
+        self._item_versions[item_id] = self._bump()
+
+    def record_delete(self, item_id: str):
+        self._item_versions.pop(item_id, None)
+        self._tombstones[item_id] = self._bump()
+        while len(self._tombstones) > self.max_tombstones:
+            _, dropped_at = self._tombstones.popitem(last=False)
+            # Deletions up to here can no longer be reported
+            self.base_version = dropped_at
+
+    def knows(self, version: int) -> bool:
+        """Whether deltas can be computed from `version` (issued here, within history)"""
+        return version in self._issued and version >= self.base_version
+
+    def changes_since(self, since: int, items: List[dict]) -> Tuple[List[dict], List[str], bool]:
+        """(changed items, deleted ids, full) for a client at version `since`"""
+        # Another worker's or branch's version, or one from before our history
+        if not self.knows(since):
+            return items, [], True
+        changed = [item for item in items if self._item_versions.get(item["id"], 0) > since]
+        deleted = [item_id for item_id, version in self._tombstones.items() if version > since]
+        return changed, deleted, False
+
+    def cached_response(self, key: str, build: Callable[[], bytes], fast: bool = False) -> EncodedBody:
+        """The encoded body for `key` at the current version, built on a miss"""
+        encoded = self._responses.get(key)
+        if encoded is not None:
+            self._responses.move_to_end(key)
+            return encoded
+        encoded = EncodedBody(build(), fast=fast)
+        self._responses[key] = encoded
+        if len(self._responses) > self.max_responses:
+            self._responses.popitem(last=False)
+        return encoded
+
+
+menu_catalogs: Dict[str, MenuCatalog] = {branch: MenuCatalog() for branch in settings.branches}
+
+
+def get_menu_catalog(branch: Optional[str] = None) -> MenuCatalog:
+    """Get the menu catalog of a branch (the default branch if None)"""
+    branch = branch or settings.default_branch
+    catalog = menu_catalogs.get(branch)
+    if catalog is None:
+        # Items can name a branch that has since been dropped from BRANCHES
+        catalog = menu_catalogs[branch] = MenuCatalog()
+    return catalog
@@ -0,0 +1,252 @@
+import asyncio
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.services.tracing import span
+
+# Upper bounds in seconds; the +Inf bucket is implicit
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Fixed-bucket histogram; one bisect and two adds per observation"""
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class MetricsRegistry:
+    """
+    In-process counters, gauges and histograms rendered in the Prometheus
+    text format. Everything is updated from the event loop thread, so plain
+    integer and float updates need no locking.
+    """
+
+    def __init__(self):
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._gauges: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, labels: Labels = (), amount: float = 1.0):
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0.0) + amount
+
+    def set_gauge(self, name: str, value: float, labels: Labels = ()):
+        self._gauges.setdefault(name, {})[labels] = value
+
+    def gauge(self, name: str, labels: Labels = ()) -> float:
+        return self._gauges.get(name, {}).get(labels, 0.0)
+
+    def add_gauge(self, name: str, amount: float, labels: Labels = ()):
+        series = self._gauges.setdefault(name, {})
+        series[labels] = series.get(labels, 0.0) + amount
+
+    def observe(self, name: str, value: float, labels: Labels = ()):
+        series = self._histograms.setdefault(name, {})
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram()
+        histogram.observe(value)
+
+    def render(self) -> str:
+        lines: List[str] = []
+
+        def header(name: str, kind: str):
+            help_text = self._help.get(name, (kind, ""))[1]
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        for name, series in self._counters.items():
+            header(name, "counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, series in self._gauges.items():
+            header(name, "gauge")
+            for labels, value in series.items():
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name, series in self._histograms.items():
+            header(name, "histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{_format_labels(labels, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{name}_bucket{_format_labels(labels, le)} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+metrics.describe("http_request_duration_seconds", "histogram", "HTTP request latency by route and status")
+metrics.describe("upstream_request_duration_seconds", "histogram", "Supabase and Paystack call latency")
+metrics.describe("websocket_connections", "gauge", "Open WebSocket connections by endpoint")
+metrics.describe("event_loop_lag_seconds", "histogram", "Delay of the event loop waking a timer")
+metrics.describe("event_loop_lag_last_seconds", "gauge", "Most recent event loop lag sample")
+
+
+def get_metrics() -> MetricsRegistry:
+    """Get metrics registry instance"""
+    return metrics
+
+
+@asynccontextmanager
+async def time_upstream(service: str, operation: str):
+    """Record the duration and outcome of a call to an external service"""
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        with span(f"{service}.{operation}"):
+            yield
+        outcome = "ok"
+    finally:
+        metrics.observe(
+            "upstream_request_duration_seconds",
+            time.perf_counter() - start,
+            (("service", service), ("operation", operation), ("outcome", outcome)),
+        )
+
+
+class track_websocket:
+    """Count an open WebSocket for the duration of a `with` block"""
+
+    def __init__(self, endpoint: str):
+        self.labels = (("endpoint", endpoint),)
+
+    def __enter__(self):
+        metrics.add_gauge("websocket_connections", 1, self.labels)
+        return self
+
+    def __exit__(self, *exc_info):
+        metrics.add_gauge("websocket_connections", -1, self.labels)
+        return False
+
+
+def route_label(scope) -> str:
+    """Route template of a request, e.g. /api/orders/{order_id}"""
+    template = getattr(scope.get("route"), "path", None)
+    if template is None:
+        return "unmatched"
+    # Routes of an included router only know the part after its prefix,
+    # so take the prefix from the matching number of leading path segments
+    prefix = scope["path"].rsplit("/", template.count("/"))[0]
+    return prefix + template
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by route template and status.
+
+    The route template (e.g. /api/orders/{order_id}) rather than the raw
+    path is used as the label so the number of series stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.observe(
+                "http_request_duration_seconds",
+                time.perf_counter() - start,
+                (
+                    ("method", scope["method"]),
+                    ("route", route_label(scope)),
+                    ("status", str(status)),
+                ),
+            )
+
+
+class LoopLagMonitor:
+    """
+    Measures event loop lag: how late a timer fires compared with when it
+    was due. Sustained lag means handlers are blocking the loop.
+
+    `lag` is the latest sample; `sustained_lag` is the smallest of the last
+    `window` samples, so one slow call (a bcrypt login) does not register
+    as overload but a loop that stays behind does.
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 4):
+        self.interval = interval
+        self.lag = 0.0
+        self.samples: Deque[float] = deque([0.0] * window, maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def sustained_lag(self) -> float:
+        return min(self.samples)
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            due = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - due)
+            self.samples.append(self.lag)
+            metrics.observe("event_loop_lag_seconds", self.lag)
+            metrics.set_gauge("event_loop_lag_last_seconds", self.lag)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+loop_monitor = LoopLagMonitor()
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Get event loop lag monitor instance"""
+    return loop_monitor
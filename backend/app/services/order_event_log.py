@@ -0,0 +1,272 @@
+import asyncio
+import glob
+import json
+import mmap
+import os
+import struct
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import settings
+from app.services.order_events import TERMINAL_STATUSES
+from app.services.order_records import OrderRecord
+from app.services.repository import get_repository
+
+# Each record: payload length, CRC32 of the payload, then the JSON payload
+RECORD_HEADER = struct.Struct("<II")
+SNAPSHOT_FILE = "snapshot.json.z"
+
+
+def _history_entry(entry) -> Tuple[str, str]:
+    """History entries are [status, timestamp]; snapshots before that used dicts"""
+    if isinstance(entry, dict):
+        return entry["status"], entry["timestamp"]
+    return entry[0], entry[1]
+
+
+def _segment_name(generation: int) -> str:
+    return f"events-{generation:08d}.log"
+
+
+def _iter_records(buffer, offset: int = 0) -> Iterator[Tuple[dict, int]]:
+    """Yield (record, end offset) until the end or the first torn record"""
+    size = len(buffer)
+    while offset + RECORD_HEADER.size <= size:
+        length, checksum = RECORD_HEADER.unpack_from(buffer, offset)
+        start = offset + RECORD_HEADER.size
+        end = start + length
+        if end > size:
+            return
+        payload = buffer[start:end]
+        if zlib.crc32(payload) != checksum:
+            return
+        yield json.loads(payload), end
+        offset = end
+
+
+class OrderEventLog:
+    """
+    Append-only, length-prefixed binary log of order changes.
+
+    Every create and change is appended as one record: the full order on
+    creation, only the changed fields afterwards. Every `snapshot_every`
+    records the current state of live orders (plus recently finished ones)
+    is written to a compressed snapshot and a new log segment is started,
+    so recovery reads one snapshot plus a short, memory-mapped tail no
+    matter how many orders have ever been placed. Snapshots are encoded,
+    compressed and fsynced in a worker thread, off the event loop.
+
+    With `mirror_orders` off (the repository is durable and needs no
+    recovery) the log keeps no copy of the orders and only records status
+    changes, for the status history.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        snapshot_every: int = 10000,
+        retention_seconds: float = 86400.0,
+        mirror_orders: bool = True,
+    ):
+        self.directory = directory
+        self.snapshot_every = snapshot_every
+        self.retention_seconds = retention_seconds
+        self.mirror_orders = mirror_orders
+        self.orders: Dict[str, OrderRecord] = {}
+        # db id -> [(status, timestamp), ...]
+        self.histories: Dict[str, List[Tuple[str, str]]] = {}
+        # db id -> time the order reached a terminal status
+        self._finished_at: Dict[str, float] = {}
+        self.generation = 0
+        self.seq = 0
+        self._since_snapshot = 0
+        self._file = None
+        self._snapshotting: Optional[asyncio.Task] = None
+
+    # Recovery
+    def recover(self) -> Dict[str, OrderRecord]:
+        """Load the snapshot and replay the log tail; returns recovered orders"""
+        if self._file is not None:
+            return self.orders
+        os.makedirs(self.directory, exist_ok=True)
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "rb") as f:
+                snapshot = json.loads(zlib.decompress(f.read()))
+            self.generation = snapshot["generation"]
+            self.seq = snapshot["seq"]
+            self.orders = {db_id: OrderRecord(order) for db_id, order in snapshot["orders"].items()}
+            self.histories = {
+                db_id: [_history_entry(entry) for entry in history]
+                for db_id, history in snapshot["histories"].items()
+            }
+            self._finished_at = snapshot["finished_at"]
+
+        for path in self._segments(self.generation):
+            valid_end = 0
+            with open(path, "rb") as f:
+                if os.fstat(f.fileno()).st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                        for record, valid_end in _iter_records(buffer):
+                            self._apply(record)
+            if valid_end < os.path.getsize(path):
+                # Drop a record torn by a crash mid-write
+                with open(path, "r+b") as f:
+                    f.truncate(valid_end)
+            self.generation = max(self.generation, self._generation_of(path))
+
+        self._open_segment()
+        return self.orders
+
+    def _segments(self, from_generation: int) -> List[str]:
+        paths = glob.glob(os.path.join(self.directory, "events-*.log"))
+        return sorted(p for p in paths if self._generation_of(p) >= from_generation)
+
+    @staticmethod
+    def _generation_of(path: str) -> int:
+        return int(os.path.basename(path)[len("events-"):-len(".log")])
+
+    def _open_segment(self):
+        if self._file is not None:
+            self._file.close()
+        self._file = open(os.path.join(self.directory, _segment_name(self.generation)), "ab")
+
+    # Writing
+    def _apply(self, record: dict):
+        self.seq = max(self.seq, record["seq"])
+        db_id = record["db_id"]
+        if record["type"] == "created":
+            status = record["order"]["status"]
+            if self.mirror_orders:
+                self.orders[db_id] = OrderRecord(record["order"])
+        elif record["type"] == "updated":
+            order = self.orders.get(db_id)
+            if order is not None:
+                order.update(record["changes"])
+                status = order.status
+            else:
+                status = record["changes"].get("status")
+                if status is None:
+                    return
+        else:  # "status": written without the order mirror
+            status = record["status"]
+
+        history = self.histories.setdefault(db_id, [])
+        if not history or history[-1][0] != status:
+            history.append((status, record["ts"]))
+        if status in TERMINAL_STATUSES:
+            self._finished_at.setdefault(db_id, record["time"])
+
+    def record(self, db_id: str, order: dict, previous_status: Optional[str] = None):
+        """Append an order change; used as an order event listener"""
+        if self._file is None:
+            self.recover()
+        current = self.orders.get(db_id)
+        if not self.mirror_orders:
+            if order["status"] == previous_status:
+                return
+            record = {"type": "status", "status": order["status"]}
+        elif current is None:
+            record = {"type": "created", "order": dict(order)}
+        else:
+            changes = current.diff(order)
+            if not changes:
+                return
+            record = {"type": "updated", "changes": changes}
+
+        self.seq += 1
+        record.update({
+            "seq": self.seq,
+            "db_id": db_id,
+            "ts": datetime.now().isoformat(),
+            "time": time.time(),
+        })
+        payload = json.dumps(record, separators=(",", ":")).encode()
+        self._file.write(RECORD_HEADER.pack(len(payload), zlib.crc32(payload)) + payload)
+        self._file.flush()
+        self._apply(record)
+
+        self._since_snapshot += 1
+        if self._since_snapshot >= self.snapshot_every and self._snapshotting is None:
+            self._snapshotting = asyncio.create_task(self._snapshot_in_background())
+
+    async def _snapshot_in_background(self):
+        try:
+            await asyncio.to_thread(self._write_snapshot, *self._begin_snapshot())
+        except Exception as exc:
+            # The old segments are kept, so nothing is lost; retried next time
+            print(f"Order event log snapshot failed: {exc}")
+        finally:
+            self._snapshotting = None
+
+    def snapshot(self):
+        """Write current state and start a fresh log segment"""
+        self._write_snapshot(*self._begin_snapshot())
+
+    def _begin_snapshot(self) -> Tuple[dict, int]:
+        """
+        Start a new segment and capture what the snapshot will hold, on the
+        event loop. Records are captured by reference: changes made while
+        the snapshot is written are also in the new segment, and replaying
+        them over the snapshot is harmless.
+        """
+        cutoff = time.time() - self.retention_seconds
+        for db_id, finished_at in list(self._finished_at.items()):
+            if finished_at < cutoff:
+                del self._finished_at[db_id]
+                self.orders.pop(db_id, None)
+                self.histories.pop(db_id, None)
+
+        old_generation = self.generation
+        self.generation += 1
+        snapshot = {
+            "generation": self.generation,
+            "seq": self.seq,
+            "orders": list(self.orders.items()),
+            "histories": {db_id: tuple(history) for db_id, history in self.histories.items()},
+            "finished_at": dict(self._finished_at),
+        }
+        self._open_segment()
+        self._since_snapshot = 0
+        return snapshot, old_generation
+
+    def _write_snapshot(self, snapshot: dict, old_generation: int):
+        snapshot["orders"] = {db_id: order.to_dict() for db_id, order in snapshot["orders"]}
+        data = zlib.compress(json.dumps(snapshot, separators=(",", ":")).encode())
+        tmp_path = os.path.join(self.directory, SNAPSHOT_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.directory, SNAPSHOT_FILE))
+
+        for path in glob.glob(os.path.join(self.directory, "events-*.log")):
+            if self._generation_of(path) <= old_generation:
+                os.remove(path)
+
+    async def close(self):
+        if self._snapshotting is not None:
+            await self._snapshotting
+        if self._file is not None:
+            await asyncio.to_thread(self._write_snapshot, *self._begin_snapshot())
+            self._file.close()
+            self._file = None
+
+    # Reading
+    def history(self, db_id: str) -> List[dict]:
+        return [{"status": status, "timestamp": ts} for status, ts in self.histories.get(db_id, ())]
+
+
+event_log = OrderEventLog(
+    settings.EVENT_LOG_DIR,
+    snapshot_every=settings.EVENT_LOG_SNAPSHOT_EVERY,
+    retention_seconds=settings.EVENT_LOG_RETENTION_HOURS * 3600,
+    mirror_orders=not get_repository().durable,
+)
+
+
+def get_event_log() -> OrderEventLog:
+    """Get order event log instance"""
+    return event_log
@@ -0,0 +1,128 @@
+import asyncio
+from collections import OrderedDict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set
+
+# Statuses after which no further events are expected
+TERMINAL_STATUSES = {"delivered", "cancelled"}
+
+
+def _value(value):
+    value = getattr(value, "value", value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+class _History:
+    """Recent status events of one order; a list, as a deque would cost ~700 bytes per order"""
+
+    __slots__ = ("last_id", "events")
+
+    def __init__(self):
+        self.last_id = 0
+        self.events: List[dict] = []
+
+
+class OrderEventBus:
+    """
+    Order change notifier.
+
+    Every change is handed to the registered listeners (kitchen queue,
+    scheduler and so on). Status changes are also kept in a small per-order
+    ring buffer and fanned out to per-order subscribers, so a reconnecting
+    client can resume from its Last-Event-ID instead of refetching.
+    """
+
+    def __init__(self, history_size: int = 16, max_orders: int = 10000):
+        self.history_size = history_size
+        self.max_orders = max_orders
+        # order db id -> recent events; least recently changed order first
+        self._history: "OrderedDict[str, _History]" = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._listeners: List[Callable[[str, dict, Optional[str]], None]] = []
+
+    def add_listener(self, listener: Callable[[str, dict, Optional[str]], None]):
+        """Register a callback run for every change as (db_id, order, previous_status)"""
+        self._listeners.append(listener)
+
+    def publish(self, db_id: str, order: dict, previous_status: Optional[str] = None):
+        """Announce that an order was created or changed"""
+        for listener in self._listeners:
+            try:
+                listener(db_id, order, previous_status)
+            except Exception as exc:
+                print(f"Order listener {listener.__name__} failed for {db_id}: {exc}")
+
+        status = _value(order["status"])
+        if status == _value(previous_status):
+            return
+
+        history = self._history.get(db_id)
+        if history is None:
+            history = self._history[db_id] = _History()
+            while len(self._history) > self.max_orders:
+                self._history.popitem(last=False)
+        else:
+            self._history.move_to_end(db_id)
+
+        history.last_id += 1
+        event = {"id": history.last_id, "event": "status", "data": self.event_data(order)}
+        history.events.append(event)
+        if len(history.events) > self.history_size:
+            del history.events[0]
+
+        for queue in self._subscribers.get(db_id, ()):
+            queue.put_nowait(event)
+
+    @staticmethod
+    def event_data(order: dict) -> dict:
+        return {
+            "id": order["id"],
+            "order_id": order["order_id"],
+            "status": _value(order["status"]),
+            "payment_status": _value(order.get("payment_status")),
+            "estimated_delivery": _value(order.get("estimated_delivery")),
+            "updated_at": _value(order.get("updated_at")),
+        }
+
+    def last_event_id(self, db_id: str) -> int:
+        history = self._history.get(db_id)
+        return history.last_id if history else 0
+
+    def replay(self, db_id: str, last_event_id: int) -> Optional[List[dict]]:
+        """
+        Events after last_event_id, or None when they have already been
+        evicted from the ring buffer and the client must take a snapshot
+        """
+        history = self._history.get(db_id)
+        if history is None:
+            return None if last_event_id else []
+        if last_event_id > history.last_id:
+            # Counter was reset (e.g. restart); the client's id is meaningless
+            return None
+        events = history.events
+        if events and events[0]["id"] > last_event_id + 1:
+            return None
+        return [event for event in events if event["id"] > last_event_id]
+
+    def subscribe(self, db_id: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(db_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, db_id: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(db_id)
+        if subscribers is None:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[db_id]
+
+
+order_events = OrderEventBus()
+
+
+def get_order_events() -> OrderEventBus:
+    """Get order event bus instance"""
+    return order_events
@@ -0,0 +1,194 @@
+import asyncio
+import logging
+import os
+import secrets
+import time
+from typing import Optional
+
+from app.config import settings
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# Crockford base32: no I, L, O or U, so IDs survive being read out over the phone
+ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+PREFIX = "CC-"
+TIME_WIDTH = 9  # offset milliseconds since the Unix epoch, good until the year 2730
+NODE_WIDTH = 2
+SEQ_WIDTH = 2
+RANDOM_WIDTH = 6  # IDs are the only key to the public order endpoints, so the tail is unguessable
+# Shifts the timestamp so it starts with a letter (B until 2039): new IDs then
+# sort after the older CC-YYYYMMDD-XXXXXX ones, which start with a digit
+TIME_OFFSET = 10 * 32 ** (TIME_WIDTH - 1)
+MAX_NODE = 32 ** NODE_WIDTH - 2  # ZZ is reserved for IDs made by the database trigger
+MAX_SEQ = 32 ** SEQ_WIDTH - 1
+
+
+def encode(value: int, width: int) -> str:
+    """Fixed-width Crockford base32, so string order matches numeric order"""
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(ALPHABET[digit])
+    return "".join(reversed(chars))
+
+
+def decode(text: str) -> int:
+    value = 0
+    for char in text:
+        value = value * 32 + ALPHABET.index(char)
+    return value
+
+
+def configured_node_id() -> int:
+    """
+    NODE_ID, or 0 for a single worker. Several workers sharing a node could
+    mint the same ID, so running more than one (WEB_CONCURRENCY) without
+    NODE_ID, or NODE_ID_BACKEND=redis to lease one, is refused.
+    """
+    if settings.NODE_ID is not None:
+        return settings.NODE_ID
+    workers = int(os.getenv("WEB_CONCURRENCY") or 1)
+    if workers > 1 and settings.NODE_ID_BACKEND != "redis":
+        raise RuntimeError(
+            f"{workers} workers need a unique NODE_ID each (or NODE_ID_BACKEND=redis)"
+        )
+    return 0
+
+
+class OrderIdGenerator:
+    """
+    Human-readable, time-sortable order IDs: ``CC-`` + milliseconds + node +
+    sequence + random tail.
+
+    Each process owns a node number, so IDs are unique without a database
+    round-trip or any coordination between workers. Within a process the
+    sequence orders IDs made in the same millisecond; if it runs out (or the
+    clock steps back) the generator borrows the next millisecond, so IDs
+    are strictly increasing. Because the timestamp leads, IDs sort by
+    creation time across nodes and can be used as a listing cursor. The
+    random tail keeps neighbouring IDs from being guessed from one another.
+    """
+
+    def __init__(self, node_id: int = 0):
+        self._last_ms = 0
+        self._seq = 0
+        self.set_node(node_id)
+
+    def set_node(self, node_id: int):
+        if not 0 <= node_id <= MAX_NODE:
+            raise ValueError(f"Node ID must be between 0 and {MAX_NODE}")
+        self.node_id = node_id
+        self.node = encode(node_id, NODE_WIDTH)
+
+    def next_id(self) -> str:
+        now_ms = int(time.time() * 1000)
+        if now_ms > self._last_ms:
+            self._last_ms = now_ms
+            self._seq = 0
+        elif self._seq < MAX_SEQ:
+            self._seq += 1
+        else:
+            self._last_ms += 1
+            self._seq = 0
+        return (
+            f"{PREFIX}{encode(self._last_ms + TIME_OFFSET, TIME_WIDTH)}{self.node}"
+            f"{encode(self._seq, SEQ_WIDTH)}{encode(secrets.randbelow(32 ** RANDOM_WIDTH), RANDOM_WIDTH)}"
+        )
+
+
+# Deletes the lease only while it is still ours
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+# Extends the lease only while it is still ours
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class RedisNodeLease:
+    """
+    Leases a free node number in Redis for a generator (NODE_ID_BACKEND=redis).
+
+    Leases expire unless renewed, so a crashed worker's node frees up after
+    `ttl`. If a renewal finds the lease gone (Redis lost it, or this worker
+    could not reach it for longer than `ttl`) the generator moves to a newly
+    leased node rather than share one.
+    """
+
+    def __init__(self, generator: OrderIdGenerator, url: str, ttl: float = 60.0):
+        if redis is None:
+            raise RuntimeError("NODE_ID_BACKEND=redis requires the redis package")
+        self.generator = generator
+        self.ttl = ttl
+        self.client = redis.from_url(url)
+        self.token = f"{os.uname().nodename}:{os.getpid()}:{secrets.token_hex(8)}"
+        self._release = self.client.register_script(RELEASE_SCRIPT)
+        self._renew = self.client.register_script(RENEW_SCRIPT)
+        self._task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _key(node_id: int) -> str:
+        return f"order-node:{node_id}"
+
+    async def _acquire(self) -> int:
+        # Start at a random node so workers booting together rarely contend
+        first = secrets.randbelow(MAX_NODE + 1)
+        for offset in range(MAX_NODE + 1):
+            node_id = (first + offset) % (MAX_NODE + 1)
+            if await self.client.set(self._key(node_id), self.token, nx=True, px=int(self.ttl * 1000)):
+                return node_id
+        raise RuntimeError(f"All {MAX_NODE + 1} order ID nodes are leased")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.ttl / 3)
+            try:
+                key = self._key(self.generator.node_id)
+                if not await self._renew(keys=[key], args=[self.token, int(self.ttl * 1000)]):
+                    logger.error("Order ID node %s lease was lost; leasing another", self.generator.node_id)
+                    self.generator.set_node(await self._acquire())
+            except Exception:
+                logger.exception("Could not renew the order ID node lease")
+
+    async def start(self):
+        self.generator.set_node(await self._acquire())
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._release(keys=[self._key(self.generator.node_id)], args=[self.token])
+
+
+order_ids = OrderIdGenerator(configured_node_id())
+node_lease: Optional[RedisNodeLease] = None
+if settings.NODE_ID_BACKEND == "redis" and settings.NODE_ID is None:
+    node_lease = RedisNodeLease(order_ids, settings.REDIS_URL)
+
+
+def get_order_id_generator() -> OrderIdGenerator:
+    """Get order ID generator instance"""
+    return order_ids
+
+
+def get_node_lease() -> Optional[RedisNodeLease]:
+    """Get the Redis node lease, or None when NODE_ID is fixed"""
+    return node_lease
@@ -0,0 +1,112 @@
+import sys
+from typing import Dict, FrozenSet, Tuple
+
+from app.models.order import DeliveryAddress, Order, OrderItem
+
+# Stands in for keys the source dict did not have, so to_dict() round-trips
+_MISSING = object()
+
+
+class Record:
+    """
+    Compact stand-in for one JSON order dict (or a nested part of it).
+
+    Values live in __slots__ instead of a per-record dict, and
+    low-cardinality strings (statuses, item names, cities) are interned so
+    every record shares one copy. Keys outside FIELDS are kept in `extra`.
+    Records are converted back with to_dict() when they leave the store.
+    """
+
+    __slots__ = ("extra",)
+    FIELDS: Tuple[str, ...] = ()
+    INTERNED: Tuple[str, ...] = ()
+    KEYS: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.KEYS = frozenset(cls.FIELDS)
+
+    def __init__(self, data: dict):
+        extra = None
+        for key, value in data.items():
+            if key in self.KEYS:
+                self._set(key, value)
+            else:
+                if extra is None:
+                    extra = {}
+                extra[key] = value
+        for key in self.FIELDS:
+            if key not in data:
+                setattr(self, key, _MISSING)
+        self.extra = extra
+
+    def _set(self, key: str, value):
+        if key in self.INTERNED and type(value) is str:
+            value = sys.intern(value)
+        setattr(self, key, value)
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, _MISSING) if key in self.KEYS else (self.extra or {}).get(key, _MISSING)
+        return default if value is _MISSING else self._export(value)
+
+    @staticmethod
+    def _export(value):
+        return value
+
+    def to_dict(self) -> dict:
+        data = {}
+        for key in self.FIELDS:
+            value = getattr(self, key)
+            if value is not _MISSING:
+                data[key] = self._export(value)
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+
+class ItemRecord(Record):
+    FIELDS = tuple(OrderItem.model_fields)
+    INTERNED = ("menu_item_id", "name")
+    __slots__ = FIELDS
+
+
+class AddressRecord(Record):
+    FIELDS = tuple(DeliveryAddress.model_fields)
+    INTERNED = ("city",)
+    __slots__ = FIELDS
+
+
+class OrderRecord(Record):
+    """An order; items become a tuple of ItemRecords and the address an AddressRecord"""
+
+    FIELDS = tuple(Order.model_fields)
+    INTERNED = ("status", "payment_status", "payment_method", "rider_id", "branch")
+    __slots__ = FIELDS
+
+    def _set(self, key: str, value):
+        if key == "items" and value is not None:
+            value = tuple(ItemRecord(item) for item in value)
+        elif key == "delivery_address" and value is not None:
+            value = AddressRecord(value)
+        super()._set(key, value)
+
+    @staticmethod
+    def _export(value):
+        if isinstance(value, tuple):
+            return [item.to_dict() for item in value]
+        if isinstance(value, AddressRecord):
+            return value.to_dict()
+        return value
+
+    def update(self, changes: dict):
+        for key, value in changes.items():
+            if key in self.KEYS:
+                self._set(key, value)
+            else:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def diff(self, order: dict) -> Dict[str, object]:
+        """The fields of `order` whose values differ from this record's"""
+        return {key: value for key, value in order.items() if self.get(key, _MISSING) != value}
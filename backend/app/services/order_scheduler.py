@@ -0,0 +1,116 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+
+class OrderScheduler:
+    """
+    Holds scheduled orders until they must be released to the kitchen.
+
+    Release times live in a min-heap (O(log n) insert) and a single event
+    loop timer is armed for the earliest one, so nothing is ever scanned
+    periodically. Cancelled or rescheduled entries are dropped lazily when
+    they reach the top of the heap.
+    """
+
+    def __init__(
+        self,
+        on_release: Optional[Callable[[str], Union[None, Awaitable[None]]]] = None,
+        max_sleep: float = 300.0,
+    ):
+        self.on_release = on_release
+        # Long timers are re-armed at most this often to absorb clock drift
+        self.max_sleep = max_sleep
+        self._heap: List[Tuple[float, int, str]] = []
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._counter = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_held(self, db_id: str) -> bool:
+        return db_id in self._entries
+
+    def release_time(self, db_id: str) -> Optional[float]:
+        entry = self._entries.get(db_id)
+        return entry[0] if entry else None
+
+    def schedule(self, db_id: str, release_at: float):
+        """Hold an order until release_at (a Unix timestamp)"""
+        current = self._entries.get(db_id)
+        if current and current[0] == release_at:
+            return
+        seq = next(self._counter)
+        self._entries[db_id] = (release_at, seq)
+        heapq.heappush(self._heap, (release_at, seq, db_id))
+        if self._timer_at is None or release_at < self._timer_at:
+            self._arm()
+
+    def cancel(self, db_id: str):
+        """Stop holding an order; its heap entry is discarded lazily"""
+        self._entries.pop(db_id, None)
+
+    def _is_live(self, entry: Tuple[float, int, str]) -> bool:
+        current = self._entries.get(entry[2])
+        return current is not None and current[1] == entry[1]
+
+    def _arm(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_at = None
+
+        while self._heap and not self._is_live(self._heap[0]):
+            heapq.heappop(self._heap)
+        if not self._heap:
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No loop yet (e.g. loading at import); start() arms the timer
+            return
+
+        release_at = self._heap[0][0]
+        delay = max(0.0, min(release_at - time.time(), self.max_sleep))
+        self._timer = loop.call_later(delay, self._fire)
+        self._timer_at = release_at
+
+    def _fire(self):
+        self._timer = None
+        self._timer_at = None
+        now = time.time()
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            if not self._is_live(entry):
+                continue
+            del self._entries[entry[2]]
+            if self.on_release:
+                try:
+                    result = self.on_release(entry[2])
+                    if asyncio.iscoroutine(result):
+                        asyncio.ensure_future(result)
+                except Exception as exc:
+                    print(f"Failed to release scheduled order {entry[2]}: {exc}")
+        self._arm()
+
+    def start(self):
+        self._arm()
+
+    def stop(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_at = None
+
+
+order_scheduler = OrderScheduler()
+
+
+def get_order_scheduler() -> OrderScheduler:
+    """Get order scheduler instance"""
+    return order_scheduler
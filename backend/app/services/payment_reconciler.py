@@ -0,0 +1,236 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from app.config import settings
+from app.services.metrics import time_upstream
+
+# Paystack transaction states that will never change again
+FINAL_STATUSES = {"success", "failed", "reversed"}
+
+PAYSTACK_VERIFY_URL = "https://api.paystack.co/transaction/verify/{reference}"
+
+
+class PaymentVerificationError(Exception):
+    """Raised when Paystack cannot verify a transaction"""
+
+
+async def fetch_transaction(client: httpx.AsyncClient, reference: str) -> dict:
+    """Fetch a single transaction's state from Paystack"""
+    if not settings.PAYSTACK_SECRET_KEY:
+        return {
+            "status": "success",
+            "message": "Payment verified (mock)",
+            "reference": reference,
+            "amount": 10000,
+            "paid_at": "2024-01-01T12:00:00Z",
+        }
+
+    async with time_upstream("paystack", "verify"):
+        response = await client.get(
+            PAYSTACK_VERIFY_URL.format(reference=reference),
+            headers={"Authorization": f"Bearer {settings.PAYSTACK_SECRET_KEY}"},
+        )
+    if response.status_code != 200:
+        raise PaymentVerificationError("Failed to verify payment")
+
+    data = response.json()
+    if not data.get("status"):
+        raise PaymentVerificationError(data.get("message", "Payment verification failed"))
+
+    payment_data = data["data"]
+    return {
+        "status": payment_data["status"],
+        "message": data["message"],
+        "reference": payment_data["reference"],
+        "amount": payment_data["amount"],
+        "paid_at": payment_data.get("paid_at"),
+    }
+
+
+class PaymentReconciler:
+    """
+    Tracks pending payment references and verifies them against Paystack in
+    rate-limited background batches. Final results are cached (the
+    `max_final` most recent), so repeated client polls are answered locally.
+
+    Only references this app issued (`/initialize`) or Paystack sent
+    (webhook) are tracked. A poll for any other reference is verified once
+    and not followed up, so made-up references cannot queue background
+    calls to Paystack. In mock mode (no secret key) untracked references
+    are reported as not found, since the mock would otherwise "verify"
+    and cache any string.
+    """
+
+    def __init__(
+        self,
+        on_final: Optional[Callable[[str, dict], Awaitable[None]]] = None,
+        interval: float = 10.0,
+        concurrency: int = 5,
+        batch_size: int = 50,
+        pending_ttl: float = 86400.0,
+        max_final: int = 100000,
+    ):
+        self.on_final = on_final
+        self.interval = interval
+        self.batch_size = batch_size
+        self.pending_ttl = pending_ttl
+        self.max_final = max_final
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # reference -> {"order_id", "tracked_at", "checked_at", "result"}
+        self._pending: Dict[str, dict] = {}
+        # reference -> final verification result, least recently used first
+        self._final: "OrderedDict[str, dict]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def track(self, reference: str, order_id: Optional[str] = None):
+        """Start tracking a freshly initialized payment reference"""
+        if reference in self._final:
+            return
+        entry = self._pending.setdefault(
+            reference,
+            {"order_id": None, "tracked_at": time.monotonic(), "checked_at": 0.0, "result": None},
+        )
+        if order_id:
+            entry["order_id"] = order_id
+
+    def get_final(self, reference: str) -> Optional[dict]:
+        final = self._final.get(reference)
+        if final is not None:
+            self._final.move_to_end(reference)
+        return final
+
+    async def record(self, reference: str, result: dict):
+        """Record a verification result (from a poll, batch or webhook)"""
+        if reference in self._final:
+            return
+        entry = self._pending.get(reference)
+        if result["status"] not in FINAL_STATUSES:
+            if entry is not None:
+                entry["result"] = result
+                entry["checked_at"] = time.monotonic()
+            return
+
+        self._final[reference] = result
+        if len(self._final) > self.max_final:
+            self._final.popitem(last=False)
+        self._pending.pop(reference, None)
+        if self.on_final:
+            order_id = entry["order_id"] if entry else None
+            await self.on_final(order_id, result)
+
+    async def verify(self, reference: str) -> dict:
+        """
+        Return the state of a payment, hitting Paystack at most once per
+        interval per tracked reference no matter how many clients are polling
+        """
+        final = self.get_final(reference)
+        if final:
+            return final
+
+        entry = self._pending.get(reference)
+        if entry and entry["result"] and time.monotonic() - entry["checked_at"] < self.interval:
+            return entry["result"]
+        if entry is None and not settings.PAYSTACK_SECRET_KEY:
+            raise PaymentVerificationError("Transaction reference not found")
+
+        result = await self._check(reference)
+        await self.record(reference, result)
+        return result
+
+    async def _check(self, reference: str) -> dict:
+        """Verify one reference, coalescing concurrent checks for it"""
+        future = self._inflight.get(reference)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[reference] = future
+        try:
+            async with self._semaphore:
+                result = await fetch_transaction(self._get_client(), reference)
+            future.set_result(result)
+            return result
+        except Exception as exc:
+            future.set_exception(exc)
+            # Mark retrieved so unawaited failures are not logged
+            future.exception()
+            raise
+        finally:
+            del self._inflight[reference]
+
+    async def run_batch(self):
+        """Verify the stalest pending references in one concurrent batch"""
+        now = time.monotonic()
+        for reference, entry in list(self._pending.items()):
+            if now - entry["tracked_at"] > self.pending_ttl:
+                del self._pending[reference]
+
+        due = sorted(
+            (
+                (entry["checked_at"], reference)
+                for reference, entry in self._pending.items()
+                if now - entry["checked_at"] >= self.interval
+            )
+        )[: self.batch_size]
+        if not due:
+            return
+
+        results = await asyncio.gather(
+            *(self._check(reference) for _, reference in due),
+            return_exceptions=True,
+        )
+        for (_, reference), result in zip(due, results):
+            if isinstance(result, Exception):
+                entry = self._pending.get(reference)
+                if entry is not None:
+                    entry["checked_at"] = time.monotonic()
+                continue
+            await self.record(reference, result)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_batch()
+            except Exception as exc:
+                print(f"Payment reconciliation failed: {exc}")
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=10.0)
+        return self._client
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+reconciler = PaymentReconciler(
+    interval=settings.PAYSTACK_VERIFY_INTERVAL,
+    concurrency=settings.PAYSTACK_VERIFY_CONCURRENCY,
+    batch_size=settings.PAYSTACK_VERIFY_BATCH_SIZE,
+    max_final=settings.PAYSTACK_FINAL_CACHE_SIZE,
+)
+
+
+def get_payment_reconciler() -> PaymentReconciler:
+    """Get payment reconciler instance"""
+    return reconciler
@@ -0,0 +1,98 @@
+import asyncio
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Optional
+
+
+class ProfilerBusyError(Exception):
+    """A profile is already being taken"""
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler for a running worker.
+
+    A daemon thread wakes every `interval` seconds and records the Python
+    stack of every other thread via sys._current_frames(), which covers the
+    event loop (request handlers, background tasks) and the to_thread
+    workers alike. Nothing is hooked into the profiled code, so the cost is
+    one stack walk per thread per sample. Results are collapsed stacks
+    ("thread;frame;frame count" per line), the input format of
+    flamegraph.pl and speedscope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._counts: Counter = Counter()
+        self.samples = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def _sample_loop(self, interval: float):
+        own_id = threading.get_ident()
+        names = {}
+        while not self._stop.wait(interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id not in names:
+                    thread = next((t for t in threading.enumerate() if t.ident == thread_id), None)
+                    names[thread_id] = thread.name if thread else str(thread_id)
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names[thread_id])
+                self._counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def start(self, interval: float = 0.005):
+        with self._lock:
+            if self._thread is not None:
+                raise ProfilerBusyError("A profile is already running")
+            self._counts = Counter()
+            self.samples = 0
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._sample_loop, args=(interval,), name="sampling-profiler", daemon=True,
+            )
+            self._thread.start()
+
+    def stop(self) -> str:
+        """Stop sampling and return the collapsed stacks"""
+        with self._lock:
+            if self._thread is None:
+                return ""
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        return "".join(f"{stack} {count}\n" for stack, count in self._counts.most_common())
+
+    async def profile(self, seconds: float, interval: float = 0.005) -> str:
+        """Sample for `seconds` without blocking the event loop"""
+        self.start(interval)
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            result = self.stop()
+        return result
+
+
+profiler = SamplingProfiler()
+
+
+def get_profiler() -> SamplingProfiler:
+    """Get sampling profiler instance"""
+    return profiler
@@ -0,0 +1,207 @@
+import json
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from app.config import settings
+from app.services.metrics import metrics
+
+try:
+    import redis.asyncio as redis
+except ImportError:  # optional dependency
+    redis = None
+
+metrics.describe("rate_limited_total", "counter", "Requests rejected by a rate limit rule")
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    per_minute: float
+    burst: int
+    key_by: str = "ip"  # "ip" or "user" (verified JWT subject; IP when anonymous or invalid)
+    method: Optional[str] = None
+    path: Optional[str] = None  # exact path
+    prefix: Optional[str] = None  # or any path under this prefix
+
+    @property
+    def rate(self) -> float:
+        """Tokens per second"""
+        return self.per_minute / 60.0
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method and method != self.method:
+            return False
+        if self.path is not None:
+            return path.rstrip("/") == self.path
+        return self.prefix is None or path.startswith(self.prefix)
+
+
+def default_rules() -> List[RateLimitRule]:
+    """Per supabase/authentication_rules.md, plus a general per-client limit"""
+    return [
+        RateLimitRule(
+            "login", settings.RATE_LIMIT_LOGIN_PER_MINUTE, settings.RATE_LIMIT_LOGIN_PER_MINUTE,
+            method="POST", path="/api/auth/login",
+        ),
+        RateLimitRule(
+            "signup", settings.RATE_LIMIT_SIGNUP_PER_MINUTE, settings.RATE_LIMIT_SIGNUP_PER_MINUTE,
+            method="POST", path="/api/auth/register",
+        ),
+        RateLimitRule(
+            "api", settings.RATE_LIMIT_DEFAULT_PER_MINUTE, settings.RATE_LIMIT_DEFAULT_BURST,
+            key_by="user", prefix="/api/",
+        ),
+    ]
+
+
+class MemoryBucketStore:
+    """
+    Token buckets in process memory: (tokens, last refill) per key. Buckets
+    refill lazily when touched, so idle keys cost nothing but memory, and
+    the least recently used keys are dropped beyond `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until one is available)"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated) * rate)
+        if tokens >= 1.0:
+            allowed, retry_after = True, 0.0
+            tokens -= 1.0
+        else:
+            allowed, retry_after = False, (1.0 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+# Atomic token bucket shared by all workers; uses the Redis clock
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated")
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    allowed = 1
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / rate
+end
+redis.call("HSET", KEYS[1], "tokens", tokens, "updated", now)
+redis.call("EXPIRE", KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisBucketStore:
+    """Token buckets in Redis, so limits hold across workers and hosts"""
+
+    def __init__(self, url: str):
+        if redis is None:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the redis package")
+        self.client = redis.from_url(url)
+        self._script = self.client.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def take(self, key: str, rate: float, burst: int) -> Tuple[bool, float]:
+        allowed, retry_after = await self._script(keys=[f"ratelimit:{key}"], args=[rate, burst])
+        return bool(allowed), float(retry_after)
+
+
+def create_bucket_store(backend: str):
+    if backend == "memory":
+        return MemoryBucketStore()
+    if backend == "redis":
+        return RedisBucketStore(settings.REDIS_URL)
+    raise ValueError(f"Unknown rate limit backend: {backend}")
+
+
+def client_ip(scope) -> str:
+    if settings.TRUST_PROXY_HEADERS:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def client_user(scope) -> Optional[str]:
+    """
+    The user a verified bearer token was issued to, or None when there is
+    no token or it does not verify (those clients are limited by IP, so
+    made-up tokens cannot buy fresh buckets)
+    """
+    from jose import JWTError, jwt
+    for name, value in scope["headers"]:
+        if name == b"authorization" and value[:7].lower() == b"bearer ":
+            try:
+                payload = jwt.decode(
+                    value[7:].decode("latin-1"), settings.SECRET_KEY, algorithms=[settings.ALGORITHM],
+                )
+            except JWTError:
+                return None
+            subject = payload.get("sub")
+            return f"user:{subject}" if subject else None
+    return None
+
+
+async def send_json_error(send, status: int, detail: str, retry_after: float):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """
+    Token-bucket rate limiting per client and rule. The first matching rule
+    applies; requests over the limit get 429 with Retry-After. If the shared
+    store is unreachable, requests are let through rather than failed.
+    """
+
+    def __init__(self, app, rules: Optional[List[RateLimitRule]] = None, store=None):
+        self.app = app
+        self.rules = rules if rules is not None else default_rules()
+        self.store = store or create_bucket_store(settings.RATE_LIMIT_BACKEND)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        rule = next((r for r in self.rules if r.matches(method, path)), None)
+        if rule is not None:
+            client = (client_user(scope) if rule.key_by == "user" else None) or client_ip(scope)
+            try:
+                allowed, retry_after = await self.store.take(f"{rule.name}:{client}", rule.rate, rule.burst)
+            except Exception as exc:
+                print(f"Rate limit store unavailable, allowing request: {exc}")
+                allowed, retry_after = True, 0.0
+            if not allowed:
+                metrics.inc("rate_limited_total", (("rule", rule.name),))
+                await send_json_error(send, 429, "Too many requests, please slow down", retry_after)
+                return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,293 @@
+import asyncio
+import logging
+import random
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Set, Tuple
+
+from app.config import settings
+from app.services.metrics import metrics
+from app.services.storage import create_object_store
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("receipts_generated_total", "counter", "Receipt PDFs rendered and stored")
+metrics.describe("receipt_failures_total", "counter", "Receipts given up on after repeated failures")
+
+RECEIPTS_BUCKET = "receipts"
+DELIVERED = "delivered"
+
+# 80mm till roll; Courier keeps columns aligned without font metrics
+PAGE_WIDTH = 226
+MARGIN = 14
+FONT_SIZE = 8
+LINE_HEIGHT = 11
+LINE_CHARS = int((PAGE_WIDTH - 2 * MARGIN) / (FONT_SIZE * 0.6))
+
+
+def receipt_path(order: dict) -> str:
+    """`{user-id}/{order-id}.pdf`, so the bucket's per-user RLS policy applies"""
+    return f"{order.get('user_id') or 'guest'}/{order['order_id']}.pdf"
+
+
+def _money(amount: int) -> str:
+    return f"NGN {amount:,}"
+
+
+def _columns(left: str, right: str) -> str:
+    left = left[:LINE_CHARS - len(right) - 1]
+    return left + " " * (LINE_CHARS - len(left) - len(right)) + right
+
+
+def receipt_lines(order: dict) -> List[Tuple[bool, str]]:
+    """The receipt as (bold, text) lines"""
+    address = order["delivery_address"]
+    rule = (False, "-" * LINE_CHARS)
+    lines = [
+        (True, "CHIP CHOP FOOD LOUNGE".center(LINE_CHARS)),
+        (False, "Delivery receipt".center(LINE_CHARS)),
+        rule,
+        (False, _columns("Order", order["order_id"])),
+        (False, _columns("Placed", str(order["created_at"])[:16].replace("T", " "))),
+        (False, _columns("Delivered", str(order.get("updated_at") or "")[:16].replace("T", " "))),
+        rule,
+    ]
+    for item in order["items"]:
+        amount = _money(item["price"] * item["quantity"])
+        lines.append((False, _columns(f"{item['quantity']} x {item['name']}", amount)))
+    lines.append(rule)
+    lines.append((False, _columns("Subtotal", _money(order["subtotal"]))))
+    lines.append((False, _columns("Delivery", _money(order["delivery_fee"]))))
+    if order.get("discount"):
+        lines.append((False, _columns("Discount", "-" + _money(order["discount"]))))
+    lines.append((True, _columns("TOTAL", _money(order["total"]))))
+    lines.append(rule)
+    lines.append((False, _columns("Paid by", str(order["payment_method"]))))
+    if order.get("payment_reference"):
+        lines.append((False, _columns("Reference", order["payment_reference"])))
+    lines.append((False, f"Deliver to: {address['full_name']}"[:LINE_CHARS]))
+    for text in (address["address"], address["city"]):
+        lines.append((False, text[:LINE_CHARS]))
+    lines.append(rule)
+    lines.append((False, "Thank you for eating with us!".center(LINE_CHARS)))
+    return lines
+
+
+def _pdf_string(text: str) -> bytes:
+    data = text.encode("latin-1", errors="replace")
+    return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+
+class ReceiptTemplate:
+    """
+    A one-page PDF with the catalog, page tree and fonts serialized once.
+
+    Rendering a receipt only writes the page (its height follows the
+    number of lines), the compressed content stream and the xref table.
+    """
+
+    # 1 catalog, 2 page tree, 3/4 fonts are fixed; 5 page and 6 content vary
+    FIXED_OBJECTS = (
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [5 0 R] /Count 1 >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>",
+    )
+
+    def __init__(self):
+        prefix = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self.offsets = []
+        for number, body in enumerate(self.FIXED_OBJECTS, start=1):
+            self.offsets.append(len(prefix))
+            prefix += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+        self.prefix = bytes(prefix)
+
+    def render(self, order: dict) -> bytes:
+        lines = receipt_lines(order)
+        height = 2 * MARGIN + LINE_HEIGHT * len(lines)
+
+        ops = [b"BT", b"%d TL" % LINE_HEIGHT, b"%d %d Td" % (MARGIN, height - MARGIN - FONT_SIZE)]
+        bold = None
+        for line_bold, text in lines:
+            if line_bold != bold:
+                ops.append(b"/F%d %d Tf" % (2 if line_bold else 1, FONT_SIZE))
+                bold = line_bold
+            ops.append(_pdf_string(text) + b" Tj T*")
+        ops.append(b"ET")
+        stream = zlib.compress(b"\n".join(ops))
+
+        out = bytearray(self.prefix)
+        offsets = list(self.offsets)
+        page = (
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents 6 0 R >>"
+        ) % (PAGE_WIDTH, height)
+        content = b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream" % (len(stream), stream)
+        for number, body in ((5, page), (6, content)):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(offsets) + 1)
+        for offset in offsets:
+            out += b"%010d 00000 n \n" % offset
+        out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(offsets) + 1, xref)
+        return bytes(out)
+
+
+TEMPLATE = ReceiptTemplate()
+
+
+def render_receipts(orders: List[dict]) -> List[bytes]:
+    """Render a batch of receipts; runs in a worker process"""
+    return [TEMPLATE.render(order) for order in orders]
+
+
+class ReceiptWorker:
+    """
+    Produces a PDF receipt for every delivered order, off the request path.
+
+    `enqueue` is an order event listener that only queues the order, so
+    status updates never wait on a receipt. The worker takes the first
+    queued order, gathers more for up to `batch_wait` seconds (at most
+    `batch_size`), renders the batch in one process pool call and uploads
+    the PDFs concurrently. A failed receipt is queued again after
+    `retry_delay` seconds, doubling per attempt (with jitter, so a burst
+    of failures does not retry in lockstep), and given up on after
+    `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        store,
+        workers: int = 1,
+        batch_size: int = 20,
+        batch_wait: float = 2.0,
+        upload_concurrency: int = 5,
+        max_attempts: int = 3,
+        retry_delay: float = 5.0,
+    ):
+        self.store = store
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self._semaphore = asyncio.Semaphore(upload_concurrency)
+        self._queue: "asyncio.Queue[Tuple[dict, int]]" = asyncio.Queue()
+        self._queued: Set[str] = set()
+        self._retries: Set[asyncio.TimerHandle] = set()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def enqueue(self, db_id: str, order: dict, previous_status: Optional[str] = None):
+        """Order listener: queue a receipt when an order becomes delivered"""
+        if order["status"] != DELIVERED or previous_status == DELIVERED:
+            return
+        self._submit(order, 1)
+
+    def _submit(self, order: dict, attempt: int):
+        if order["id"] not in self._queued:
+            self._queued.add(order["id"])
+            self._queue.put_nowait((order, attempt))
+
+    def _retry_later(self, order: dict, attempt: int):
+        """Queue attempt `attempt` after its backoff; the order stays marked as queued"""
+        delay = self.retry_delay * 2 ** (attempt - 2) * random.uniform(0.5, 1.5)
+
+        def requeue():
+            self._retries.discard(handle)
+            self._queue.put_nowait((order, attempt))
+
+        handle = asyncio.get_running_loop().call_later(delay, requeue)
+        self._retries.add(handle)
+
+    async def fetch(self, order: dict) -> Optional[bytes]:
+        """The stored receipt; a missing one (lost to a restart) is queued again"""
+        pdf = await self.store.get(RECEIPTS_BUCKET, receipt_path(order))
+        if pdf is None:
+            self._submit(order, 1)
+        return pdf
+
+    async def _next_batch(self) -> List[Tuple[dict, int]]:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _upload(self, order: dict, pdf: bytes):
+        async with self._semaphore:
+            await self.store.put(RECEIPTS_BUCKET, receipt_path(order), pdf, "application/pdf")
+
+    async def process_batch(self, batch: List[Tuple[dict, int]]):
+        orders = [order for order, _ in batch]
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            pdfs = await asyncio.get_running_loop().run_in_executor(self._pool, render_receipts, orders)
+            results = await asyncio.gather(
+                *(self._upload(order, pdf) for order, pdf in zip(orders, pdfs)),
+                return_exceptions=True,
+            )
+        except Exception as exc:
+            results = [exc] * len(batch)
+
+        for (order, attempt), result in zip(batch, results):
+            if isinstance(result, Exception) and attempt < self.max_attempts:
+                self._retry_later(order, attempt + 1)
+                continue
+            self._queued.discard(order["id"])
+            if not isinstance(result, Exception):
+                metrics.inc("receipts_generated_total")
+            else:
+                metrics.inc("receipt_failures_total")
+                logger.error("Giving up on receipt for %s: %s", order["order_id"], result)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self.process_batch(batch)
+            except Exception:
+                logger.exception("Receipt batch failed")
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for handle in self._retries:
+            handle.cancel()
+        self._retries.clear()
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+receipt_worker = ReceiptWorker(
+    create_object_store(settings.RECEIPT_STORAGE_BACKEND, settings.RECEIPTS_DIR),
+    workers=settings.RECEIPT_WORKERS,
+    batch_size=settings.RECEIPT_BATCH_SIZE,
+    batch_wait=settings.RECEIPT_BATCH_WAIT,
+    retry_delay=settings.RECEIPT_RETRY_DELAY,
+)
+
+
+def get_receipt_worker() -> ReceiptWorker:
+    """Get receipt worker instance"""
+    return receipt_worker
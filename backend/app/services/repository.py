@@ -0,0 +1,281 @@
+import asyncio
+import copy
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.order_records import OrderRecord
+
+
+class VersionConflictError(Exception):
+    """The stored order changed since the caller read it"""
+    pass
+
+
+class DuplicateOrderIdError(Exception):
+    """A new order reused the human-readable order_id of another order"""
+    pass
+
+
+def order_version(order: dict) -> int:
+    """Version of a stored order; rows written before versioning count as 0"""
+    return order.get("version") or 0
+
+
+def menu_branch(item: dict) -> str:
+    """Branch a menu item belongs to; items saved before branches are the default's"""
+    return item.get("branch") or settings.default_branch
+
+
+class MenuIndex:
+    """
+    Menu items by ID, and per branch in insertion order, so listing one
+    branch's menu never walks the others'.
+    """
+
+    def __init__(self):
+        self._items: Dict[str, dict] = {}
+        self._branches: Dict[str, Dict[str, dict]] = {}
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, item_id: str) -> Optional[dict]:
+        return self._items.get(item_id)
+
+    def put(self, item: dict):
+        self.pop(item["id"])
+        self._items[item["id"]] = item
+        self._branches.setdefault(menu_branch(item), {})[item["id"]] = item
+
+    def pop(self, item_id: str) -> Optional[dict]:
+        item = self._items.pop(item_id, None)
+        if item is not None:
+            self._branches[menu_branch(item)].pop(item_id, None)
+        return item
+
+    def values(self, branch: Optional[str] = None) -> List[dict]:
+        if branch is None:
+            return list(self._items.values())
+        return list(self._branches.get(branch, {}).values())
+
+
+class Repository:
+    """
+    Storage interface used by the API routers.
+
+    Records are plain JSON-compatible dicts (``model_dump(mode="json")``).
+    The menu catalog is small and read on every browse, so every backend
+    keeps it in memory and catalog reads are synchronous; everything else
+    is async so backends can go to the network.
+    """
+
+    # Whether data survives a restart without help from the order event log
+    durable = True
+    # Called as fn(item_id, item, previous) when a menu change made elsewhere
+    # (another worker) is picked up; item is None for a deletion
+    on_menu_change: Optional[Callable[[str, Optional[dict], Optional[dict]], None]] = None
+
+    async def start(self):
+        """Load state and start background work"""
+
+    async def stop(self):
+        """Flush pending writes and stop background work"""
+
+    async def ping(self):
+        """Round-trip to the backing store; raises if it is unreachable"""
+
+    def pool_stats(self) -> Dict[str, int]:
+        """Connection pool and write backlog figures for readiness checks"""
+        return {}
+
+    # Orders
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        """Find an order by db ID or human-readable order_id"""
+        raise NotImplementedError
+
+    async def get_orders(self, order_ids: List[str]) -> Dict[str, dict]:
+        """Orders found for any of the db IDs / order_ids, keyed by the ID asked for"""
+        orders = await asyncio.gather(*(self.get_order(order_id) for order_id in order_ids))
+        return {order_id: order for order_id, order in zip(order_ids, orders) if order}
+
+    async def get_order_by_payment_reference(self, reference: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def list_orders(
+        self,
+        status: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+        before: Optional[str] = None,
+    ) -> Tuple[List[dict], int]:
+        """
+        Orders newest first (by their time-sortable order_id), optionally
+        only those older than the `before` order_id, with the total count
+        before pagination
+        """
+        raise NotImplementedError
+
+    async def save_order(self, order: dict, expected_version: Optional[int] = None) -> dict:
+        """
+        Insert or replace an order. With expected_version the write is a
+        compare-and-set: it only happens if the stored order still has that
+        version, otherwise VersionConflictError is raised.
+        """
+        raise NotImplementedError
+
+    # Users
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def save_user(self, user: dict) -> dict:
+        raise NotImplementedError
+
+    # Menu
+    def list_menu_items(self, branch: Optional[str] = None) -> List[dict]:
+        """Menu items of one branch, or of every branch"""
+        raise NotImplementedError
+
+    def get_menu_item(self, item_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    async def save_menu_item(self, item: dict) -> dict:
+        raise NotImplementedError
+
+    async def delete_menu_item(self, item_id: str) -> bool:
+        raise NotImplementedError
+
+
+class InMemoryRepository(Repository):
+    """
+    Process-local storage; also the working set for the other backends.
+
+    Orders are held as compact OrderRecords and handed out as fresh dicts.
+    """
+
+    durable = False
+
+    def __init__(self, menu_items: Optional[List[dict]] = None):
+        self.orders: Dict[str, OrderRecord] = {}
+        self.users: Dict[str, dict] = {}
+        self.menu_items = MenuIndex()
+        # Secondary indexes
+        self._order_ids: Dict[str, str] = {}  # human-readable order_id -> db id
+        self._payment_refs: Dict[str, str] = {}  # payment reference -> db id
+        self._emails: Dict[str, str] = {}  # email -> user id
+        for item in menu_items or []:
+            self.menu_items.put(copy.deepcopy(item))
+
+    # Orders
+    def _index_order(self, order: dict):
+        self._order_ids[order["order_id"]] = order["id"]
+        if order.get("payment_reference"):
+            self._payment_refs[order["payment_reference"]] = order["id"]
+
+    def _forget_order(self, db_id: str):
+        """Drop an order and its index entries from the store"""
+        record = self.orders.pop(db_id, None)
+        if record is None:
+            return
+        if self._order_ids.get(record.get("order_id")) == db_id:
+            del self._order_ids[record.get("order_id")]
+        reference = record.get("payment_reference")
+        if reference and self._payment_refs.get(reference) == db_id:
+            del self._payment_refs[reference]
+
+    def cached_order(self, order_id: str) -> Optional[dict]:
+        db_id = order_id if order_id in self.orders else self._order_ids.get(order_id)
+        record = self.orders.get(db_id) if db_id else None
+        return record.to_dict() if record else None
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        return self.cached_order(order_id)
+
+    async def get_orders(self, order_ids: List[str]) -> Dict[str, dict]:
+        orders = {order_id: self.cached_order(order_id) for order_id in order_ids}
+        return {order_id: order for order_id, order in orders.items() if order}
+
+    async def get_order_by_payment_reference(self, reference: str) -> Optional[dict]:
+        db_id = self._payment_refs.get(reference)
+        return self.cached_order(db_id) if db_id else None
+
+    async def list_orders(self, status=None, offset=0, limit=None, before=None):
+        records = list(self.orders.values())
+        if status:
+            records = [r for r in records if r.status == status]
+        total = len(records)
+        if before:
+            records = [r for r in records if r.order_id < before]
+        records.sort(key=lambda r: r.order_id, reverse=True)
+        end = None if limit is None else offset + limit
+        return [r.to_dict() for r in records[offset:end]], total
+
+    def _check_version(self, db_id: str, expected_version: Optional[int]):
+        if expected_version is None:
+            return
+        current = self.orders.get(db_id)
+        if current is None or order_version(current) != expected_version:
+            raise VersionConflictError(db_id)
+
+    async def save_order(self, order: dict, expected_version: Optional[int] = None) -> dict:
+        # No await between the check and the write, so this is atomic
+        self._check_version(order["id"], expected_version)
+        if self._order_ids.get(order["order_id"], order["id"]) != order["id"]:
+            raise DuplicateOrderIdError(order["order_id"])
+        self.orders[order["id"]] = OrderRecord(order)
+        self._index_order(order)
+        return order
+
+    # Users
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        return self.users.get(user_id)
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        user_id = self._emails.get(email)
+        return self.users.get(user_id) if user_id else None
+
+    async def save_user(self, user: dict) -> dict:
+        self.users[user["id"]] = user
+        self._emails[user["email"]] = user["id"]
+        return user
+
+    # Menu
+    def list_menu_items(self, branch: Optional[str] = None) -> List[dict]:
+        return self.menu_items.values(branch)
+
+    def get_menu_item(self, item_id: str) -> Optional[dict]:
+        return self.menu_items.get(item_id)
+
+    async def save_menu_item(self, item: dict) -> dict:
+        self.menu_items.put(item)
+        return item
+
+    async def delete_menu_item(self, item_id: str) -> bool:
+        return self.menu_items.pop(item_id) is not None
+
+
+def create_repository(backend: str) -> Repository:
+    """Build the storage backend named by settings.STORAGE_BACKEND"""
+    if backend == "memory":
+        from app.data.menu_items import SAMPLE_MENU_ITEMS
+        return InMemoryRepository(SAMPLE_MENU_ITEMS)
+    if backend == "supabase":
+        from app.services.supabase_repository import SupabaseRepository
+        return SupabaseRepository()
+    if backend == "sqlite":
+        from app.services.sqlite_repository import SQLiteRepository
+        return SQLiteRepository()
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+repository = create_repository(settings.STORAGE_BACKEND)
+
+
+def get_repository() -> Repository:
+    """Get repository instance"""
+    return repository
@@ -0,0 +1,85 @@
+import math
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.services.order_events import TERMINAL_STATUSES
+
+COLUMNS = ("latitude", "longitude", "heading", "speed", "timestamp")
+
+
+class RiderPositions:
+    """
+    Latest rider position per order, stored as columns.
+
+    Each column is a flat array of doubles (unknown heading/speed are NaN)
+    and an order's row is found through `_rows`, so a position costs five
+    floats plus its dict entry rather than an object per update. Rows of
+    delivered or cancelled orders are freed and reused.
+    """
+
+    def __init__(self):
+        self._columns: Dict[str, array] = {name: array("d") for name in COLUMNS}
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def update(
+        self,
+        order_id: str,
+        latitude: float,
+        longitude: float,
+        heading: Optional[float],
+        speed: Optional[float],
+        timestamp: float,
+    ):
+        values = (
+            latitude,
+            longitude,
+            math.nan if heading is None else heading,
+            math.nan if speed is None else speed,
+            timestamp,
+        )
+        row = self._rows.get(order_id)
+        if row is None:
+            if self._free:
+                row = self._free.pop()
+            else:
+                row = len(self._columns["latitude"])
+                for column in self._columns.values():
+                    column.append(0.0)
+            self._rows[order_id] = row
+        for name, value in zip(COLUMNS, values):
+            self._columns[name][row] = value
+
+    def get(self, order_id: str) -> Optional[dict]:
+        row = self._rows.get(order_id)
+        if row is None:
+            return None
+        position = {}
+        for name in COLUMNS:
+            value = self._columns[name][row]
+            position[name] = None if math.isnan(value) else value
+        position["timestamp"] = datetime.fromtimestamp(position["timestamp"]).isoformat()
+        return position
+
+    def remove(self, order_id: str):
+        row = self._rows.pop(order_id, None)
+        if row is not None:
+            self._free.append(row)
+
+    def on_order_event(self, db_id: str, order: dict, previous_status: Optional[str] = None):
+        """Order listener: forget positions of finished orders"""
+        if order["status"] in TERMINAL_STATUSES:
+            self.remove(db_id)
+            self.remove(order["order_id"])
+
+
+rider_positions = RiderPositions()
+
+
+def get_rider_positions() -> RiderPositions:
+    """Get rider positions instance"""
+    return rider_positions
@@ -0,0 +1,602 @@
+import asyncio
+import json
+import os
+import queue
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Set
+
+from app.config import settings
+from app.services.repository import MenuIndex, Repository, VersionConflictError
+from app.services.supabase_client import SupabaseClient
+from app.services.supabase_repository import (
+    ADDRESS_COLUMNS, ORDER_COLUMNS, USER_COLUMNS, order_to_rows,
+)
+
+# Mirrors supabase/db.sql. Menu items keep the category slug directly since
+# categories are a fixed enum in the API.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE NOT NULL,
+    full_name TEXT NOT NULL,
+    phone TEXT,
+    hashed_password TEXT,
+    is_active INTEGER DEFAULT 1,
+    is_verified INTEGER DEFAULT 0,
+    created_at TEXT,
+    updated_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS menu_items (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    description TEXT NOT NULL,
+    price INTEGER NOT NULL CHECK (price > 0),
+    image_url TEXT,
+    category TEXT NOT NULL,
+    is_available INTEGER DEFAULT 1,
+    dietary_tags TEXT DEFAULT '[]',
+    spicy_level INTEGER DEFAULT 0 CHECK (spicy_level >= 0 AND spicy_level <= 5),
+    calories INTEGER DEFAULT 0,
+    ingredients TEXT DEFAULT '[]',
+    preparation_time INTEGER DEFAULT 15,
+    created_at TEXT,
+    updated_at TEXT,
+    image_urls TEXT,
+    stock INTEGER,
+    branch TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_menu_items_category ON menu_items(category);
+CREATE INDEX IF NOT EXISTS idx_menu_items_available ON menu_items(is_available);
+
+CREATE TABLE IF NOT EXISTS orders (
+    id TEXT PRIMARY KEY,
+    order_id TEXT UNIQUE NOT NULL,
+    user_id TEXT REFERENCES users(id),
+    subtotal INTEGER NOT NULL,
+    delivery_fee INTEGER NOT NULL DEFAULT 1500,
+    discount INTEGER DEFAULT 0,
+    total INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    payment_status TEXT NOT NULL DEFAULT 'pending',
+    payment_method TEXT,
+    payment_reference TEXT,
+    scheduled_time TEXT,
+    estimated_delivery TEXT,
+    rider_id TEXT,
+    rider_location TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    branch TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_orders_user ON orders(user_id);
+CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status);
+CREATE INDEX IF NOT EXISTS idx_orders_created ON orders(created_at);
+CREATE INDEX IF NOT EXISTS idx_orders_payment_reference ON orders(payment_reference);
+
+CREATE TABLE IF NOT EXISTS order_items (
+    id TEXT PRIMARY KEY,
+    order_id TEXT REFERENCES orders(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    menu_item_id TEXT,
+    name TEXT NOT NULL,
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    price INTEGER NOT NULL,
+    special_instructions TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_order_items_order ON order_items(order_id);
+
+CREATE TABLE IF NOT EXISTS delivery_addresses (
+    order_id TEXT PRIMARY KEY REFERENCES orders(id) ON DELETE CASCADE,
+    full_name TEXT NOT NULL,
+    phone TEXT NOT NULL,
+    email TEXT,
+    address TEXT NOT NULL,
+    city TEXT NOT NULL,
+    landmark TEXT,
+    latitude REAL,
+    longitude REAL
+);
+
+-- Rows changed locally that still have to be replicated to Supabase
+CREATE TABLE IF NOT EXISTS sync_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    row_id TEXT NOT NULL
+);
+"""
+
+MENU_COLUMNS = (
+    "id", "name", "description", "price", "image_url", "category", "is_available",
+    "dietary_tags", "spicy_level", "calories", "ingredients", "preparation_time",
+    "created_at", "updated_at", "image_urls", "stock", "branch",
+)
+MENU_JSON_COLUMNS = ("dietary_tags", "ingredients")
+MENU_OBJECT_COLUMNS = ("image_urls",)  # JSON objects, NULL when unset
+MENU_BOOL_COLUMNS = ("is_available",)
+USER_BOOL_COLUMNS = ("is_active", "is_verified")
+ORDER_TABLE_COLUMNS = ORDER_COLUMNS + ("rider_id", "rider_location")
+# Columns added after the first release: name -> definition
+ORDER_MIGRATIONS = {"version": "INTEGER NOT NULL DEFAULT 0", "branch": "TEXT"}
+MENU_MIGRATIONS = {"image_urls": "TEXT", "stock": "INTEGER", "branch": "TEXT"}
+
+
+def _upsert_sql(table: str, columns, key: str = "id") -> str:
+    updates = ", ".join(f"{c} = excluded.{c}" for c in columns if c != key)
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) "
+        f"VALUES ({', '.join('?' for _ in columns)}) "
+        f"ON CONFLICT({key}) DO UPDATE SET {updates}"
+    )
+
+
+# Statements are module constants so each pooled connection's statement
+# cache reuses the compiled (prepared) form
+UPSERT_ORDER = _upsert_sql("orders", ORDER_TABLE_COLUMNS)
+UPSERT_ORDER_ITEM = _upsert_sql(
+    "order_items",
+    ("id", "order_id", "position", "menu_item_id", "name", "quantity", "price", "special_instructions"),
+)
+UPSERT_ADDRESS = _upsert_sql("delivery_addresses", ("order_id",) + ADDRESS_COLUMNS, key="order_id")
+UPSERT_USER = _upsert_sql("users", USER_COLUMNS)
+UPSERT_MENU_ITEM = _upsert_sql("menu_items", MENU_COLUMNS)
+INSERT_OUTBOX = "INSERT INTO sync_outbox (table_name, row_id) VALUES (?, ?)"
+SELECT_ORDER_BY_ID = "SELECT * FROM orders WHERE id = ?"
+SELECT_ORDER_VERSION = "SELECT version FROM orders WHERE id = ?"
+SELECT_ORDER_BY_ORDER_ID = "SELECT * FROM orders WHERE order_id = ?"
+SELECT_ORDER_BY_REFERENCE = "SELECT * FROM orders WHERE payment_reference = ?"
+# Bound parameters per IN list, under SQLite's default limit on older builds (999)
+IN_CHUNK = 500
+SELECT_USER_BY_ID = "SELECT * FROM users WHERE id = ?"
+SELECT_USER_BY_EMAIL = "SELECT * FROM users WHERE email = ?"
+SELECT_MENU_ITEM = "SELECT * FROM menu_items WHERE id = ?"
+
+
+def _in_chunks(values: list):
+    """(placeholders, chunk) pairs for `IN (...)` queries of at most IN_CHUNK values"""
+    for start in range(0, len(values), IN_CHUNK):
+        chunk = values[start:start + IN_CHUNK]
+        yield ", ".join("?" for _ in chunk), chunk
+
+
+class SQLitePool:
+    """
+    Fixed-size pool of WAL-mode connections used from worker threads.
+
+    Calls run on the pool's own executor with one thread per connection,
+    so a call never waits for a connection after getting a thread, and
+    database work does not queue behind other to_thread users (or leave
+    more threads contending for the GIL than there are connections).
+    """
+
+    def __init__(self, path: str, size: int = 4):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.size = size
+        self._connections: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        for _ in range(size):
+            self._connections.put(self._connect(path))
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix="sqlite")
+
+    @staticmethod
+    def _connect(path: str) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, cached_statements=256,
+        )
+        connection.row_factory = sqlite3.Row
+        connection.execute("PRAGMA journal_mode=WAL")
+        # WAL + NORMAL is durable across application crashes
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute("PRAGMA foreign_keys=ON")
+        connection.execute("PRAGMA busy_timeout=5000")
+        return connection
+
+    @property
+    def available(self) -> int:
+        """Connections not currently checked out"""
+        return self._connections.qsize()
+
+    @contextmanager
+    def connection(self):
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    async def run(self, fn: Callable[[sqlite3.Connection], object]):
+        """Run fn(connection) on a worker thread"""
+        def call():
+            with self.connection() as connection:
+                return fn(connection)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, call)
+
+    async def transaction(self, fn: Callable[[sqlite3.Connection], object]):
+        """Run fn(connection) inside a write transaction"""
+        def call(connection):
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(connection)
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            return result
+        return await self.run(call)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+
+def _menu_row_to_item(row: sqlite3.Row) -> dict:
+    item = dict(row)
+    for column in MENU_JSON_COLUMNS:
+        item[column] = json.loads(item[column] or "[]")
+    for column in MENU_OBJECT_COLUMNS:
+        item[column] = json.loads(item[column]) if item[column] else None
+    for column in MENU_BOOL_COLUMNS:
+        item[column] = bool(item[column])
+    return item
+
+
+def _menu_item_values(item: dict) -> list:
+    return [
+        json.dumps(item.get(c) or []) if c in MENU_JSON_COLUMNS
+        else json.dumps(item[c]) if c in MENU_OBJECT_COLUMNS and item.get(c)
+        else item.get(c)
+        for c in MENU_COLUMNS
+    ]
+
+
+def _is_uuid(value: str) -> bool:
+    try:
+        uuid.UUID(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _user_row_to_user(row: Optional[sqlite3.Row]) -> Optional[dict]:
+    if row is None:
+        return None
+    user = dict(row)
+    for column in USER_BOOL_COLUMNS:
+        user[column] = bool(user[column])
+    return user
+
+
+def _load_orders(connection: sqlite3.Connection, rows: List[sqlite3.Row]) -> List[dict]:
+    """Orders for order rows, with items and addresses read in one IN query each"""
+    orders = []
+    for row in rows:
+        order = dict(row)
+        order["rider_location"] = json.loads(order["rider_location"]) if order["rider_location"] else None
+        order["items"] = []
+        order["delivery_address"] = {}
+        orders.append(order)
+    by_id = {order["id"]: order for order in orders}
+    for placeholders, ids in _in_chunks(list(by_id)):
+        for item in connection.execute(
+            f"SELECT * FROM order_items WHERE order_id IN ({placeholders}) ORDER BY order_id, position", ids,
+        ):
+            by_id[item["order_id"]]["items"].append({
+                "menu_item_id": item["menu_item_id"],
+                "name": item["name"],
+                "quantity": item["quantity"],
+                "price": item["price"],
+                "special_instructions": item["special_instructions"],
+            })
+        for address in connection.execute(
+            f"SELECT * FROM delivery_addresses WHERE order_id IN ({placeholders})", ids,
+        ):
+            by_id[address["order_id"]]["delivery_address"] = {c: address[c] for c in ADDRESS_COLUMNS}
+    return orders
+
+
+def _load_order(connection: sqlite3.Connection, row: Optional[sqlite3.Row]) -> Optional[dict]:
+    return _load_orders(connection, [row])[0] if row is not None else None
+
+
+class SQLiteRepository(Repository):
+    """
+    Single-node storage in an embedded SQLite database (WAL mode).
+
+    Every write also records the changed row in `sync_outbox` within the
+    same transaction; a background job replicates outbox rows to Supabase
+    in batches whenever it is reachable, backing off while offline.
+
+    An empty local menu is pulled from Supabase on start. If that fails
+    (first start while offline, or sync disabled) the sample menu is served
+    from memory until a later pull succeeds; sample items are not stored
+    unless edited, and never replicated since Supabase ids are UUIDs.
+    """
+
+    def __init__(self, path: Optional[str] = None, pool_size: Optional[int] = None):
+        self.pool = SQLitePool(path or settings.SQLITE_PATH, pool_size or settings.SQLITE_POOL_SIZE)
+        with self.pool.connection() as connection:
+            connection.executescript(SCHEMA)
+            for table, migrations in (("orders", ORDER_MIGRATIONS), ("menu_items", MENU_MIGRATIONS)):
+                columns = {row["name"] for row in connection.execute(f"PRAGMA table_info({table})")}
+                for column, definition in migrations.items():
+                    if column not in columns:
+                        connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        self.menu_items = MenuIndex()
+        self.sync_enabled = settings.SQLITE_SYNC_ENABLED
+        self.sync_interval = settings.SQLITE_SYNC_INTERVAL
+        self.sync_batch_size = settings.ORDER_FLUSH_BATCH_SIZE
+        self.client = SupabaseClient(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        self._task: Optional[asyncio.Task] = None
+        self._seed_ids: Set[str] = set()
+        self._category_id_cache: Dict[str, str] = {}
+
+    async def start(self):
+        rows = await self.pool.run(
+            lambda c: c.execute("SELECT * FROM menu_items ORDER BY created_at").fetchall()
+        )
+        for row in rows:
+            self.menu_items.put(_menu_row_to_item(row))
+        if not self.menu_items and self.sync_enabled:
+            await self._pull_menu()
+        if not self.menu_items:
+            from app.data.menu_items import SAMPLE_MENU_ITEMS
+            for item in SAMPLE_MENU_ITEMS:
+                self.menu_items.put(dict(item))
+                self._seed_ids.add(item["id"])
+        if self.sync_enabled:
+            self._task = asyncio.create_task(self._run_sync())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.pool.close()
+
+    async def ping(self):
+        await self.pool.run(lambda c: c.execute("SELECT 1").fetchone())
+
+    def pool_stats(self) -> Dict[str, int]:
+        return {"connections": self.pool.size, "connections_available": self.pool.available}
+
+    # Orders
+    @staticmethod
+    def _fetch_order(connection: sqlite3.Connection, order_id: str) -> Optional[dict]:
+        row = connection.execute(SELECT_ORDER_BY_ID, (order_id,)).fetchone()
+        if row is None:
+            row = connection.execute(SELECT_ORDER_BY_ORDER_ID, (order_id,)).fetchone()
+        return _load_order(connection, row)
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        return await self.pool.run(lambda c: self._fetch_order(c, order_id))
+
+    async def get_orders(self, order_ids: List[str]) -> Dict[str, dict]:
+        # One pooled connection and thread hop for the whole batch, IN queries throughout
+        def fetch(connection):
+            rows = []
+            for placeholders, ids in _in_chunks(list(dict.fromkeys(order_ids))):
+                rows += connection.execute(
+                    f"SELECT * FROM orders WHERE id IN ({placeholders}) OR order_id IN ({placeholders})",
+                    ids + ids,
+                ).fetchall()
+            found = {}
+            for order in _load_orders(connection, list({row["id"]: row for row in rows}.values())):
+                for key in (order["id"], order["order_id"]):
+                    found[key] = order
+            return {order_id: found[order_id] for order_id in order_ids if order_id in found}
+        return await self.pool.run(fetch)
+
+    async def get_order_by_payment_reference(self, reference: str) -> Optional[dict]:
+        return await self.pool.run(
+            lambda c: _load_order(c, c.execute(SELECT_ORDER_BY_REFERENCE, (reference,)).fetchone())
+        )
+
+    async def list_orders(self, status=None, offset=0, limit=None, before=None):
+        conditions, params = (["status = ?"], [status]) if status else ([], [])
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        page_where = f"WHERE {' AND '.join(conditions + ['order_id < ?'])}" if before else where
+        page_params = params + [before] if before else params
+
+        def fetch(connection):
+            total = connection.execute(f"SELECT COUNT(*) FROM orders {where}", params).fetchone()[0]
+            rows = connection.execute(
+                f"SELECT * FROM orders {page_where} ORDER BY order_id DESC LIMIT ? OFFSET ?",
+                page_params + [-1 if limit is None else limit, offset],
+            ).fetchall()
+            return _load_orders(connection, rows), total
+        return await self.pool.run(fetch)
+
+    async def save_order(self, order: dict, expected_version: Optional[int] = None) -> dict:
+        def write(connection):
+            if expected_version is not None:
+                # BEGIN IMMEDIATE holds the write lock, so check-then-write is atomic
+                row = connection.execute(SELECT_ORDER_VERSION, (order["id"],)).fetchone()
+                if row is None or row[0] != expected_version:
+                    raise VersionConflictError(order["id"])
+            values = [order.get(c) for c in ORDER_TABLE_COLUMNS]
+            values[-1] = json.dumps(order["rider_location"]) if order.get("rider_location") else None
+            connection.execute(UPSERT_ORDER, values)
+            connection.executemany(UPSERT_ORDER_ITEM, [
+                (
+                    f"{order['id']}:{position}", order["id"], position, item["menu_item_id"],
+                    item["name"], item["quantity"], item["price"], item.get("special_instructions"),
+                )
+                for position, item in enumerate(order["items"])
+            ])
+            address = order["delivery_address"]
+            connection.execute(UPSERT_ADDRESS, [order["id"]] + [address.get(c) for c in ADDRESS_COLUMNS])
+            connection.execute(INSERT_OUTBOX, ("orders", order["id"]))
+        await self.pool.transaction(write)
+        return order
+
+    # Users
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        return await self.pool.run(
+            lambda c: _user_row_to_user(c.execute(SELECT_USER_BY_ID, (user_id,)).fetchone())
+        )
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        return await self.pool.run(
+            lambda c: _user_row_to_user(c.execute(SELECT_USER_BY_EMAIL, (email,)).fetchone())
+        )
+
+    async def save_user(self, user: dict) -> dict:
+        def write(connection):
+            connection.execute(UPSERT_USER, [user.get(c) for c in USER_COLUMNS])
+            connection.execute(INSERT_OUTBOX, ("users", user["id"]))
+        await self.pool.transaction(write)
+        return user
+
+    # Menu
+    def list_menu_items(self, branch: Optional[str] = None) -> List[dict]:
+        return self.menu_items.values(branch)
+
+    def get_menu_item(self, item_id: str) -> Optional[dict]:
+        return self.menu_items.get(item_id)
+
+    async def save_menu_item(self, item: dict) -> dict:
+        values = _menu_item_values(item)
+
+        def write(connection):
+            connection.execute(UPSERT_MENU_ITEM, values)
+            connection.execute(INSERT_OUTBOX, ("menu_items", item["id"]))
+        await self.pool.transaction(write)
+        self._seed_ids.discard(item["id"])
+        self.menu_items.put(item)
+        return item
+
+    async def delete_menu_item(self, item_id: str) -> bool:
+        if item_id not in self.menu_items:
+            return False
+
+        def write(connection):
+            connection.execute("DELETE FROM menu_items WHERE id = ?", (item_id,))
+            connection.execute(INSERT_OUTBOX, ("menu_items", item_id))
+        await self.pool.transaction(write)
+        self._seed_ids.discard(item_id)
+        self.menu_items.pop(item_id)
+        return True
+
+    # Replication to Supabase
+    async def _pull_menu(self):
+        """Fill an empty (or sample) local catalog from Supabase, if it is reachable"""
+        try:
+            rows = await self.client.select("menu_items", "*,categories(slug)")
+        except Exception as exc:
+            print(f"Could not pull menu from Supabase: {exc}")
+            return
+        items = []
+        for row in rows:
+            item = {c: row.get(c) for c in MENU_COLUMNS if c != "category"}
+            item["category"] = (row.get("categories") or {}).get("slug")
+            if item["category"]:
+                items.append(item)
+        if not items:
+            return
+        # Already in Supabase, so stored without an outbox entry
+        values = [_menu_item_values(item) for item in items]
+        await self.pool.transaction(lambda c: c.executemany(UPSERT_MENU_ITEM, values))
+        for item_id in self._seed_ids - {item["id"] for item in items}:
+            previous = self.menu_items.pop(item_id)
+            if self.on_menu_change:
+                self.on_menu_change(item_id, None, previous)
+        self._seed_ids.clear()
+        for item in items:
+            previous = self.menu_items.get(item["id"])
+            self.menu_items.put(item)
+            if self.on_menu_change:
+                self.on_menu_change(item["id"], item, previous)
+
+    async def _category_ids(self) -> Dict[str, str]:
+        if not self._category_id_cache:
+            for category in await self.client.select("categories", "id,slug"):
+                self._category_id_cache[category["slug"]] = category["id"]
+        return self._category_id_cache
+
+    async def sync_once(self) -> int:
+        """Replicate one batch of outbox rows; returns how many were sent"""
+        def read_batch(connection):
+            entries = connection.execute(
+                "SELECT id, table_name, row_id FROM sync_outbox ORDER BY id LIMIT ?",
+                (self.sync_batch_size,),
+            ).fetchall()
+            users, menu_items = {}, {}
+            order_ids = list(dict.fromkeys(e["row_id"] for e in entries if e["table_name"] == "orders"))
+            order_rows = []
+            for placeholders, ids in _in_chunks(order_ids):
+                order_rows += connection.execute(
+                    f"SELECT * FROM orders WHERE id IN ({placeholders})", ids,
+                ).fetchall()
+            orders = {order["id"]: order for order in _load_orders(connection, order_rows)}
+            for entry in entries:
+                if entry["table_name"] == "users" and entry["row_id"] not in users:
+                    user = _user_row_to_user(
+                        connection.execute(SELECT_USER_BY_ID, (entry["row_id"],)).fetchone()
+                    )
+                    if user:
+                        users[user["id"]] = user
+                elif entry["table_name"] == "menu_items" and _is_uuid(entry["row_id"]):
+                    # None when the item has since been deleted
+                    row = connection.execute(SELECT_MENU_ITEM, (entry["row_id"],)).fetchone()
+                    menu_items[entry["row_id"]] = _menu_row_to_item(row) if row else None
+            last_id = entries[-1]["id"] if entries else None
+            return last_id, list(orders.values()), list(users.values()), menu_items
+
+        last_id, orders, users, menu_items = await self.pool.run(read_batch)
+        if last_id is None:
+            return 0
+
+        if users:
+            await self.client.upsert("users", [{c: u.get(c) for c in USER_COLUMNS} for u in users])
+        if orders:
+            order_rows, item_rows, address_rows = [], [], []
+            for order in orders:
+                order_row, items, address_row = order_to_rows(order)
+                order_rows.append(order_row)
+                item_rows.extend(items)
+                address_rows.append(address_row)
+            await self.client.upsert("orders", order_rows)
+            await self.client.upsert("order_items", item_rows)
+            await self.client.upsert("delivery_addresses", address_rows, on_conflict="order_id")
+        saved = [item for item in menu_items.values() if item]
+        if saved:
+            category_ids = await self._category_ids()
+            rows = []
+            for item in saved:
+                row = {c: item.get(c) for c in MENU_COLUMNS if c != "category"}
+                row["category_id"] = category_ids.get(item["category"])
+                rows.append(row)
+            await self.client.upsert("menu_items", rows)
+        for item_id, item in menu_items.items():
+            if item is None:
+                await self.client.delete("menu_items", {"id": item_id})
+
+        # Rows re-queued after this batch was read are kept for the next one
+        await self.pool.transaction(
+            lambda c: c.execute("DELETE FROM sync_outbox WHERE id <= ?", (last_id,))
+        )
+        return len(orders) + len(users) + len(menu_items)
+
+    async def _run_sync(self):
+        delay = self.sync_interval
+        while True:
+            await asyncio.sleep(delay)
+            try:
+                while await self.sync_once():
+                    pass
+                if self._seed_ids:
+                    await self._pull_menu()
+                delay = self.sync_interval
+            except Exception as exc:
+                # Offline: back off up to five minutes
+                delay = min(delay * 2, 300.0)
+                print(f"Supabase sync failed, retrying in {delay:.0f}s: {exc}")
@@ -0,0 +1,81 @@
+import asyncio
+import importlib
+import inspect
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, List, Optional, Tuple, Union
+
+from app.services.metrics import metrics
+
+metrics.describe("startup_step_seconds", "gauge", "Time spent in each worker startup step")
+metrics.describe("startup_ready", "gauge", "1 once the worker has warmed up")
+
+Warmer = Callable[[], Union[None, Awaitable[None]]]
+
+
+class StartupReport:
+    """
+    Times each step of a worker's startup: module imports, lifespan steps
+    and the warm-up.
+
+    The clock starts when this module is imported, which main.py does
+    first. Import steps are incremental: a dependency shared by several
+    routers counts towards the first one that imports it. Warmers (see
+    `add_warmer`) run in the background once the lifespan has started;
+    the worker only reports healthy after they have all finished.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.steps: List[Tuple[str, float]] = []
+        self.ready = False
+        self.ready_after: Optional[float] = None
+        self._warmers: List[Tuple[str, Warmer]] = []
+
+    @contextmanager
+    def measure(self, step: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.steps.append((step, elapsed))
+            metrics.set_gauge("startup_step_seconds", elapsed, (("step", step),))
+
+    def import_module(self, name: str):
+        with self.measure(f"import {name}"):
+            return importlib.import_module(name)
+
+    def add_warmer(self, name: str, warmer: Warmer):
+        """Register a (sync or async) function that fills a cache before traffic arrives"""
+        self._warmers.append((name, warmer))
+
+    async def warm_up(self):
+        for name, warmer in self._warmers:
+            try:
+                with self.measure(f"warm {name}"):
+                    result = warmer()
+                    if inspect.isawaitable(result):
+                        await result
+            except Exception as exc:
+                # A cold cache is slower, not broken; report healthy anyway
+                print(f"Warm-up of {name} failed: {exc}")
+            await asyncio.sleep(0)  # let early requests through between warmers
+        self.ready = True
+        self.ready_after = time.perf_counter() - self.started
+        metrics.set_gauge("startup_ready", 1)
+        print(self.format())
+
+    def format(self) -> str:
+        lines = [f"Worker ready after {self.ready_after or 0:.3f}s"]
+        for step, elapsed in self.steps:
+            lines.append(f"  {elapsed * 1000:8.1f} ms  {step}")
+        return "\n".join(lines)
+
+
+startup_report = StartupReport()
+
+
+def get_startup_report() -> StartupReport:
+    """Get startup report instance"""
+    return startup_report
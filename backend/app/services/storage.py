@@ -0,0 +1,93 @@
+import asyncio
+import os
+from typing import Optional
+
+import httpx
+
+from app.config import settings
+from app.services.metrics import time_upstream
+
+
+class LocalObjectStore:
+    """
+    Stand-in for Supabase Storage: buckets are directories under `root`.
+
+    Public buckets are served from `base_url` (see the /media mount in
+    main.py); stores without a base_url hand out no URLs.
+    """
+
+    def __init__(self, root: str, base_url: Optional[str] = None):
+        self.root = root
+        self.base_url = base_url.rstrip("/") if base_url else None
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+
+    @staticmethod
+    def _read(path: str) -> Optional[bytes]:
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    async def put(
+        self,
+        bucket: str,
+        path: str,
+        data: bytes,
+        content_type: str,
+        cache_control: Optional[str] = None,
+    ) -> Optional[str]:
+        """Store an object; returns its public URL, if the store has one"""
+        await asyncio.to_thread(self._write, os.path.join(self.root, bucket, path), data)
+        return f"{self.base_url}/{bucket}/{path}" if self.base_url else None
+
+    async def get(self, bucket: str, path: str) -> Optional[bytes]:
+        return await asyncio.to_thread(self._read, os.path.join(self.root, bucket, path))
+
+
+class SupabaseObjectStore:
+    """Supabase Storage over its REST API, authenticated with the service key"""
+
+    def __init__(self, url: str, key: str):
+        self.url = url.rstrip("/")
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+
+    async def put(
+        self,
+        bucket: str,
+        path: str,
+        data: bytes,
+        content_type: str,
+        cache_control: Optional[str] = None,
+    ) -> Optional[str]:
+        headers = {**self.headers, "Content-Type": content_type, "x-upsert": "true"}
+        if cache_control:
+            headers["Cache-Control"] = cache_control
+        async with time_upstream("supabase", "storage_upload"), httpx.AsyncClient() as client:
+            response = await client.post(
+                f"{self.url}/storage/v1/object/{bucket}/{path}", headers=headers, content=data
+            )
+            response.raise_for_status()
+        return f"{self.url}/storage/v1/object/public/{bucket}/{path}"
+
+    async def get(self, bucket: str, path: str) -> Optional[bytes]:
+        async with time_upstream("supabase", "storage_download"), httpx.AsyncClient() as client:
+            response = await client.get(f"{self.url}/storage/v1/object/{bucket}/{path}", headers=self.headers)
+            if response.status_code in (400, 404):
+                return None
+            response.raise_for_status()
+            return response.content
+
+
+def create_object_store(backend: str, local_root: str, local_url: Optional[str] = None):
+    if backend == "local":
+        return LocalObjectStore(local_root, local_url)
+    if backend == "supabase":
+        return SupabaseObjectStore(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+    raise ValueError(f"Unknown file storage backend: {backend}")
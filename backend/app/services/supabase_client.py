@@ -1,5 +1,7 @@
 import httpx
+from urllib.parse import quote
 from app.config import settings
+from app.services.metrics import time_upstream
 
 # Simple Supabase REST client for Python 3.14 compatibility
 # For full Supabase SDK support, use Python 3.11 or 3.12
@@ -17,44 +19,96 @@ class SupabaseClient:
             "Prefer": "return=representation"
         }
     
-    async def select(self, table: str, columns: str = "*", filters: dict = None):
+    @staticmethod
+    def _in_value(value) -> str:
+        """One `in` list element, double-quoted so commas and parentheses stay literal"""
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        return f'"{escaped}"'
+
+    @classmethod
+    def _filter_params(cls, filters: dict = None) -> str:
+        """
+        Build PostgREST filters; list values become `in` filters and keys
+        may name an operator, e.g. {"order_id.lt": "CC-..."}. Values are
+        URL-encoded, so e.g. a `+` in an email is not read as a space.
+        """
+        params = ""
+        for key, value in (filters or {}).items():
+            if "." in key:
+                column, operator = key.split(".", 1)
+                params += f"&{column}={operator}.{quote(str(value), safe='')}"
+            elif isinstance(value, (list, tuple, set)):
+                values = ",".join(cls._in_value(v) for v in value)
+                params += f"&{key}=in.({quote(values, safe='')})"
+            else:
+                params += f"&{key}=eq.{quote(str(value), safe='')}"
+        return params
+    
+    async def select(
+        self,
+        table: str,
+        columns: str = "*",
+        filters: dict = None,
+        order: str = None,
+        limit: int = None,
+        offset: int = None,
+    ):
         """Select data from a table"""
-        url = f"{self.url}/rest/v1/{table}?select={columns}"
-        if filters:
-            for key, value in filters.items():
-                url += f"&{key}=eq.{value}"
+        url = f"{self.url}/rest/v1/{table}?select={columns}{self._filter_params(filters)}"
+        if order:
+            url += f"&order={order}"
+        if limit is not None:
+            url += f"&limit={limit}"
+        if offset:
+            url += f"&offset={offset}"
         
-        async with httpx.AsyncClient() as client:
+        async with time_upstream("supabase", "select"), httpx.AsyncClient() as client:
             response = await client.get(url, headers=self.headers)
             response.raise_for_status()
             return response.json()
     
-    async def insert(self, table: str, data: dict):
-        """Insert data into a table"""
+    async def count(self, table: str, filters: dict = None) -> int:
+        """Count rows matching filters"""
+        url = f"{self.url}/rest/v1/{table}?select=id{self._filter_params(filters)}"
+        headers = {**self.headers, "Prefer": "count=exact"}
+        
+        async with time_upstream("supabase", "count"), httpx.AsyncClient() as client:
+            response = await client.head(url, headers=headers)
+            response.raise_for_status()
+            # Content-Range: 0-24/3573
+            return int(response.headers.get("content-range", "*/0").split("/")[-1])
+    
+    async def insert(self, table: str, data):
+        """Insert a row, or a list of rows in one request"""
         url = f"{self.url}/rest/v1/{table}"
-        async with httpx.AsyncClient() as client:
+        async with time_upstream("supabase", "insert"), httpx.AsyncClient() as client:
             response = await client.post(url, headers=self.headers, json=data)
             response.raise_for_status()
             return response.json()
     
+    async def upsert(self, table: str, rows: list, on_conflict: str = "id"):
+        """Insert rows in one request, merging on the conflict column"""
+        url = f"{self.url}/rest/v1/{table}?on_conflict={on_conflict}"
+        headers = {**self.headers, "Prefer": "resolution=merge-duplicates,return=minimal"}
+        async with time_upstream("supabase", "upsert"), httpx.AsyncClient() as client:
+            response = await client.post(url, headers=headers, json=rows)
+            response.raise_for_status()
+            return True
+    
     async def update(self, table: str, data: dict, filters: dict):
         """Update data in a table"""
-        url = f"{self.url}/rest/v1/{table}"
-        for key, value in filters.items():
-            url += f"?{key}=eq.{value}"
+        url = f"{self.url}/rest/v1/{table}?{self._filter_params(filters)[1:]}"
         
-        async with httpx.AsyncClient() as client:
+        async with time_upstream("supabase", "update"), httpx.AsyncClient() as client:
             response = await client.patch(url, headers=self.headers, json=data)
             response.raise_for_status()
             return response.json()
     
     async def delete(self, table: str, filters: dict):
         """Delete data from a table"""
-        url = f"{self.url}/rest/v1/{table}"
-        for key, value in filters.items():
-            url += f"?{key}=eq.{value}"
+        url = f"{self.url}/rest/v1/{table}?{self._filter_params(filters)[1:]}"
         
-        async with httpx.AsyncClient() as client:
+        async with time_upstream("supabase", "delete"), httpx.AsyncClient() as client:
             response = await client.delete(url, headers=self.headers)
             response.raise_for_status()
             return True
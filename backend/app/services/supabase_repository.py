@@ -0,0 +1,582 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from app.config import settings
+from app.services.order_events import TERMINAL_STATUSES
+from app.services.repository import InMemoryRepository, VersionConflictError
+from app.services.supabase_client import SupabaseClient
+
+ORDER_COLUMNS = (
+    "id", "order_id", "user_id", "subtotal", "delivery_fee", "discount", "total",
+    "status", "payment_status", "payment_method", "payment_reference",
+    "scheduled_time", "estimated_delivery", "created_at", "updated_at", "version", "branch",
+)
+ADDRESS_COLUMNS = (
+    "full_name", "phone", "email", "address", "city", "landmark", "latitude", "longitude",
+)
+MENU_COLUMNS = (
+    "id", "name", "description", "price", "image_url", "is_available", "dietary_tags",
+    "spicy_level", "calories", "ingredients", "preparation_time", "created_at", "updated_at",
+    "image_urls", "stock", "branch",
+)
+USER_COLUMNS = (
+    "id", "email", "full_name", "phone", "hashed_password", "is_active", "is_verified",
+    "created_at", "updated_at",
+)
+
+# Orders with their items and delivery address embedded (PostgREST resource embedding)
+ORDER_SELECT = "*,order_items(*),delivery_addresses(*)"
+
+# Values per `in` filter; 100 UUIDs keep a request URL around 5KB,
+# well under the 8KB many proxies allow
+IN_FILTER_CHUNK = 100
+
+# Stable namespace so re-flushed order items upsert instead of duplicating
+ORDER_ITEM_NAMESPACE = uuid.UUID("6f1c1f8e-3b7a-4c4e-9a55-0d0c8f6d2a10")
+
+
+def order_to_rows(order: dict):
+    """Split an order into its orders, order_items and delivery_addresses rows"""
+    order_row = {column: order.get(column) for column in ORDER_COLUMNS}
+    item_rows = [
+        {
+            "id": str(uuid.uuid5(ORDER_ITEM_NAMESPACE, f"{order['id']}:{index}")),
+            "order_id": order["id"],
+            "menu_item_id": item["menu_item_id"],
+            "name": item["name"],
+            "quantity": item["quantity"],
+            "price": item["price"],
+            "special_instructions": item.get("special_instructions"),
+        }
+        for index, item in enumerate(order["items"])
+    ]
+    address = order["delivery_address"]
+    address_row = {"order_id": order["id"], **{c: address.get(c) for c in ADDRESS_COLUMNS}}
+    return order_row, item_rows, address_row
+
+
+def rows_to_order(order_row: dict, item_rows: List[dict], address_row: Optional[dict]) -> dict:
+    order = {column: order_row.get(column) for column in ORDER_COLUMNS}
+    order["version"] = order["version"] or 0
+    order["items"] = [
+        {
+            "menu_item_id": row["menu_item_id"],
+            "name": row["name"],
+            "quantity": row["quantity"],
+            "price": row["price"],
+            "special_instructions": row.get("special_instructions"),
+        }
+        for row in sorted(item_rows, key=lambda r: r.get("created_at") or "")
+    ]
+    order["delivery_address"] = {c: (address_row or {}).get(c) for c in ADDRESS_COLUMNS}
+    order["rider_id"] = None
+    order["rider_location"] = None
+    return order
+
+
+class OrderJournal:
+    """
+    Local append-only JSON-lines journal of order writes not yet in Postgres.
+
+    Appends are written to the file before they return, so an acknowledged
+    write survives the application crashing; the fsync that also makes it
+    survive the machine losing power runs in the background, coalescing
+    appends made while one is in progress (the same trade-off as SQLite's
+    WAL + synchronous=NORMAL). Nothing on the create path waits on a thread.
+
+    Records carry a `seq` and replay returns them in that order, so the
+    journal can be compacted without holding up appends: `rewrite` moves
+    the active file aside (a rename), writes the still-pending records to
+    a compacted file off the event loop and only then deletes the
+    moved-aside one. Whatever point a crash hits, replaying every file in
+    `seq` order ends with the latest record of each order.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.compacted_path = f"{path}.compacted"
+        self.rotated_path = f"{path}.rotated"
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(path, "a", encoding="utf-8")
+        self._sync: Optional[asyncio.Task] = None
+        self._sync_wanted = False
+        self._rewrite_lock = asyncio.Lock()
+
+    async def append(self, record: dict):
+        """Return once the record is written (fsynced shortly after)"""
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        self._request_sync()
+
+    def _request_sync(self):
+        if self._sync is None:
+            self._sync = asyncio.create_task(self._run_sync())
+        else:
+            self._sync_wanted = True
+
+    async def _run_sync(self):
+        try:
+            while True:
+                self._sync_wanted = False
+                # A duplicate stays valid if the file is rotated meanwhile
+                fd = os.dup(self._file.fileno())
+                try:
+                    await asyncio.to_thread(os.fsync, fd)
+                finally:
+                    os.close(fd)
+                if not self._sync_wanted:
+                    return
+        finally:
+            self._sync = None
+
+    async def sync(self):
+        """Wait until everything appended so far is fsynced"""
+        self._request_sync()
+        while self._sync is not None:
+            await asyncio.shield(self._sync)
+
+    @staticmethod
+    def _read(path: str) -> List[dict]:
+        """Records of one file, ignoring a torn final line"""
+        if not os.path.exists(path):
+            return []
+        records = []
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    break
+        return records
+
+    def replay(self) -> List[dict]:
+        """All journaled records in `seq` order"""
+        records = []
+        for path in (self.compacted_path, self.rotated_path, self.path):
+            records.extend(self._read(path))
+        # Stable, so records from before seqs were written keep file order
+        return sorted(records, key=lambda record: record.get("seq", 0))
+
+    async def rewrite(self, pending: Callable[[], List[dict]]):
+        """
+        Replace the journal with only the still-pending records. They are
+        collected as the active file is moved aside, with no await in
+        between, so no completed append is missed.
+        """
+        async with self._rewrite_lock:
+            records = pending()
+            self._file.close()
+            if os.path.exists(self.path):
+                os.replace(self.path, self.rotated_path)
+            self._file = open(self.path, "a", encoding="utf-8")
+            lines = [json.dumps(record) + "\n" for record in records]
+            await asyncio.to_thread(self._compact, lines)
+
+    def _compact(self, lines: List[str]):
+        tmp_path = f"{self.compacted_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.compacted_path)
+        if os.path.exists(self.rotated_path):
+            os.remove(self.rotated_path)
+
+    def close(self):
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+
+class SupabaseRepository(InMemoryRepository):
+    """
+    Supabase-backed storage.
+
+    Order writes land in the local working set and a durable local journal,
+    then a background task flushes them to Postgres in batched multi-row
+    upserts, so create_order never waits on a network round-trip. Reads are
+    served locally while the cached copy is younger than `order_cache_ttl`
+    (or has writes not yet flushed) and re-read from Postgres otherwise, so
+    other workers' changes show up within the TTL. Listings query Postgres
+    and merge in the writes still queued, rather than waiting for a flush.
+    Settled (delivered or cancelled) orders leave the working set once
+    flushed and older than the TTL; the next read refetches them.
+    Users and menu items are rarely written and go straight to Postgres;
+    the menu is re-read every `menu_refresh_interval` to pick up edits made
+    on other workers.
+
+    Rider assignment and location are not columns of `orders` and stay
+    in the working set.
+    """
+
+    durable = True
+
+    def __init__(self, client: Optional[SupabaseClient] = None):
+        super().__init__()
+        self.client = client or SupabaseClient(settings.SUPABASE_URL, settings.SUPABASE_SERVICE_KEY)
+        self.journal = OrderJournal(settings.ORDER_JOURNAL_PATH)
+        self.flush_interval = settings.ORDER_FLUSH_INTERVAL
+        self.batch_size = settings.ORDER_FLUSH_BATCH_SIZE
+        self.order_cache_ttl = settings.ORDER_CACHE_TTL
+        self.menu_refresh_interval = settings.MENU_REFRESH_INTERVAL
+        # db id -> when the cached copy was last read from or written to Postgres
+        self._cached_at: Dict[str, float] = {}
+        self._menu_writes = 0
+        # db id -> {"seq", "new", "order"} for writes not yet in Postgres
+        self._pending: Dict[str, dict] = {}
+        self._seq = 0
+        self._category_ids: Dict[str, str] = {}
+        self._category_slugs: Dict[str, str] = {}
+        self._flush_wanted = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._menu_task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        for category in await self.client.select("categories", "id,slug"):
+            self._category_ids[category["slug"]] = category["id"]
+            self._category_slugs[category["id"]] = category["slug"]
+        for row in await self.client.select("menu_items", order="created_at.asc"):
+            self.menu_items.put(self._menu_row_to_item(row))
+        self._menu_task = asyncio.create_task(self._run_menu_refresh())
+
+        # Writes acknowledged before a crash are still in the journal
+        records = self.journal.replay()
+        # Re-queued records and new writes must sort after everything journaled
+        self._seq = max((record.get("seq", 0) for record in records), default=0)
+        for record in records:
+            self._queue(record["order"], record["new"])
+            await super().save_order(record["order"])
+
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._menu_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._menu_task = None
+        try:
+            while self._pending:
+                await self.flush()
+        except Exception as exc:
+            print(f"Final order flush failed, orders stay journaled: {exc}")
+        self.journal.close()
+
+    async def ping(self):
+        await self.client.select("categories", "id", limit=1)
+
+    def pool_stats(self) -> Dict[str, int]:
+        # Orders acknowledged but not yet written to Postgres
+        return {"pending_writes": len(self._pending)}
+
+    # Orders
+    def _queue(self, order: dict, new: bool):
+        self._seq += 1
+        previous = self._pending.get(order["id"])
+        self._pending[order["id"]] = {
+            "seq": self._seq,
+            "new": new or bool(previous and previous["new"]),
+            "order": order,
+        }
+        if len(self._pending) >= self.batch_size:
+            self._flush_wanted.set()
+
+    async def save_order(self, order: dict, expected_version: Optional[int] = None) -> dict:
+        if expected_version is not None and order["id"] not in self._pending:
+            # Already in Postgres, where other workers may have changed it:
+            # compare-and-set there (PATCH ... WHERE version = expected)
+            order_row, _, _ = order_to_rows(order)
+            rows = await self.client.update(
+                "orders", order_row, {"id": order["id"], "version": expected_version},
+            )
+            if not rows:
+                # Drop the stale copy so the next read refetches it
+                self._forget_order(order["id"])
+                raise VersionConflictError(order["id"])
+            return await self._cache_order(order)
+
+        new = order["id"] not in self.orders
+        await super().save_order(order, expected_version)
+        self._queue(order, new)
+        entry = self._pending[order["id"]]
+        await self.journal.append({"seq": entry["seq"], "new": entry["new"], "order": order})
+        return order
+
+    async def flush(self):
+        """Write one batch of pending orders to Postgres"""
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = dict(list(self._pending.items())[: self.batch_size])
+            order_rows, item_rows, address_rows = [], [], []
+            for entry in batch.values():
+                order_row, items, address_row = order_to_rows(entry["order"])
+                order_rows.append(order_row)
+                if entry["new"]:
+                    item_rows.extend(items)
+                    address_rows.append(address_row)
+
+            await self.client.upsert("orders", order_rows)
+            if item_rows:
+                await self.client.upsert("order_items", item_rows)
+            if address_rows:
+                await self.client.upsert("delivery_addresses", address_rows, on_conflict="order_id")
+
+            for db_id, entry in batch.items():
+                current = self._pending.get(db_id)
+                if current is None:
+                    continue
+                if current["seq"] == entry["seq"]:
+                    del self._pending[db_id]
+                    self._cached_at[db_id] = time.monotonic()
+                else:
+                    # Changed during the flush; rows now exist upstream
+                    current["new"] = False
+            await self.journal.rewrite(
+                lambda: [{"seq": e["seq"], "new": e["new"], "order": e["order"]} for e in self._pending.values()]
+            )
+
+    def _evict_settled(self):
+        """Drop flushed delivered and cancelled orders from the working set"""
+        now = time.monotonic()
+        for db_id, cached_at in list(self._cached_at.items()):
+            if db_id in self._pending:
+                continue
+            record = self.orders.get(db_id)
+            if record is None:
+                del self._cached_at[db_id]
+            elif record.get("status") in TERMINAL_STATUSES and now - cached_at >= self.order_cache_ttl:
+                self._forget_order(db_id)
+                del self._cached_at[db_id]
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wanted.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wanted.clear()
+            try:
+                await self.flush()
+            except Exception as exc:
+                print(f"Order flush failed, will retry: {exc}")
+            self._evict_settled()
+
+    @staticmethod
+    def _embedded_orders(order_rows: List[dict]) -> List[dict]:
+        """Orders from rows selected with ORDER_SELECT (items and address embedded)"""
+        orders = []
+        for row in order_rows:
+            address = row.get("delivery_addresses")
+            # One-to-one embeds come back as an object, or a list on older PostgREST
+            if isinstance(address, list):
+                address = address[0] if address else None
+            if not address:
+                continue  # A flush (maybe another worker's) has not written the rest yet
+            orders.append(rows_to_order(row, row.get("order_items") or [], address))
+        return orders
+
+    async def _select_orders(self, filters: dict, **kwargs) -> List[dict]:
+        """Orders matching filters, with their items and address, in one round-trip"""
+        return self._embedded_orders(
+            await self.client.select("orders", ORDER_SELECT, filters=filters, **kwargs)
+        )
+
+    async def _select_orders_in(self, column: str, values: List[str]) -> List[dict]:
+        """Orders whose column is one of values, in concurrent IN_FILTER_CHUNK-sized queries"""
+        chunks = [values[i:i + IN_FILTER_CHUNK] for i in range(0, len(values), IN_FILTER_CHUNK)]
+        results = await asyncio.gather(*(self._select_orders({column: chunk}) for chunk in chunks))
+        return [order for orders in results for order in orders]
+
+    async def _cache_order(self, order: dict) -> dict:
+        """Keep an order just written to or read from Postgres in the working set"""
+        await super().save_order(order)
+        self._cached_at[order["id"]] = time.monotonic()
+        return order
+
+    async def _cache_fetched(self, order: dict) -> dict:
+        cached = self.orders.get(order["id"])
+        if cached is not None:
+            # Not columns of `orders`, so only this working set knows them
+            order["rider_id"] = cached.rider_id
+            order["rider_location"] = cached.get("rider_location")
+        return await self._cache_order(order)
+
+    def _fresh_order(self, order_id: str) -> Optional[dict]:
+        """The cached order if it can be served without asking Postgres"""
+        order = self.cached_order(order_id)
+        if order is None:
+            return None
+        db_id = order["id"]
+        if db_id in self._pending or time.monotonic() - self._cached_at.get(db_id, 0.0) < self.order_cache_ttl:
+            return order
+        return None
+
+    @staticmethod
+    def _is_db_id(order_id: str) -> bool:
+        try:
+            uuid.UUID(order_id)
+            return True
+        except ValueError:
+            return False
+
+    async def _fetch_order(self, filters: dict) -> Optional[dict]:
+        orders = await self._select_orders(filters)
+        if not orders:
+            return None
+        return await self._cache_fetched(orders[0])
+
+    async def get_order(self, order_id: str) -> Optional[dict]:
+        order = self._fresh_order(order_id)
+        if order:
+            return order
+        stale = self.cached_order(order_id)
+        try:
+            fetched = await self._fetch_order({"id" if self._is_db_id(order_id) else "order_id": order_id})
+        except Exception as exc:
+            if stale is None:
+                raise
+            print(f"Could not revalidate order {order_id}, serving cached copy: {exc}")
+            return stale
+        return fetched or stale
+
+    async def get_orders(self, order_ids: List[str]) -> Dict[str, dict]:
+        found = {}
+        for order_id in order_ids:
+            order = self._fresh_order(order_id)
+            if order:
+                found[order_id] = order
+        missing = [order_id for order_id in order_ids if order_id not in found]
+        db_ids = [order_id for order_id in missing if self._is_db_id(order_id)]
+        human_ids = [order_id for order_id in missing if not self._is_db_id(order_id)]
+        # Chunked `in` queries per ID kind, with items and addresses embedded
+        orders = await self._select_orders_in("id", db_ids) + await self._select_orders_in("order_id", human_ids)
+        for order in orders:
+            await self._cache_fetched(order)
+            for key in (order["id"], order["order_id"]):
+                if key in missing:
+                    found[key] = order
+        return found
+
+    async def get_order_by_payment_reference(self, reference: str) -> Optional[dict]:
+        order = await super().get_order_by_payment_reference(reference)
+        if order and self._fresh_order(order["id"]):
+            return order
+        return await self._fetch_order({"payment_reference": reference}) or order
+
+    async def list_orders(self, status=None, offset=0, limit=None, before=None):
+        # This worker's queued writes replace their Postgres rows (if any);
+        # taken before the query so an order flushed meanwhile is not lost
+        queued = {db_id: entry["order"] for db_id, entry in self._pending.items()}
+        creates = {db_id for db_id, entry in self._pending.items() if entry["new"]}
+        filters = {"status": status} if status else {}
+        page_filters = {**filters, "order_id.lt": before} if before else filters
+        # Enough rows to fill the page after dropping the queued ones
+        fetch = None if limit is None else offset + limit + len(queued)
+        rows, total = await asyncio.gather(
+            self.client.select("orders", ORDER_SELECT, filters=page_filters, order="order_id.desc", limit=fetch),
+            self.client.count("orders", filters),
+        )
+        # Orders queued during the query may already be partly upstream
+        for db_id, entry in list(self._pending.items()):
+            if db_id not in queued:
+                queued[db_id] = entry["order"]
+                if entry["new"]:
+                    creates.add(db_id)
+        local = [
+            order for order in queued.values()
+            if (not status or order["status"] == status) and (not before or order["order_id"] < before)
+        ]
+        # Queued creates are not counted upstream yet (queued status changes are, under the old status)
+        total += sum(1 for db_id in creates if not status or queued[db_id]["status"] == status)
+        page = sorted(
+            [row for row in rows if row["id"] not in queued] + local,
+            key=lambda row: row["order_id"], reverse=True,
+        )
+        page = page[offset:None if limit is None else offset + limit]
+        fetched = {
+            order["id"]: order
+            for order in self._embedded_orders([row for row in page if row["id"] not in queued])
+        }
+        return [
+            self.cached_order(row["id"]) or row if row["id"] in queued else fetched[row["id"]]
+            for row in page if row["id"] in queued or row["id"] in fetched
+        ], total
+
+    # Users
+    async def get_user(self, user_id: str) -> Optional[dict]:
+        user = await super().get_user(user_id)
+        if user is None:
+            rows = await self.client.select("users", filters={"id": user_id})
+            if rows:
+                user = await super().save_user({c: rows[0].get(c) for c in USER_COLUMNS})
+        return user
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        user = await super().get_user_by_email(email)
+        if user is None:
+            rows = await self.client.select("users", filters={"email": email})
+            if rows:
+                user = await super().save_user({c: rows[0].get(c) for c in USER_COLUMNS})
+        return user
+
+    async def save_user(self, user: dict) -> dict:
+        await self.client.upsert("users", [{c: user.get(c) for c in USER_COLUMNS}])
+        return await super().save_user(user)
+
+    # Menu
+    def _menu_row_to_item(self, row: dict) -> dict:
+        item = {column: row.get(column) for column in MENU_COLUMNS}
+        item["category"] = self._category_slugs.get(row.get("category_id"))
+        return item
+
+    async def refresh_menu(self):
+        """Pick up menu items created, edited or deleted by other workers"""
+        writes = self._menu_writes
+        rows = await self.client.select("menu_items", order="created_at.asc")
+        if writes != self._menu_writes:
+            return  # A local write raced the read; the next refresh sees both
+        fresh = {row["id"]: self._menu_row_to_item(row) for row in rows}
+        for item_id, item in fresh.items():
+            previous = self.menu_items.get(item_id)
+            if previous != item:
+                self.menu_items.put(item)
+                if self.on_menu_change:
+                    self.on_menu_change(item_id, item, previous)
+        for item in self.menu_items.values():
+            if item["id"] not in fresh:
+                self.menu_items.pop(item["id"])
+                if self.on_menu_change:
+                    self.on_menu_change(item["id"], None, item)
+
+    async def _run_menu_refresh(self):
+        while True:
+            await asyncio.sleep(self.menu_refresh_interval)
+            try:
+                await self.refresh_menu()
+            except Exception as exc:
+                print(f"Menu refresh failed, will retry: {exc}")
+
+    async def save_menu_item(self, item: dict) -> dict:
+        self._menu_writes += 1
+        row = {column: item.get(column) for column in MENU_COLUMNS}
+        row["category_id"] = self._category_ids.get(item["category"])
+        await self.client.upsert("menu_items", [row])
+        return await super().save_menu_item(item)
+
+    async def delete_menu_item(self, item_id: str) -> bool:
+        if item_id not in self.menu_items:
+            return False
+        self._menu_writes += 1
+        await self.client.delete("menu_items", {"id": item_id})
+        return await super().delete_menu_item(item_id)
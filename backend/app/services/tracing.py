@@ -0,0 +1,111 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Spans of the current request, or None when the request is not traced
+_spans: contextvars.ContextVar[Optional[List]] = contextvars.ContextVar("trace_spans", default=None)
+
+TRACE_HEADER = b"x-trace"
+
+# Whether a bearer token may see traces
+Authorize = Callable[[str], Awaitable[bool]]
+
+
+@contextmanager
+def span(name: str):
+    """Time a block if the current request asked to be traced"""
+    spans = _spans.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans.append((name, time.perf_counter() - start))
+
+
+def server_timing(spans: List) -> str:
+    """Server-Timing header value, with repeated spans summed per name"""
+    totals: Dict[str, List[float]] = {}
+    for name, duration in spans:
+        total = totals.setdefault(name, [0.0, 0])
+        total[0] += duration
+        total[1] += 1
+    return ", ".join(
+        f'{name};dur={total * 1000:.2f};desc="{count}x"'
+        for name, (total, count) in totals.items()
+    )
+
+
+def _traced(name: str, fn):
+    async def wrapper(*args, **kwargs):
+        with span(name):
+            return await fn(*args, **kwargs)
+    wrapper.__wrapped__ = fn
+    return wrapper
+
+
+def instrument_fastapi():
+    """
+    Add spans around FastAPI's request validation, endpoint call and
+    response serialization. These are module-level helpers in
+    fastapi.routing, looked up at call time, so wrapping them is enough;
+    anything missing in a future FastAPI version is simply not traced.
+    """
+    from fastapi import routing
+
+    for attribute, name in (
+        ("solve_dependencies", "validation"),
+        ("run_endpoint_function", "handler"),
+        ("serialize_response", "serialization"),
+    ):
+        fn = getattr(routing, attribute, None)
+        if fn is not None and not hasattr(fn, "__wrapped__"):
+            setattr(routing, attribute, _traced(name, fn))
+
+
+class TracingMiddleware:
+    """
+    Per-request opt-in tracing: requests sent with an `X-Trace` header and
+    a bearer token that `authorize` accepts get a Server-Timing response
+    header listing the time spent in each span. Timings reveal internals
+    (cache hits, upstream calls), so everyone else is served untraced.
+    Untraced requests pay for one header lookup.
+    """
+
+    def __init__(self, app, authorize: Authorize):
+        self.app = app
+        self.authorize = authorize
+
+    async def _allowed(self, scope) -> bool:
+        traced, token = False, None
+        for key, value in scope["headers"]:
+            if key == TRACE_HEADER:
+                traced = True
+            elif key == b"authorization" and value[:7].lower() == b"bearer ":
+                token = value[7:].decode("latin-1")
+        return traced and token is not None and await self.authorize(token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not await self._allowed(scope):
+            await self.app(scope, receive, send)
+            return
+
+        spans: List = []
+        token = _spans.set(spans)
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                timing = server_timing(spans + [("total", time.perf_counter() - start)])
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", timing.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _spans.reset(token)
@@ -0,0 +1 @@
+# Load and latency benchmarks; see benchmarks/run.py
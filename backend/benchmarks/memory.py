@@ -0,0 +1,98 @@
+"""
+Measure the memory each order costs a worker.
+
+Places orders through the normal create path (every in-memory store and
+order listener included), pushes a rider position for some of them and
+reports the bytes still allocated per order afterwards, with the source
+files holding the most.
+
+    cd backend
+    python -m benchmarks.memory --orders 20000
+"""
+import argparse
+import asyncio
+import gc
+import os
+import random
+import sys
+import tracemalloc
+
+from benchmarks.run import configure_environment
+
+STREETS = ("Admiralty Way", "Awolowo Road", "Ozumba Mbadiwe Avenue", "Adeola Odeku Street")
+CITIES = ("Lagos", "Ikeja", "Lekki")
+
+
+def order_body(index: int, menu_ids) -> dict:
+    items = [
+        {"menu_item_id": menu_id, "name": "", "quantity": random.randint(1, 3), "price": 1}
+        for menu_id in random.sample(menu_ids, random.randint(1, min(4, len(menu_ids))))
+    ]
+    return {
+        "items": items,
+        "delivery_address": {
+            "full_name": f"Customer {index}",
+            "phone": f"+23480{index:08d}",
+            "email": f"customer{index}@example.com",
+            "address": f"{index % 300 + 1} {random.choice(STREETS)}",
+            "city": random.choice(CITIES),
+        },
+        "payment_method": random.choice(("card", "bank_transfer", "cash_on_delivery")),
+    }
+
+
+async def main(args) -> int:
+    configure_environment(args)
+    from app.api import orders as orders_api
+    from app.api import tracking
+    from app.main import app
+    from app.models.order import OrderCreate
+    from app.services.repository import get_repository
+
+    async with app.router.lifespan_context(app):
+        menu_ids = [item["id"] for item in get_repository().list_menu_items()]
+        bodies = [OrderCreate(**order_body(index, menu_ids)) for index in range(args.orders)]
+        locations = [
+            tracking.RiderLocation(order_id="", latitude=6.45 + random.random() / 10, longitude=3.39 + random.random() / 10)
+            for _ in range(args.orders)
+        ]
+
+        gc.collect()
+        tracemalloc.start(1)
+        before = tracemalloc.take_snapshot()
+        for index, body in enumerate(bodies):
+            response = await orders_api._create_order(body)
+            if index % 2 == 0:
+                location = locations[index]
+                location.order_id = response.order.id
+                await tracking.update_rider_location(location)
+        del bodies, locations, response
+        gc.collect()
+        after = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+    stats = after.compare_to(before, "filename")
+    total = sum(stat.size_diff for stat in stats)
+    print(f"{args.orders} orders ({args.backend}): {total / args.orders:,.0f} bytes per order")
+    print(f"\n{'bytes/order':>12}  allocated in")
+    for stat in sorted(stats, key=lambda s: s.size_diff, reverse=True)[:args.top]:
+        if stat.size_diff <= 0:
+            break
+        print(f"{stat.size_diff / args.orders:12,.0f}  {os.path.relpath(stat.traceback[0].filename)}")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("memory", "supabase", "sqlite"), default="memory")
+    parser.add_argument("--orders", type=int, default=20000)
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0, help="stub Supabase round-trip")
+    parser.add_argument("--top", type=int, default=8, help="source files to list")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    random.seed(arguments.seed)
+    sys.exit(asyncio.run(main(arguments)))
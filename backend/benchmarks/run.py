@@ -0,0 +1,306 @@
+"""
+Benchmark the API in-process with stubbed Supabase and Paystack.
+
+Runs a weighted mix of menu browsing, order create/get/list, logins and
+rider location pushes to thousands of tracking WebSockets, then prints
+throughput and p50/p95/p99 per endpoint. With a baseline file it exits
+non-zero if any endpoint's p95 or p99 regressed beyond the tolerance.
+
+    cd backend
+    python -m benchmarks.run                       # compare with baseline.json
+    python -m benchmarks.run --update-baseline     # record a new baseline
+    python -m benchmarks.run --backend supabase --duration 30 --websockets 5000
+
+Latencies of endpoints that wait on storage are mostly queueing behind the
+other virtual users (and the bcrypt logins, which run on the event loop),
+so one run's p95/p99 can land anywhere in a wide band. Record a baseline
+on the machine that runs the gate, as the envelope of several runs:
+
+    python -m benchmarks.run --backend sqlite --update-baseline
+    for i in 1 2 3 4; do python -m benchmarks.run --backend sqlite --merge-baseline; done
+
+--merge-baseline keeps, per endpoint, the higher p50/p95/p99 of the stored
+and the new run, so the gate flags what exceeds the normal spread by more
+than --tolerance rather than what a single lucky run set.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.harness import ASGIWebSocket, Recorder
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+SEARCH_TERMS = ("rice", "steak", "chicken", "juice", "cake", "egg")
+CATEGORIES = ("breakfast", "lunch", "dinner", "drinks", "desserts")
+PASSWORD = "benchmark-password"
+
+ORDER_BODY = {
+    "items": [
+        {"menu_item_id": "lunch-1", "name": "Jollof Rice Royale", "quantity": 2, "price": 5500},
+        {"menu_item_id": "breakfast-1", "name": "Golden Sunrise Platter", "quantity": 1, "price": 4500},
+    ],
+    "delivery_address": {
+        "full_name": "Benchmark User",
+        "phone": "+2348000000000",
+        "email": "bench@example.com",
+        "address": "1 Admiralty Way",
+        "city": "Lagos",
+    },
+    "payment_method": "card",
+}
+
+
+def configure_environment(args):
+    """Point every store at a scratch directory before the app is imported"""
+    scratch = tempfile.mkdtemp(prefix="chipchop-bench-")
+    os.environ["STORAGE_BACKEND"] = args.backend
+    os.environ["EVENT_LOG_DIR"] = os.path.join(scratch, "events")
+    os.environ["ORDER_JOURNAL_PATH"] = os.path.join(scratch, "order_journal.jsonl")
+    os.environ["SQLITE_PATH"] = os.path.join(scratch, "chipchop.db")
+    os.environ["SQLITE_SYNC_ENABLED"] = "false"
+    # Every virtual user shares one client address, and shedding under
+    # load would hide the latencies being measured
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["ADMISSION_ENABLED"] = "false"
+    # No Paystack key: payments take the built-in mock path
+    os.environ["PAYSTACK_SECRET_KEY"] = ""
+
+    # Swapped in before the repositories import it
+    from benchmarks.stubs import StubSupabaseClient
+    import app.services.supabase_client as supabase_client
+
+    StubSupabaseClient.latency = args.upstream_latency_ms / 1000
+    supabase_client.SupabaseClient = StubSupabaseClient
+
+
+class Benchmark:
+    def __init__(self, app, client, args):
+        self.app = app
+        self.client = client
+        self.args = args
+        self.recorder = Recorder()
+        self.order_ids = []
+        self.emails = []
+        self.sockets = {}
+        self._push_sent = {}
+        self._push_seq = 0
+
+    async def timed(self, label: str, method: str, url: str, expected=200, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+            ok = response.status_code == expected
+        except Exception:
+            response, ok = None, False
+        self.recorder.record(label, time.perf_counter() - start, ok)
+        # In-process requests may complete without ever suspending; yield so
+        # WebSocket readers and background tasks get their turn
+        await asyncio.sleep(0)
+        return response if ok else None
+
+    # Setup
+    async def setup(self):
+        from app.data.menu_items import SAMPLE_MENU_ITEMS
+        from app.services.repository import get_repository
+
+        repository = get_repository()
+        if not repository.list_menu_items():
+            for item in SAMPLE_MENU_ITEMS:
+                await repository.save_menu_item(dict(item))
+
+        # bcrypt makes registration slow; a few accounts are enough for logins
+        for index in range(min(self.args.users, 5)):
+            email = f"bench{index}@example.com"
+            await self.client.post("/api/auth/register", json={
+                "email": email, "full_name": "Benchmark User", "password": PASSWORD,
+            })
+            self.emails.append(email)
+
+        for _ in range(max(10, self.args.users)):
+            response = await self.client.post("/api/orders/", json=ORDER_BODY)
+            self.order_ids.append(response.json()["order"]["id"])
+
+        await asyncio.gather(*(self.open_socket(f"ws-{index}") for index in range(self.args.websockets)))
+
+    async def open_socket(self, order_id: str):
+        socket = ASGIWebSocket(self.app, f"/api/tracking/ws/{order_id}")
+        await socket.connect()
+        await socket.receive_json()  # initial state
+        self.sockets[order_id] = socket
+        asyncio.create_task(self.read_pushes(socket))
+
+    async def read_pushes(self, socket: ASGIWebSocket):
+        try:
+            while True:
+                message = await socket.receive_json()
+                # Rider pushes carry our sequence number as the heading
+                sent = self._push_sent.pop(message.get("rider_location", {}).get("heading"), None)
+                if sent is not None:
+                    self.recorder.record("WS tracking push delivery", time.perf_counter() - sent)
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    # Scenarios
+    async def browse_menu(self):
+        await self.timed("GET /api/menu/?search", "GET", "/api/menu/",
+                         params={"search": random.choice(SEARCH_TERMS)})
+        await self.timed("GET /api/menu/?category", "GET", "/api/menu/",
+                         params={"category": random.choice(CATEGORIES)})
+        await self.timed("GET /api/menu/{id}", "GET", "/api/menu/lunch-1")
+
+    async def place_order(self):
+        response = await self.timed("POST /api/orders/", "POST", "/api/orders/", json=ORDER_BODY)
+        if response is not None:
+            order_id = response.json()["order"]["id"]
+            self.order_ids.append(order_id)
+            await self.timed("GET /api/orders/{id}", "GET", f"/api/orders/{order_id}")
+        await self.timed("GET /api/orders/", "GET", "/api/orders/", params={"per_page": 10})
+
+    async def login(self):
+        await self.timed("POST /api/auth/login", "POST", "/api/auth/login", json={
+            "email": random.choice(self.emails), "password": PASSWORD,
+        })
+
+    async def push_location(self):
+        if not self.sockets:
+            return
+        self._push_seq += 1
+        seq = float(self._push_seq)
+        self._push_sent[seq] = time.perf_counter()
+        await self.timed("POST /api/tracking/rider/location", "POST", "/api/tracking/rider/location", json={
+            "order_id": random.choice(list(self.sockets)),
+            "latitude": 6.45 + random.random() / 100,
+            "longitude": 3.39 + random.random() / 100,
+            "heading": seq,
+        })
+
+    async def user(self, deadline: float):
+        scenarios = (self.browse_menu, self.place_order, self.login, self.push_location)
+        weights = (self.args.browse_weight, self.args.order_weight, self.args.login_weight, self.args.push_weight)
+        while time.perf_counter() < deadline:
+            await random.choices(scenarios, weights)[0]()
+
+    async def run(self) -> dict:
+        await self.setup()
+        self.recorder = Recorder()
+        deadline = time.perf_counter() + self.args.duration
+        await asyncio.gather(*(self.user(deadline) for _ in range(self.args.users)))
+        self.recorder.finish()
+        await asyncio.gather(*(socket.close() for socket in self.sockets.values()))
+        return self.recorder.summary()
+
+
+def print_report(results: dict):
+    header = f"{'endpoint':<40}{'requests':>10}{'errors':>8}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    print(header)
+    print("-" * len(header))
+    for label, r in results.items():
+        print(f"{label:<40}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10}"
+              f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}")
+
+
+def compare(results: dict, baseline: dict, tolerance: float, floor_ms: float) -> list:
+    """Regressions against the baseline; tiny latencies are compared against floor_ms"""
+    regressions = []
+    for label, base in baseline.items():
+        current = results.get(label)
+        if current is None:
+            continue
+        if current["errors"]:
+            regressions.append(f"{label}: {current['errors']} errors")
+        for key in ("p95_ms", "p99_ms"):
+            limit = max(base[key], floor_ms) * (1 + tolerance)
+            if current[key] > limit:
+                regressions.append(f"{label}: {key} {current[key]} > {limit:.2f} (baseline {base[key]})")
+    return regressions
+
+
+def merge_baseline(stored: dict, results: dict) -> dict:
+    """Per endpoint, the worse percentiles of a stored baseline and a new run"""
+    merged = {}
+    for label, current in results.items():
+        base = stored.get(label)
+        if base is None:
+            merged[label] = current
+            continue
+        merged[label] = {
+            **current,
+            **{key: max(base[key], current[key]) for key in ("p50_ms", "p95_ms", "p99_ms")},
+        }
+    return merged
+
+
+async def main(args) -> int:
+    configure_environment(args)
+    import httpx
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+            results = await Benchmark(app, client, args).run()
+
+    print_report(results)
+
+    # Baselines are kept per storage backend
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.update_baseline or args.merge_baseline:
+        if args.merge_baseline:
+            results = merge_baseline(baselines.get(args.backend, {}), results)
+        baselines[args.backend] = results
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nBaseline for {args.backend} written to {args.baseline}")
+        return 0
+
+    if args.backend not in baselines:
+        print(f"\nNo {args.backend} baseline in {args.baseline}; run with --update-baseline to record one")
+        return 0
+    regressions = compare(results, baselines[args.backend], args.tolerance, args.floor_ms)
+    if regressions:
+        print("\nRegressions:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print("\nNo regressions against baseline")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("memory", "supabase", "sqlite"), default="memory")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--websockets", type=int, default=2000, help="open tracking WebSockets")
+    parser.add_argument("--upstream-latency-ms", type=float, default=5.0, help="stub Supabase round-trip")
+    parser.add_argument("--browse-weight", type=float, default=50)
+    parser.add_argument("--order-weight", type=float, default=25)
+    parser.add_argument("--login-weight", type=float, default=2)
+    parser.add_argument("--push-weight", type=float, default=20)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument(
+        "--merge-baseline", action="store_true",
+        help="widen the stored baseline to cover this run (see above)",
+    )
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed p95/p99 growth (0.5 = +50%%)")
+    parser.add_argument("--floor-ms", type=float, default=5.0, help="latencies below this are not compared")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    random.seed(arguments.seed)
+    sys.exit(asyncio.run(main(arguments)))
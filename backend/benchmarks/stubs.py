@@ -0,0 +1,116 @@
+import asyncio
+import copy
+import re
+import uuid
+from typing import Dict, List
+
+from app.data.menu_items import SAMPLE_MENU_ITEMS
+
+CATEGORY_SLUGS = ("breakfast", "lunch", "dinner", "drinks", "desserts")
+
+
+class StubSupabaseClient:
+    """
+    In-memory stand-in for SupabaseClient with the same method signatures.
+
+    Every call sleeps for `latency` seconds to stand in for the network
+    round-trip, so write-behind and caching behave as they would against
+    a real project.
+    """
+
+    latency = 0.005
+
+    # (table, embedded table) -> (embedded column, table column, one-to-one)
+    EMBEDS = {
+        ("orders", "order_items"): ("order_id", "id", False),
+        ("orders", "delivery_addresses"): ("order_id", "id", True),
+        ("menu_items", "categories"): ("id", "category_id", True),
+    }
+
+    def __init__(self, url: str = "", key: str = ""):
+        self.tables: Dict[str, Dict[str, dict]] = {}
+        categories = self.tables.setdefault("categories", {})
+        for slug in CATEGORY_SLUGS:
+            category_id = str(uuid.uuid4())
+            categories[category_id] = {"id": category_id, "slug": slug}
+        slug_ids = {row["slug"]: row["id"] for row in categories.values()}
+        menu = self.tables.setdefault("menu_items", {})
+        for item in SAMPLE_MENU_ITEMS:
+            row = copy.deepcopy(item)
+            row["category_id"] = slug_ids[row.pop("category")]
+            row.setdefault("preparation_time", 15)  # column default in db.sql
+            menu[row["id"]] = row
+
+    @staticmethod
+    def _matches(row: dict, filters: dict) -> bool:
+        for key, value in (filters or {}).items():
+            if "." in key:
+                column, operator = key.split(".", 1)
+                if operator == "lt" and not (row.get(column) is not None and row[column] < value):
+                    return False
+            elif isinstance(value, (list, tuple, set)):
+                if row.get(key) not in value:
+                    return False
+            elif row.get(key) != value:
+                return False
+        return True
+
+    async def select(self, table, columns="*", filters=None, order=None, limit=None, offset=None):
+        await asyncio.sleep(self.latency)
+        # `in` lists as sets; the work Postgres would do should not eat the app's CPU
+        filters = {k: set(v) if isinstance(v, (list, tuple)) else v for k, v in (filters or {}).items()}
+        rows = [r for r in self.tables.get(table, {}).values() if self._matches(r, filters)]
+        if order:
+            column, direction = order.split(".")
+            rows.sort(key=lambda r: r.get(column) or "", reverse=direction == "desc")
+        start = offset or 0
+        rows = [copy.deepcopy(r) for r in (rows[start:start + limit] if limit is not None else rows[start:])]
+        for embedded in re.findall(r"(\w+)\(", columns):
+            self._embed(table, embedded, rows)
+        return rows
+
+    def _embed(self, table: str, embedded: str, rows: List[dict]):
+        column, parent_column, one = self.EMBEDS[(table, embedded)]
+        keys = {row.get(parent_column) for row in rows}
+        children: Dict[str, List[dict]] = {}
+        for child in self.tables.get(embedded, {}).values():
+            if child.get(column) in keys:
+                children.setdefault(child[column], []).append(copy.deepcopy(child))
+        for row in rows:
+            found = children.get(row.get(parent_column), [])
+            row[embedded] = (found[0] if found else None) if one else found
+
+    async def count(self, table, filters=None) -> int:
+        await asyncio.sleep(self.latency)
+        return sum(1 for r in self.tables.get(table, {}).values() if self._matches(r, filters))
+
+    async def insert(self, table, data):
+        await asyncio.sleep(self.latency)
+        rows = data if isinstance(data, list) else [data]
+        for row in rows:
+            self.tables.setdefault(table, {})[row.get("id") or str(uuid.uuid4())] = copy.deepcopy(row)
+        return rows
+
+    async def upsert(self, table, rows: List[dict], on_conflict: str = "id"):
+        await asyncio.sleep(self.latency)
+        stored = self.tables.setdefault(table, {})
+        for row in rows:
+            key = row[on_conflict]
+            stored[key] = {**stored.get(key, {}), **copy.deepcopy(row)}
+        return True
+
+    async def update(self, table, data, filters):
+        await asyncio.sleep(self.latency)
+        updated = []
+        for row in self.tables.get(table, {}).values():
+            if self._matches(row, filters):
+                row.update(copy.deepcopy(data))
+                updated.append(copy.deepcopy(row))
+        return updated
+
+    async def delete(self, table, filters):
+        await asyncio.sleep(self.latency)
+        stored = self.tables.get(table, {})
+        for key in [k for k, row in stored.items() if self._matches(row, filters)]:
+            del stored[key]
+        return True
@@ -0,0 +1,12 @@
+import os
+import tempfile
+
+# Point every store at a scratch directory before the app is imported
+_scratch = tempfile.mkdtemp(prefix="chipchop-tests-")
+os.environ.setdefault("STORAGE_BACKEND", "memory")
+os.environ["EVENT_LOG_DIR"] = os.path.join(_scratch, "events")
+os.environ["ORDER_JOURNAL_PATH"] = os.path.join(_scratch, "order_journal.jsonl")
+os.environ["SQLITE_PATH"] = os.path.join(_scratch, "chipchop.db")
+os.environ["RATE_LIMIT_ENABLED"] = "false"
+os.environ["ADMISSION_ENABLED"] = "false"
+os.environ["PAYSTACK_SECRET_KEY"] = ""
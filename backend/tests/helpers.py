@@ -0,0 +1,48 @@
+import uuid
+from datetime import datetime, timedelta
+
+ORDER_ITEMS = [
+    {"menu_item_id": "lunch-1", "name": "Jollof Rice Royale", "quantity": 2, "price": 5500},
+    {"menu_item_id": "breakfast-1", "name": "Golden Sunrise Platter", "quantity": 1, "price": 4500},
+]
+
+DELIVERY_ADDRESS = {
+    "full_name": "Test Customer",
+    "phone": "+2348000000000",
+    "email": "test@example.com",
+    "address": "1 Admiralty Way",
+    "city": "Lagos",
+}
+
+# Request body for POST /api/orders/
+ORDER_BODY = {"items": ORDER_ITEMS, "delivery_address": DELIVERY_ADDRESS, "payment_method": "card"}
+
+
+def make_order(order_id: str, **fields) -> dict:
+    """A stored order as the repositories hold it"""
+    now = datetime.now()
+    order = {
+        "id": str(uuid.uuid4()),
+        "order_id": order_id,
+        "user_id": None,
+        "items": [{**item, "special_instructions": None} for item in ORDER_ITEMS],
+        "subtotal": 15500,
+        "delivery_fee": 0,
+        "discount": 0,
+        "total": 15500,
+        "status": "pending",
+        "payment_status": "pending",
+        "payment_method": "card",
+        "payment_reference": None,
+        "delivery_address": {**DELIVERY_ADDRESS, "landmark": None, "latitude": None, "longitude": None},
+        "scheduled_time": None,
+        "rider_id": None,
+        "rider_location": None,
+        "estimated_delivery": (now + timedelta(minutes=45)).isoformat(),
+        "created_at": now.isoformat(),
+        "updated_at": None,
+        "version": 0,
+        "branch": "main",
+    }
+    order.update(fields)
+    return order
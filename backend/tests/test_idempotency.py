@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.api import orders as orders_api
+from app.models.order import OrderCreate
+from app.services.idempotency import IdempotencyKeyReused, IdempotencyStore
+from tests.helpers import ORDER_BODY
+
+
+def test_retry_during_the_first_attempt_waits_for_its_result():
+    store = IdempotencyStore()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return {"order_id": "CC-1"}
+
+    async def run():
+        return await asyncio.gather(
+            store.run("key", {"a": 1}, call),
+            store.run("key", {"a": 1}, call),
+        )
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 1
+    assert first == ({"order_id": "CC-1"}, False)
+    assert second == ({"order_id": "CC-1"}, True)
+
+
+def test_key_reused_for_a_different_request_is_refused():
+    store = IdempotencyStore()
+
+    async def call():
+        return "created"
+
+    async def run():
+        await store.run("key", {"a": 1}, call)
+        await store.run("key", {"a": 2}, call)
+
+    with pytest.raises(IdempotencyKeyReused):
+        asyncio.run(run())
+
+
+def test_failed_attempt_is_not_stored():
+    store = IdempotencyStore()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("database unavailable")
+        return "created"
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await store.run("key", {"a": 1}, call)
+        return await store.run("key", {"a": 1}, call)
+
+    assert asyncio.run(run()) == ("created", False)
+    assert len(attempts) == 2
+
+
+def test_concurrent_creates_with_one_key_make_one_order(monkeypatch):
+    repository = orders_api.repository
+    save_order = repository.save_order
+    saved = []
+
+    async def slow_save_order(order, *args, **kwargs):
+        # Keep the first attempt in flight while the retry arrives
+        await asyncio.sleep(0.05)
+        saved.append(order["order_id"])
+        return await save_order(order, *args, **kwargs)
+
+    monkeypatch.setattr(repository, "save_order", slow_save_order)
+    monkeypatch.setattr(orders_api, "idempotency_store", IdempotencyStore())
+
+    async def create(body):
+        response = Response()
+        result = await orders_api.create_order(OrderCreate(**body), response, idempotency_key="retry-key")
+        return result, response
+
+    async def run():
+        return await asyncio.gather(create(ORDER_BODY), create(ORDER_BODY))
+
+    (first, first_response), (second, second_response) = asyncio.run(run())
+    assert len(saved) == 1
+    assert first.order.order_id == second.order.order_id == saved[0]
+    assert "Idempotent-Replayed" not in first_response.headers
+    assert second_response.headers["Idempotent-Replayed"] == "true"
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(create({**ORDER_BODY, "payment_method": "bank_transfer"}))
+    assert error.value.status_code == 422
@@ -0,0 +1,71 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException, Response
+
+from app.api import orders as orders_api
+from app.models.order import OrderCreate
+from app.services.inventory import Inventory, MemoryStockStore
+from tests.helpers import ORDER_BODY
+
+ITEM_ID = ORDER_BODY["items"][0]["menu_item_id"]
+
+
+@pytest.fixture
+def inventory(monkeypatch):
+    """A fresh inventory for the order routes; the menu item is put back afterwards"""
+    repository = orders_api.repository
+    item = dict(repository.get_menu_item(ITEM_ID))
+    inventory = Inventory(MemoryStockStore())
+    monkeypatch.setattr(orders_api, "inventory", inventory)
+    yield inventory
+    asyncio.run(repository.save_menu_item(item))
+
+
+def slow_saves(monkeypatch):
+    """Hold every order save so concurrent creates overlap"""
+    repository = orders_api.repository
+    save_order = repository.save_order
+
+    async def slow_save_order(order, *args, **kwargs):
+        await asyncio.sleep(0.05)
+        return await save_order(order, *args, **kwargs)
+
+    monkeypatch.setattr(repository, "save_order", slow_save_order)
+
+
+async def create_order():
+    return await orders_api.create_order(OrderCreate(**ORDER_BODY), Response(), idempotency_key=None)
+
+
+def test_racing_for_the_last_portion_gives_one_409(inventory, monkeypatch):
+    slow_saves(monkeypatch)
+    quantity = ORDER_BODY["items"][0]["quantity"]
+
+    async def run():
+        await inventory.set_stock(ITEM_ID, quantity)
+        results = await asyncio.gather(create_order(), create_order(), return_exceptions=True)
+        return results, await inventory.get_stock(ITEM_ID)
+
+    results, left = asyncio.run(run())
+    refused = [r for r in results if isinstance(r, HTTPException)]
+    assert len(refused) == 1
+    assert refused[0].status_code == 409
+    assert orders_api.repository.get_menu_item(ITEM_ID)["name"] in refused[0].detail
+    assert left == 0
+    assert orders_api.repository.get_menu_item(ITEM_ID)["is_available"] is False
+
+
+def test_stock_is_given_back_when_the_order_cannot_be_saved(inventory, monkeypatch):
+    async def failing_save_order(order, *args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(orders_api.repository, "save_order", failing_save_order)
+
+    async def run():
+        await inventory.set_stock(ITEM_ID, 5)
+        with pytest.raises(RuntimeError):
+            await create_order()
+        return await inventory.get_stock(ITEM_ID)
+
+    assert asyncio.run(run()) == 5
@@ -0,0 +1,62 @@
+import asyncio
+
+from app.services import order_ids as order_ids_module
+from app.services.order_ids import MAX_SEQ, OrderIdGenerator
+
+
+def freeze_clock(monkeypatch, *times):
+    """Make time.time() return each of `times` in turn, then stick on the last"""
+    remaining = list(times)
+
+    def fake_time():
+        return remaining.pop(0) if len(remaining) > 1 else remaining[0]
+
+    monkeypatch.setattr(order_ids_module.time, "time", fake_time)
+
+
+def test_ids_in_one_millisecond_are_increasing_and_unique(monkeypatch):
+    freeze_clock(monkeypatch, 1_800_000_000.0)
+    generator = OrderIdGenerator()
+    # More than the sequence holds, so the generator has to borrow milliseconds
+    ids = [generator.next_id() for _ in range(3 * (MAX_SEQ + 1))]
+    assert sorted(ids) == ids
+    assert len(set(ids)) == len(ids)
+
+
+def test_clock_stepping_back_does_not_reorder_ids(monkeypatch):
+    freeze_clock(monkeypatch, 1_800_000_000.5, 1_800_000_000.0)
+    generator = OrderIdGenerator()
+    first, second = generator.next_id(), generator.next_id()
+    assert first < second
+
+
+def test_concurrent_tasks_get_monotonic_unique_ids():
+    generator = OrderIdGenerator()
+
+    async def mint(count):
+        ids = []
+        for _ in range(count):
+            ids.append(generator.next_id())
+            await asyncio.sleep(0)
+        return ids
+
+    async def run():
+        return await asyncio.gather(*(mint(200) for _ in range(20)))
+
+    batches = asyncio.run(run())
+    every_id = [order_id for batch in batches for order_id in batch]
+    assert len(set(every_id)) == len(every_id)
+    for batch in batches:
+        assert sorted(batch) == batch
+
+
+def test_nodes_minting_in_the_same_millisecond_do_not_collide(monkeypatch):
+    freeze_clock(monkeypatch, 1_800_000_000.0)
+    generators = [OrderIdGenerator(node) for node in range(50)]
+    ids = [generator.next_id() for _ in range(10) for generator in generators]
+    assert len(set(ids)) == len(ids)
+
+
+def test_new_ids_sort_after_legacy_ids():
+    legacy = "CC-20261231-ZZZZZZ"
+    assert OrderIdGenerator().next_id() > legacy
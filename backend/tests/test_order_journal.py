@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+from app.config import settings
+from app.services.supabase_repository import OrderJournal, SupabaseRepository
+from benchmarks.stubs import StubSupabaseClient
+from tests.helpers import make_order
+
+
+def record(seq: int, order: dict, new: bool = True) -> dict:
+    return {"seq": seq, "new": new, "order": order}
+
+
+@pytest.fixture
+def journal_path(tmp_path, monkeypatch):
+    path = str(tmp_path / "order_journal.jsonl")
+    monkeypatch.setattr(settings, "ORDER_JOURNAL_PATH", path)
+    return path
+
+
+def test_replay_returns_records_in_seq_order(journal_path):
+    order = make_order("CC-B0001")
+
+    async def write():
+        journal = OrderJournal(journal_path)
+        await journal.append(record(1, order))
+        await journal.append(record(2, {**order, "status": "confirmed"}, new=False))
+        await journal.sync()
+        journal.close()
+
+    asyncio.run(write())
+    records = OrderJournal(journal_path).replay()
+    assert [r["seq"] for r in records] == [1, 2]
+    assert records[-1]["order"]["status"] == "confirmed"
+
+
+def test_replay_ignores_a_torn_final_line(journal_path):
+    with open(journal_path, "w") as f:
+        f.write(json.dumps(record(1, make_order("CC-B0001"))) + "\n")
+        f.write('{"seq": 2, "new": tr')
+    assert [r["seq"] for r in OrderJournal(journal_path).replay()] == [1]
+
+
+def test_crash_during_compaction_loses_no_record(journal_path, monkeypatch):
+    first, second = make_order("CC-B0001"), make_order("CC-B0002")
+
+    def crash(self, lines):
+        raise OSError("killed before the compacted file was written")
+
+    async def write():
+        journal = OrderJournal(journal_path)
+        await journal.append(record(1, first))
+        await journal.append(record(2, second))
+        monkeypatch.setattr(OrderJournal, "_compact", crash)
+        with pytest.raises(OSError):
+            # Only `second` is still pending; the active file is already rotated
+            await journal.rewrite(lambda: [record(2, second)])
+        await journal.append(record(3, {**first, "status": "confirmed"}, new=False))
+        await journal.sync()
+        journal.close()
+
+    asyncio.run(write())
+    records = OrderJournal(journal_path).replay()
+    assert [r["seq"] for r in records] == [1, 2, 3]
+    latest = {r["order"]["id"]: r["order"] for r in records}
+    assert latest[first["id"]]["status"] == "confirmed"
+
+
+def test_acknowledged_orders_survive_a_crash(journal_path):
+    client = StubSupabaseClient()
+    orders = [make_order(f"CC-B000{n}") for n in range(3)]
+
+    async def crash_after_saving():
+        repository = SupabaseRepository(client)
+        repository.flush_interval = 3600  # nothing reaches Postgres before the crash
+        await repository.start()
+        for order in orders:
+            await repository.save_order(order)
+        # Die without the final flush
+        for task in (repository._task, repository._menu_task):
+            task.cancel()
+        repository.journal.close()
+        assert not client.tables.get("orders")
+
+    async def restart():
+        repository = SupabaseRepository(client)
+        await repository.start()
+        assert set(repository._pending) == {order["id"] for order in orders}
+        assert (await repository.get_order(orders[0]["order_id"]))["id"] == orders[0]["id"]
+        await repository.stop()
+
+    asyncio.run(crash_after_saving())
+    asyncio.run(restart())
+    assert set(client.tables["orders"]) == {order["id"] for order in orders}
+    assert OrderJournal(journal_path).replay() == []
+
+
+def test_listing_includes_queued_orders_without_flushing(journal_path):
+    client = StubSupabaseClient()
+    flushed, queued = make_order("CC-B0001"), make_order("CC-B0002")
+
+    async def run():
+        repository = SupabaseRepository(client)
+        repository.flush_interval = 3600
+        await repository.start()
+        await repository.save_order(flushed)
+        await repository.flush()
+        await repository.save_order(queued)
+        orders, total = await repository.list_orders(limit=10)
+        assert [order["order_id"] for order in orders] == ["CC-B0002", "CC-B0001"]
+        assert total == 2
+        # The listing did not drain the queue
+        assert queued["id"] in repository._pending
+        assert set(client.tables["orders"]) == {flushed["id"]}
+        pending, _ = await repository.list_orders(status="pending", before="CC-B0002")
+        assert [order["order_id"] for order in pending] == ["CC-B0001"]
+        await repository.stop()
+
+    asyncio.run(run())
@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+import pytest
+from fastapi import HTTPException
+
+from app.api import orders as orders_api
+from app.services.repository import VersionConflictError
+from app.services.sqlite_repository import SQLiteRepository
+from tests.helpers import make_order
+
+
+@pytest.fixture
+def interleaved_reads(monkeypatch):
+    """Yield after every order read so concurrent updates both read the same version"""
+    repository = orders_api.repository
+    get_order = repository.get_order
+
+    async def get_order_then_yield(order_id):
+        order = await get_order(order_id)
+        await asyncio.sleep(0)
+        return order
+
+    monkeypatch.setattr(repository, "get_order", get_order_then_yield)
+    return repository
+
+
+def test_concurrent_updates_with_the_same_if_match_get_one_412(interleaved_reads):
+    order = make_order("CC-B1000")
+
+    async def run():
+        await interleaved_reads.save_order(order)
+        return await asyncio.gather(
+            orders_api.modify_order(order["id"], lambda o: {"status": "confirmed"}, expected_version=0),
+            orders_api.modify_order(order["id"], lambda o: {"status": "cancelled"}, expected_version=0),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(run())
+    assert first["status"] == "confirmed" and first["version"] == 1
+    assert isinstance(second, HTTPException) and second.status_code == 412
+
+
+def test_concurrent_unpinned_updates_are_both_applied(interleaved_reads):
+    order = make_order("CC-B1001")
+
+    async def run():
+        await interleaved_reads.save_order(order)
+        await asyncio.gather(
+            orders_api.modify_order(order["id"], lambda o: {"status": "confirmed"}),
+            orders_api.modify_order(order["id"], lambda o: {"rider_id": "rider-1"}),
+        )
+        return await interleaved_reads.get_order(order["id"])
+
+    stored = asyncio.run(run())
+    assert stored["status"] == "confirmed"
+    assert stored["rider_id"] == "rider-1"
+    assert stored["version"] == 2
+
+
+def test_invalid_transition_is_rejected(interleaved_reads):
+    order = make_order("CC-B1002", status="delivered")
+
+    async def run():
+        await interleaved_reads.save_order(order)
+        await orders_api.modify_order(order["id"], lambda o: {"status": "preparing"})
+
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(run())
+    assert error.value.status_code == 409
+
+
+def test_sqlite_compare_and_set_lets_one_writer_win(tmp_path):
+    order = make_order("CC-B1003")
+
+    async def run():
+        repository = SQLiteRepository(os.path.join(tmp_path, "orders.db"))
+        try:
+            await repository.save_order(order)
+            results = await asyncio.gather(*(
+                repository.save_order({**order, "status": status, "version": 1}, expected_version=0)
+                for status in ("confirmed", "cancelled")
+            ), return_exceptions=True)
+            return results, await repository.get_order(order["id"])
+        finally:
+            await repository.stop()
+
+    results, stored = asyncio.run(run())
+    conflicts = [r for r in results if isinstance(r, VersionConflictError)]
+    winners = [r for r in results if isinstance(r, dict)]
+    assert len(conflicts) == 1 and len(winners) == 1
+    assert stored["status"] == winners[0]["status"]
+    assert stored["version"] == 1
@@ -12,6 +12,7 @@ CREATE TABLE IF NOT EXISTS users (
     email VARCHAR(255) UNIQUE NOT NULL,
     full_name VARCHAR(100) NOT NULL,
     phone VARCHAR(20),
+    hashed_password TEXT, -- Set for accounts registered through the API
     avatar_url TEXT,
     default_address TEXT,
     is_active BOOLEAN DEFAULT TRUE,
@@ -51,6 +52,7 @@ CREATE TABLE IF NOT EXISTS menu_items (
     description TEXT NOT NULL,
     price INTEGER NOT NULL CHECK (price > 0),
     image_url TEXT,
+    image_urls JSONB, -- WebP derivatives by size: {"thumb": url, "card": url, "detail": url}
     category_id UUID REFERENCES categories(id),
     is_available BOOLEAN DEFAULT TRUE,
     dietary_tags TEXT[] DEFAULT '{}',
@@ -58,6 +60,8 @@ CREATE TABLE IF NOT EXISTS menu_items (
     calories INTEGER DEFAULT 0,
     ingredients TEXT[] DEFAULT '{}',
     preparation_time INTEGER DEFAULT 15, -- minutes
+    stock INTEGER, -- Units left; NULL means not tracked
+    branch VARCHAR(50), -- Branch whose menu lists the item; NULL means the default branch
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
@@ -65,6 +69,7 @@ CREATE TABLE IF NOT EXISTS menu_items (
 -- Create index for faster category queries
 CREATE INDEX idx_menu_items_category ON menu_items(category_id);
 CREATE INDEX idx_menu_items_available ON menu_items(is_available);
+CREATE INDEX idx_menu_items_branch ON menu_items(branch);
 
 -- ============================================
 -- PROMOTIONS TABLE
@@ -91,7 +96,7 @@ CREATE TABLE IF NOT EXISTS promotions (
 -- ============================================
 CREATE TABLE IF NOT EXISTS orders (
     id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
-    order_id VARCHAR(50) UNIQUE NOT NULL, -- Human-readable ID (CC-YYYYMMDD-XXXXXX)
+    order_id VARCHAR(50) UNIQUE NOT NULL, -- Human-readable, time-sortable ID (see generate_order_id)
     user_id UUID REFERENCES users(id),
     subtotal INTEGER NOT NULL,
     delivery_fee INTEGER NOT NULL DEFAULT 1500,
@@ -113,7 +118,9 @@ CREATE TABLE IF NOT EXISTS orders (
     delivered_at TIMESTAMP WITH TIME ZONE,
     special_instructions TEXT,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
-    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    version INTEGER NOT NULL DEFAULT 0, -- Bumped on every write; updates compare-and-set on it
+    branch VARCHAR(50) -- Branch whose menu priced the order
 );
 
 -- Create indexes
@@ -281,12 +288,35 @@ CREATE TRIGGER update_riders_updated_at
     BEFORE UPDATE ON riders
     FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
 
+-- Fixed-width Crockford base32, so string order matches numeric order
+CREATE OR REPLACE FUNCTION crockford32(value BIGINT, width INTEGER)
+RETURNS TEXT AS $$
+DECLARE
+    alphabet CONSTANT TEXT := '0123456789ABCDEFGHJKMNPQRSTVWXYZ';
+    result TEXT := '';
+BEGIN
+    FOR i IN 1..width LOOP
+        result := SUBSTR(alphabet, (value % 32)::INTEGER + 1, 1) || result;
+        value := value / 32;
+    END LOOP;
+    RETURN result;
+END;
+$$ language 'plpgsql' IMMUTABLE;
+
+CREATE SEQUENCE IF NOT EXISTS order_id_seq;
+
 -- Function to generate order ID
+-- Same format as backend/app/services/order_ids.py: 'CC-' + epoch milliseconds
+-- offset by 10 * 32^8 (9) + node (2) + sequence (2) + random tail (6).
+-- Node 'ZZ' is reserved for IDs made here.
 CREATE OR REPLACE FUNCTION generate_order_id()
 RETURNS TRIGGER AS $$
 BEGIN
-    NEW.order_id = 'CC-' || TO_CHAR(CURRENT_DATE, 'YYYYMMDD') || '-' || 
-                   UPPER(SUBSTRING(MD5(RANDOM()::TEXT) FROM 1 FOR 6));
+    NEW.order_id = 'CC-' ||
+                   crockford32((EXTRACT(EPOCH FROM clock_timestamp()) * 1000)::BIGINT + 10995116277760, 9) ||
+                   'ZZ' ||
+                   crockford32(nextval('order_id_seq') % 1024, 2) ||
+                   crockford32(floor(random() * 1073741824)::BIGINT, 6);
     RETURN NEW;
 END;
 $$ language 'plpgsql';